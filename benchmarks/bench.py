@@ -0,0 +1,269 @@
+"""
+Benchmarks for the data generation and plotting hot paths.
+
+Each case runs in a forked child process so peak RSS is measured per case. A case is
+timed over several repeats (reporting min and median), then run once more under
+tracemalloc to record the peak traced allocation and the number of blocks it left
+alive. Results are written as JSON and can be compared against a previous run to
+flag regressions.
+
+Usage:
+    python benchmarks/bench.py --output bench.json
+    python benchmarks/bench.py --quick --compare bench.json --threshold 0.15
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+
+import data_fetcher
+import visualization
+import main as main_module
+from render_cache import RenderCache
+
+GRID_SIZES = [21, 1_001, 10_001, 100_001, 1_000_001]
+QUICK_GRID_SIZES = [21, 1_001, 10_001]
+
+def _rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+def _generation_cases(grid_sizes):
+    cases = {
+        # generate_apr_comparison_data always sweeps 21 utilization points
+        'generate_apr_comparison_data[21]': lambda: data_fetcher.generate_apr_comparison_data(0.10, 0.08),
+    }
+    for n in grid_sizes:
+        max_rate = (n - 1) / 100
+        cases[f'generate_fixed_util_apr_data[{n}]'] = (
+            lambda max_rate=max_rate: data_fetcher.generate_fixed_util_apr_data(0.85, 0.08, max_borrow_rate=max_rate)
+        )
+        cases[f'generate_lend_rate_comparison_data[{n}]'] = (
+            lambda max_rate=max_rate: data_fetcher.generate_lend_rate_comparison_data(0.85, 0.08, max_lend_rate=max_rate)
+        )
+        cases[f'sweep_rates[utilization x {n}]'] = (
+            lambda n=n: data_fetcher.sweep_rates(np.linspace(0, 1, n), 0.08, borrow_rate=0.10)
+        )
+    return cases
+
+def _plot_cases(tmp_dir):
+    apr = data_fetcher.generate_apr_comparison_data(0.10, 0.08)
+    fixed = data_fetcher.generate_fixed_util_apr_data(0.85, 0.08)
+    lend = data_fetcher.generate_lend_rate_comparison_data(0.85, 0.08)
+    plots = {
+        'plot_stacked_apr_comparison': (visualization.plot_stacked_apr_comparison, apr, {}),
+        'plot_fixed_util_apr_comparison': (visualization.plot_fixed_util_apr_comparison, fixed, {'utilization_rate': 0.85}),
+        'plot_lend_rate_apr_comparison': (visualization.plot_lend_rate_apr_comparison, lend, {'utilization_rate': 0.85}),
+    }
+
+    cases = {}
+    for name, (plot_fn, (data, borrow_rates), options) in plots.items():
+        # Save through the public plot_* path, as main.py and batch runs do, so each case
+        # covers figure construction, savefig and any render cache lookup
+        def plot(plot_fn=plot_fn, data=data, borrow_rates=borrow_rates, options=options, quality='publication',
+                 ext='.png'):
+            plot_fn(data, borrow_rates, 0.08, save_path=os.path.join(tmp_dir, f'bench{ext}'), quality=quality,
+                    **options)
+
+        for quality in visualization.RENDER_TIERS:
+            for ext in ('.png', '.svg'):
+                cases[f'{name}[{quality} {ext[1:]}]'] = (
+                    lambda plot=plot, quality=quality, ext=ext: plot(quality=quality, ext=ext)
+                )
+
+        def use_render_cache(plot=plot):
+            # Render once into a fresh store so the timed calls are all cache hits
+            visualization.RENDER_CACHE = RenderCache(tempfile.mkdtemp(dir=tmp_dir))
+            plot()
+        cases[f'{name}[render cache hit]'] = (use_render_cache, plot)
+    return cases
+
+def _main_case(tmp_dir):
+    def run_main():
+        cwd = os.getcwd()
+        os.chdir(tmp_dir)
+        try:
+            main_module.main()
+        finally:
+            os.chdir(cwd)
+    return {'main.main': run_main}
+
+def _measure(fn, repeats, queue, setup=None):
+    try:
+        if setup:
+            setup()
+        rss_start = _rss_mb()
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        tracemalloc.start()
+        fn()
+        snapshot = tracemalloc.take_snapshot()
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats = snapshot.statistics('filename')
+    except BaseException as e:
+        queue.put({'error': f'{type(e).__name__}: {e}'})
+        raise
+
+    queue.put({
+        'min_s': min(times),
+        'median_s': statistics.median(times),
+        'repeats': repeats,
+        'peak_rss_mb': peak_rss,
+        'rss_growth_mb': peak_rss - rss_start,
+        'traced_peak_mb': traced_peak / 2**20,
+        'live_blocks': sum(stat.count for stat in stats)
+    })
+
+def run_case(fn, repeats, setup=None, poll_interval=1.0):
+    """
+    Run a benchmark case in a forked child and return its measurements.
+
+    A case that raises, or whose child dies without reporting (e.g. killed by the OOM
+    killer), returns a record with an 'error' key instead of measurements.
+    """
+    ctx = multiprocessing.get_context('fork')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_measure, args=(fn, repeats, queue, setup))
+    process.start()
+    while True:
+        try:
+            result = queue.get(timeout=poll_interval)
+            break
+        except queue_module.Empty:
+            if not process.is_alive() and queue.empty():
+                result = {'error': f'benchmark process exited with code {process.exitcode} without a result'}
+                break
+    process.join()
+    return result
+
+def run_benchmarks(quick=False, repeats=5, pattern=None, progress=print):
+    """
+    Run every benchmark case.
+
+    Args:
+        quick (bool): Use smaller grids and fewer repeats
+        repeats (int): Timed repeats per case
+        pattern (str, optional): Only run cases whose name contains this substring
+        progress (callable, optional): Called with one line per finished case
+
+    Returns:
+        dict: Run metadata and per-case results
+    """
+    # Measure the generators themselves, not result cache hits
+    data_fetcher.RESULT_CACHE.enabled = False
+    repeats = min(repeats, 3) if quick else repeats
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cases = {}
+        cases.update(_generation_cases(QUICK_GRID_SIZES if quick else GRID_SIZES))
+        cases.update(_plot_cases(tmp_dir))
+        cases.update(_main_case(tmp_dir))
+
+        results = {}
+        for name, case in cases.items():
+            if pattern and pattern not in name:
+                continue
+            # A case is a callable, or a (setup, callable) pair whose setup runs untimed
+            setup, fn = case if isinstance(case, tuple) else (None, case)
+            results[name] = r = run_case(fn, repeats, setup)
+            if not progress:
+                continue
+            if 'error' in r:
+                progress(f"{name:55} FAILED: {r['error']}")
+            else:
+                progress(f"{name:55} {r['median_s'] * 1000:10.2f} ms  {r['peak_rss_mb']:8.1f} MB RSS  "
+                         f"{r['live_blocks']:8d} blocks")
+
+    return {
+        'meta': {
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'versions': {
+                'numpy': np.__version__,
+                'matplotlib': matplotlib.__version__
+            },
+            'quick': quick
+        },
+        'results': results
+    }
+
+def compare(current, baseline, threshold=0.10, metric='min_s'):
+    """
+    Compare two benchmark runs.
+
+    Args:
+        current (dict): Result of run_benchmarks
+        baseline (dict): Earlier result of run_benchmarks
+        threshold (float): Relative slowdown that counts as a regression
+        metric (str): Timing metric to compare
+
+    Returns:
+        list: (case name, baseline value, current value, relative change, regressed) tuples
+    """
+    rows = []
+    for name, result in current['results'].items():
+        if name not in baseline['results'] or 'error' in result or 'error' in baseline['results'][name]:
+            continue
+        before = baseline['results'][name][metric]
+        after = result[metric]
+        change = (after - before) / before if before else 0.0
+        rows.append((name, before, after, change, change > threshold))
+    return rows
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark data generation and plotting hot paths.")
+    parser.add_argument('--quick', action='store_true', help="Smaller grids and fewer repeats")
+    parser.add_argument('--repeats', type=int, default=5, help="Timed repeats per case")
+    parser.add_argument('--filter', dest='pattern', help="Only run cases whose name contains this text")
+    parser.add_argument('--output', help="Write results JSON here")
+    parser.add_argument('--compare', help="Baseline results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Relative slowdown flagged as a regression")
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args()
+    current = run_benchmarks(quick=args.quick, repeats=args.repeats, pattern=args.pattern)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = 0
+        print()
+        for name, before, after, change, regressed in compare(current, baseline, args.threshold):
+            flag = 'REGRESSION' if regressed else ''
+            print(f"{name:55} {before * 1000:10.2f} -> {after * 1000:10.2f} ms  {change:+7.1%}  {flag}")
+            regressions += regressed
+        if regressions:
+            sys.exit(f"{regressions} benchmark(s) regressed by more than {args.threshold:.0%}")
+
+    failed = [name for name, result in current['results'].items() if 'error' in result]
+    if failed:
+        sys.exit(f"{len(failed)} benchmark(s) failed: {', '.join(failed)}")
@@ -1,7 +1,21 @@
+import argparse
+import sys
+
 import nbformat as nbf
-import os
 
-def create_notebook():
+NOTEBOOK_PATH = 'FraxlendAnalysis.ipynb'
+
+def create_notebook(path=NOTEBOOK_PATH, check=False):
+    """
+    Generate the analysis notebook.
+
+    Args:
+        path (str): Where the notebook is written
+        check (bool): Only compare the generated notebook with the file at path
+
+    Returns:
+        bool: Whether the file at path was already up to date
+    """
     # Create a new notebook
     nb = nbf.v4.new_notebook()
     
@@ -17,8 +31,23 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import sys
 import ipywidgets as widgets
 from IPython.display import display, clear_output, HTML
+import base64
+
+# Import the project modules from src, so the notebook shares one copy of their state
+# (RESULT_CACHE, RATE_BACKEND, RENDER_CACHE) with everything else it imports
+sys.path.insert(0, 'src')
+from data_fetcher import (
+    RESULT_CACHE,
+    generate_apr_comparison_data,
+    generate_fixed_util_apr_data,
+    generate_lend_rate_comparison_data
+)
+from visualization import UtilizationAPRChart, BorrowRateAPRChart, LendRateAPRChart
+from render_scheduler import RenderScheduler
+from instrumentation import TRACER, format_trace
 
 # Create output directory if it doesn't exist
 os.makedirs('output', exist_ok=True)
@@ -55,126 +84,186 @@ sfrxusd_rate_slider = widgets.FloatSlider(
 display(widgets.VBox([utilization_slider, borrow_rate_slider, sfrxusd_rate_slider]))'''
     nb.cells.append(nbf.v4.new_code_cell(imports))
 
-    # Add data fetcher functions
-    with open('src/data_fetcher.py', 'r') as f:
-        content = f.read()
-        # Remove imports as we already have them
-        content = content.replace('import numpy as np\nimport pandas as pd\n\n', '')
-        nb.cells.append(nbf.v4.new_markdown_cell('## Data Generation Functions'))
-        nb.cells.append(nbf.v4.new_code_cell(content))
-
-    # Add visualization functions
-    with open('src/visualization.py', 'r') as f:
-        content = f.read()
-        # Remove imports as we already have them
-        content = content.replace('import matplotlib.pyplot as plt\nimport seaborn as sns\nimport pandas as pd\nimport numpy as np\n\n', '')
-        nb.cells.append(nbf.v4.new_markdown_cell('## Visualization Functions'))
-        nb.cells.append(nbf.v4.new_code_cell(content))
-
     # Add first analysis with interactive update
-    analysis = '''# Create output widgets for each plot
+    analysis = '''# Keep generated data on disk so it survives kernel restarts
+RESULT_CACHE.disk_dir = RESULT_CACHE.disk_dir or os.path.join('output', 'cache')
+
+# Create output widgets for each plot
 out1 = widgets.Output()
 out2 = widgets.Output()
 out3 = widgets.Output()
 
-def update_first_plot(change=None):
-    with out1:
-        clear_output(wait=True)
-        plt.figure(figsize=(12, 8))
-        
-        # Generate visualization with current slider values
-        apr_data, borrow_rates = generate_apr_comparison_data(
-            borrow_rate_slider.value,
-            sfrxusd_rate_slider.value
-        )
-        
-        plot_stacked_apr_comparison(
-            apr_data,
-            borrow_rates,
-            sfrxusd_rate_slider.value,
-            title=f"APR Comparison: frxUSD vs sfrxUSD ({borrow_rate_slider.value:.0%} Borrow Rate)"
-        )
-
-# Connect sliders to update function
-borrow_rate_slider.observe(update_first_plot, names='value')
-sfrxusd_rate_slider.observe(update_first_plot, names='value')
+# Build each chart once; slider changes only update its artists. Charts render as fast
+# previews first and are re-encoded at publication quality once the sliders settle.
+utilization_chart = UtilizationAPRChart(pyplot=False, quality='preview')
+borrow_rate_chart = BorrowRateAPRChart(pyplot=False, quality='preview')
+lend_rate_chart = LendRateAPRChart(pyplot=False, quality='preview')
+NOTEBOOK_DPI = 100
+
+def read_sliders():
+    return {
+        'utilization_rate': utilization_slider.value,
+        'borrow_rate': borrow_rate_slider.value,
+        'sfrxusd_interest_rate': sfrxusd_rate_slider.value
+    }
+
+# Slider events are coalesced and rendered on a worker thread; slider values are
+# read once per render and shared by every chart that needs redrawing. Each render
+# is recorded as one 'slider_event' trace when tracing is on.
+scheduler = RenderScheduler(
+    read_sliders,
+    batch_context=lambda targets: TRACER.trace('slider_event', targets=targets, **read_sliders())
+)
+
+# Optional overlay with the stage timings of the latest slider event
+timings_toggle = widgets.Checkbox(value=TRACER.enabled, description='Show stage timings')
+timings = widgets.HTML()
+
+def show_timings(trace):
+    if timings_toggle.value:
+        timings.value = f"<pre>{format_trace(trace)}</pre>"
+
+def toggle_timings(change):
+    TRACER.enabled = change['new']
+    timings.value = ''
+
+TRACER.add_listener(show_timings)
+timings_toggle.observe(toggle_timings, names='value')
+display(widgets.VBox([timings_toggle, timings]))
+
+def show_chart(out, chart, quality=None, dpi=None):
+    # Swap the output in a single assignment so it is safe from the worker thread
+    with TRACER.span('encode_png', quality=quality or chart.quality):
+        png = base64.b64encode(chart.to_png(quality, dpi)).decode('ascii')
+    out.outputs = ({'output_type': 'display_data', 'data': {'image/png': png}, 'metadata': {}},)
+
+def compute_first_plot(state):
+    return generate_apr_comparison_data(state['borrow_rate'], state['sfrxusd_interest_rate'])
+
+def render_first_plot(state, result):
+    apr_data, borrow_rates = result
+    utilization_chart.update(
+        apr_data,
+        borrow_rates,
+        state['sfrxusd_interest_rate'],
+        title=f"APR Comparison: frxUSD vs sfrxUSD ({state['borrow_rate']:.0%} Borrow Rate)"
+    )
+    show_chart(out1, utilization_chart)
+
+def refine_first_plot(state, result):
+    show_chart(out1, utilization_chart, 'publication', dpi=NOTEBOOK_DPI)
+
+scheduler.add_target('first', compute_first_plot, render_first_plot, refine_first_plot)
+
+# Connect sliders to the scheduler; the sfrxUSD rate feeds every chart
+borrow_rate_slider.observe(lambda change: scheduler.invalidate('first'), names='value')
+sfrxusd_rate_slider.observe(lambda change: scheduler.invalidate(), names='value')
 
 # Display first output widget
 display(widgets.HTML("<h2>APR Comparison: frxUSD vs sfrxUSD</h2>"))
 display(out1)
 
 # Initial plot
-update_first_plot()'''
+scheduler.invalidate('first')'''
     nb.cells.append(nbf.v4.new_code_cell(analysis))
 
     # Add second visualization with interactive update
-    analysis2 = '''def update_second_plot(change=None):
-    with out2:
-        clear_output(wait=True)
-        plt.figure(figsize=(12, 8))
-        
-        # Generate visualization with current slider values
-        fixed_util_data, fixed_util_borrow_rates = generate_fixed_util_apr_data(
-            utilization_rate=utilization_slider.value,
-            sfrxusd_interest_rate=sfrxusd_rate_slider.value
-        )
-        
-        plot_fixed_util_apr_comparison(
-            fixed_util_data,
-            fixed_util_borrow_rates,
-            sfrxusd_rate_slider.value,
-            utilization_rate=utilization_slider.value,
-            title=f"APR Comparison at {utilization_slider.value:.0%} Utilization"
-        )
-
-# Connect sliders to update function
-utilization_slider.observe(update_second_plot, names='value')
-sfrxusd_rate_slider.observe(update_second_plot, names='value')
+    analysis2 = '''def compute_second_plot(state):
+    return generate_fixed_util_apr_data(
+        utilization_rate=state['utilization_rate'],
+        sfrxusd_interest_rate=state['sfrxusd_interest_rate']
+    )
+
+def render_second_plot(state, result):
+    fixed_util_data, fixed_util_borrow_rates = result
+    borrow_rate_chart.update(
+        fixed_util_data,
+        fixed_util_borrow_rates,
+        state['sfrxusd_interest_rate'],
+        utilization_rate=state['utilization_rate'],
+        title=f"APR Comparison at {state['utilization_rate']:.0%} Utilization"
+    )
+    show_chart(out2, borrow_rate_chart)
+
+def refine_second_plot(state, result):
+    show_chart(out2, borrow_rate_chart, 'publication', dpi=NOTEBOOK_DPI)
+
+scheduler.add_target('second', compute_second_plot, render_second_plot, refine_second_plot)
+
+# Connect sliders to the scheduler
+utilization_slider.observe(lambda change: scheduler.invalidate('second'), names='value')
 
 # Display second output widget
 display(widgets.HTML("<h2>APR Comparison by Utilization</h2>"))
 display(out2)
 
 # Initial plot
-update_second_plot()'''
+scheduler.invalidate('second')'''
     nb.cells.append(nbf.v4.new_code_cell(analysis2))
 
     # Add third visualization with interactive update
-    analysis3 = '''def update_third_plot(change=None):
-    with out3:
-        clear_output(wait=True)
-        plt.figure(figsize=(12, 8))
-        
-        # Generate visualization with current slider values
-        lend_rate_data, lend_rate_borrow_rates = generate_lend_rate_comparison_data(
-            utilization_rate=utilization_slider.value,
-            sfrxusd_interest_rate=sfrxusd_rate_slider.value
-        )
-        
-        plot_lend_rate_apr_comparison(
-            lend_rate_data,
-            lend_rate_borrow_rates,
-            sfrxusd_rate_slider.value,
-            utilization_rate=utilization_slider.value,
-            title=f"APR Comparison by Lend Rate at {utilization_slider.value:.0%} Utilization"
-        )
-
-# Connect sliders to update function
-utilization_slider.observe(update_third_plot, names='value')
-sfrxusd_rate_slider.observe(update_third_plot, names='value')
+    analysis3 = '''def compute_third_plot(state):
+    return generate_lend_rate_comparison_data(
+        utilization_rate=state['utilization_rate'],
+        sfrxusd_interest_rate=state['sfrxusd_interest_rate']
+    )
+
+def render_third_plot(state, result):
+    lend_rate_data, lend_rate_borrow_rates = result
+    lend_rate_chart.update(
+        lend_rate_data,
+        lend_rate_borrow_rates,
+        state['sfrxusd_interest_rate'],
+        utilization_rate=state['utilization_rate'],
+        title=f"APR Comparison by Lend Rate at {state['utilization_rate']:.0%} Utilization"
+    )
+    show_chart(out3, lend_rate_chart)
+
+def refine_third_plot(state, result):
+    show_chart(out3, lend_rate_chart, 'publication', dpi=NOTEBOOK_DPI)
+
+scheduler.add_target('third', compute_third_plot, render_third_plot, refine_third_plot)
+
+# Connect sliders to the scheduler
+utilization_slider.observe(lambda change: scheduler.invalidate('third'), names='value')
 
 # Display third output widget
 display(widgets.HTML("<h2>APR Comparison by Lend Rate</h2>"))
 display(out3)
 
 # Initial plot
-update_third_plot()'''
+scheduler.invalidate('third')'''
     nb.cells.append(nbf.v4.new_code_cell(analysis3))
 
-    # Write the notebook to a file
-    with open('FraxlendAnalysis.ipynb', 'w') as f:
-        nbf.write(nb, f)
+    # Number the cells instead of using random ids, so regenerating an unchanged
+    # notebook leaves the committed file byte-identical
+    for i, cell in enumerate(nb.cells):
+        cell.id = f'cell-{i}'
+    content = nbf.writes(nb)
+    if not content.endswith('\n'):
+        content += '\n'
+
+    try:
+        with open(path) as f:
+            up_to_date = f.read() == content
+    except FileNotFoundError:
+        up_to_date = False
+    if not check and not up_to_date:
+        with open(path, 'w') as f:
+            f.write(content)
+    return up_to_date
 
 if __name__ == '__main__':
-    create_notebook()
-    print("Jupyter notebook 'FraxlendAnalysis.ipynb' has been created successfully!") 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate the Fraxlend analysis notebook.")
+    parser.add_argument('--output', default=NOTEBOOK_PATH, help="Notebook path")
+    parser.add_argument('--check', action='store_true',
+                        help="Exit with an error if the notebook is out of date instead of writing it")
+    args = parser.parse_args()
+
+    up_to_date = create_notebook(args.output, check=args.check)
+    if args.check:
+        if not up_to_date:
+            sys.exit(f"{args.output} is out of date; run python create_notebook.py and commit the result")
+        print(f"{args.output} is up to date")
+    else:
+        print(f"Jupyter notebook '{args.output}' has been created successfully!") 
\ No newline at end of file
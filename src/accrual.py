@@ -0,0 +1,182 @@
+import numpy as np
+
+from data_fetcher import MARKETS
+from fixed_point import SECONDS_PER_YEAR
+from instrumentation import span
+
+# Seconds between compounding events. 'block' assumes Ethereum mainnet's 12 s slot;
+# 'continuous' (0) is the limit of ever-shorter intervals.
+COMPOUNDING_INTERVALS = {
+    'continuous': 0,
+    'second': 1,
+    'block': 12,
+    'hour': 3600,
+    'day': 86400,
+}
+
+def _interval_seconds(compounding):
+    if isinstance(compounding, str):
+        if compounding not in COMPOUNDING_INTERVALS:
+            raise ValueError(f"Unknown compounding {compounding!r}; expected one of {sorted(COMPOUNDING_INTERVALS)} or seconds")
+        return COMPOUNDING_INTERVALS[compounding]
+    if compounding < 0:
+        raise ValueError("Compounding interval must be non-negative")
+    return float(compounding)
+
+def log_growth(apr, step_seconds, compounding='block'):
+    """
+    Log of the balance growth factor over a step at a constant APR.
+
+    With n = step_seconds / interval compounding events the factor is
+    (1 + apr * interval / year) ** n, taken as n * log1p(...) so long horizons and
+    small per-interval rates keep full precision.
+
+    Args:
+        apr (float or numpy.ndarray): Simple APR over the step
+        step_seconds (float or numpy.ndarray): Step length in seconds
+        compounding (str or float): Name in COMPOUNDING_INTERVALS or interval in seconds
+
+    Returns:
+        numpy.ndarray: Log growth per step
+    """
+    interval = _interval_seconds(compounding)
+    apr = np.asarray(apr, dtype=float)
+    step_seconds = np.asarray(step_seconds, dtype=float)
+    if interval == 0:
+        return apr * (step_seconds / SECONDS_PER_YEAR)
+    return (step_seconds / interval) * np.log1p(apr * (interval / SECONDS_PER_YEAR))
+
+def apr_to_apy(apr, compounding='block'):
+    """
+    Annual yield of a constant APR compounded every interval, elementwise.
+    """
+    return np.expm1(log_growth(apr, SECONDS_PER_YEAR, compounding))
+
+def accrue(apr, step_seconds=3600, compounding='block', initial_balance=1.0, path=True, chunk_size=4_000_000):
+    """
+    Compound APR streams into balances and realized APY.
+
+    Each step holds its APR for step_seconds. Balances are the exponential of the
+    running sum of per-step log growth, so there is no per-step loop.
+
+    Args:
+        apr (numpy.ndarray): APRs with time along the last axis, shape (steps,) or
+            (..., steps), e.g. a simulate_rates series
+        step_seconds (float or numpy.ndarray): Step length, scalar or shape (steps,)
+        compounding (str or float): Name in COMPOUNDING_INTERVALS or interval in seconds
+        initial_balance (float or numpy.ndarray): Starting balance, broadcast over paths
+        path (bool): Return the balance after every step; otherwise only the final one
+        chunk_size (int): Elements processed at a time, bounding temporaries
+
+    Returns:
+        dict: 'balance' (path shape, or leading shape if path is False), plus
+        'apy' (realized annualized yield) and 'apr' (time-weighted mean APR) per path
+    """
+    apr = np.asarray(apr, dtype=float)
+    steps = apr.shape[-1]
+    rows = apr.reshape(-1, steps)
+    step_seconds = np.broadcast_to(np.asarray(step_seconds, dtype=float), (steps,))
+    horizon_years = step_seconds.sum() / SECONDS_PER_YEAR
+
+    balance = np.empty(rows.shape if path else rows.shape[:1])
+    total = np.empty(rows.shape[0])
+    mean_apr = np.empty(rows.shape[0])
+    rows_per_chunk = max(1, chunk_size // steps)
+    with span('accrue', paths=rows.shape[0], steps=steps, compounding=compounding):
+        for start in range(0, rows.shape[0], rows_per_chunk):
+            block = rows[start:start + rows_per_chunk]
+            growth = log_growth(block, step_seconds, compounding)
+            mean_apr[start:start + len(block)] = block @ step_seconds / (horizon_years * SECONDS_PER_YEAR)
+            if path:
+                out = balance[start:start + len(block)]
+                np.cumsum(growth, axis=1, out=out)
+                total[start:start + len(block)] = out[:, -1]
+                np.exp(out, out=out)
+            else:
+                total[start:start + len(block)] = growth.sum(axis=1)
+
+    lead = apr.shape[:-1]
+    if path:
+        balance = balance.reshape(apr.shape) * np.asarray(initial_balance, dtype=float)[..., None]
+    else:
+        balance = np.exp(total).reshape(lead) * initial_balance
+    return {
+        'balance': balance,
+        'apy': np.expm1(total / horizon_years).reshape(lead),
+        'apr': mean_apr.reshape(lead)
+    }
+
+def accrue_reference(apr, step_seconds=3600, compounding='block', initial_balance=1.0):
+    """
+    Step-by-step reference for accrue(), looping over every compounding event.
+
+    Meant for validating accrue() on small inputs: the cost is one Python iteration per
+    compounding event per path. Returns the final balances, shape apr.shape[:-1].
+    """
+    interval = _interval_seconds(compounding)
+    apr = np.asarray(apr, dtype=float)
+    rows = apr.reshape(-1, apr.shape[-1])
+    step_seconds = np.broadcast_to(np.asarray(step_seconds, dtype=float), rows.shape[-1:])
+    initial = np.broadcast_to(np.asarray(initial_balance, dtype=float), apr.shape[:-1]).ravel()
+    balances = np.empty(rows.shape[0])
+    for i, row in enumerate(rows):
+        balance = float(initial[i])
+        for rate, seconds in zip(row, step_seconds):
+            if interval == 0:
+                balance *= np.exp(rate * seconds / SECONDS_PER_YEAR)
+                continue
+            periods, fraction = divmod(seconds, interval)
+            for _ in range(int(periods)):
+                balance *= 1 + rate * interval / SECONDS_PER_YEAR
+            if fraction:
+                balance *= (1 + rate * interval / SECONDS_PER_YEAR) ** (fraction / interval)
+        balances[i] = balance
+    return balances.reshape(apr.shape[:-1])
+
+def compound_rates(rates, compounding='block'):
+    """
+    Convert a getRatesArray-style result from APRs to APYs at constant rates.
+
+    Lender lent and unlent APR accrue to the same balance, so the total lender APR is
+    compounded and then split between lentAPR and unlentAPR in proportion; the two
+    still stack to the total APY. borrowAPR is compounded directly.
+
+    Args:
+        rates (dict): {'frxUSDRates': {...}, 'sfrxUSDRates': {...}} of APR arrays
+        compounding (str or float): Name in COMPOUNDING_INTERVALS or interval in seconds
+
+    Returns:
+        dict: The same layout holding APYs
+    """
+    out = {}
+    for market in MARKETS:
+        market_rates = rates[f'{market}Rates']
+        lent = np.asarray(market_rates['lentAPR'], dtype=float)
+        unlent = np.asarray(market_rates['unlentAPR'], dtype=float)
+        total = lent + unlent
+        total_apy = apr_to_apy(total, compounding)
+        lent_share = np.divide(lent, total, out=np.ones(np.shape(total)), where=total != 0)
+        out[f'{market}Rates'] = {
+            'lentAPR': total_apy * lent_share,
+            'unlentAPR': total_apy * (1 - lent_share),
+            'borrowAPR': apr_to_apy(market_rates['borrowAPR'], compounding)
+        }
+    return out
+
+def accrue_rates(rates, step_seconds=3600, compounding='block', initial_balance=1.0, path=True):
+    """
+    Lender balances and borrower debt for both markets from APR streams such as a
+    simulate_rates result.
+
+    Returns:
+        dict: {'frxUSDRates': {'lender': accrue(...), 'borrower': accrue(...)}, 'sfrxUSDRates': ...}
+    """
+    out = {}
+    for market in MARKETS:
+        market_rates = rates[f'{market}Rates']
+        out[f'{market}Rates'] = {
+            'lender': accrue(np.add(market_rates['lentAPR'], market_rates['unlentAPR']),
+                             step_seconds, compounding, initial_balance, path),
+            'borrower': accrue(market_rates['borrowAPR'], step_seconds, compounding, initial_balance, path)
+        }
+    return out
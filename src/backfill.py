@@ -0,0 +1,462 @@
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from chain_reader import SELECTORS, RpcClient, RpcError, read_pair_states
+from fixed_point import RATE_PRECISION, SECONDS_PER_YEAR
+from instrumentation import span
+
+# Events by name: (topic0 = keccak256 of the signature, names of the uint data words)
+EVENTS = {
+    # AddInterest(uint256,uint256,uint256,uint256)
+    'AddInterest': ('0x2b5229f33f1d24d5baab718e1e25d0d86195a9b6d786c2c0868edfb21a460e25',
+                    ('interest_earned', 'rate', 'fees_amount', 'fees_share')),
+    # Deposit(address indexed,address indexed,uint256,uint256)
+    'Deposit': ('0xdcbc1c05240f31ff3ad067ef1ee35ce4997762752e3a095284754544f4c709d7', ('assets', 'shares')),
+    # Withdraw(address indexed,address indexed,address indexed,uint256,uint256)
+    'Withdraw': ('0xfbde797d201c681b91056529119e0b02407c7bb96a4a2c75c01fc9667232c8db', ('assets', 'shares')),
+    # BorrowAsset(address indexed,address indexed,uint256,uint256)
+    'BorrowAsset': ('0x01348584ec81ac7acd52b7d66d9ade986dd909f3d513881c190fc31c90527efe', ('amount', 'shares')),
+    # RepayAsset(address indexed,address indexed,uint256,uint256)
+    'RepayAsset': ('0x9dc1449a0ff0c152e18e8289d865b47acc6e1b76b1ecb239c13d6ee22a9206a7', ('amount', 'shares')),
+    # SyncRewards(uint40,uint40,uint216), emitted by the sfrxUSD vault each rewards cycle
+    'SyncRewards': ('0xc32a546ed958490e37f30335e501e0a39438cb650a4851bfd4b775490af29dad',
+                    ('cycle_end', 'last_sync', 'reward_cycle_amount')),
+}
+EVENT_NAMES = tuple(EVENTS)
+PAIR_EVENTS = ('AddInterest', 'Deposit', 'Withdraw', 'BorrowAsset', 'RepayAsset')
+VAULT_EVENTS = ('SyncRewards',)
+TOKEN_DECIMALS = 18
+
+# Window sizing: windows double while the busiest one returns under half of target_logs
+# and halve above it. A range the node rejects as too large halves the window, and halves
+# target_logs down to the most logs the node has returned for one range, so growth settles
+# below the node's own result limit.
+BACKFILL_PARAMS = {
+    'initial_window': 2_000,
+    'min_window': 1,
+    'max_window': 1_000_000,
+    'target_logs': 2_000,
+    'windows_per_batch': 8,
+}
+
+def _is_range_error(error):
+    # Hosted nodes word "too many results / range too large" differently
+    message = str(error).lower()
+    return (getattr(error, 'code', None) in (-32005, -32602)
+            or any(word in message for word in ('range', 'limit', 'too many', 'more than', 'exceed')))
+
+class RpcLogSource:
+    """
+    Logs, block timestamps and historical calls from a JSON-RPC node, batched.
+
+    With record set, everything read is appended to that JSONL file so the run can be
+    replayed later with FixtureLogSource.
+    """
+    def __init__(self, client=None, record=None):
+        self.client = client or RpcClient()
+        self.record = record
+
+    def _record(self, entries):
+        if self.record:
+            with open(self.record, 'a') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + '\n')
+
+    def get_logs(self, addresses, topics, ranges):
+        """
+        eth_getLogs for each (from, to) block range in one batch; failed ranges hold an RpcError.
+        """
+        calls = [('eth_getLogs', [{'fromBlock': hex(start), 'toBlock': hex(end), 'address': addresses,
+                                   'topics': [topics]}]) for start, end in ranges]
+        results = self.client.batch(calls, return_errors=True)
+        self._record({'log': log} for result in results if not isinstance(result, Exception) for log in result)
+        return results
+
+    def timestamps(self, blocks):
+        blocks = sorted(blocks)
+        headers = self.client.batch([('eth_getBlockByNumber', [hex(block), False]) for block in blocks])
+        out = {block: int(header['timestamp'], 16) for block, header in zip(blocks, headers)}
+        self._record({'block': block, 'timestamp': timestamp} for block, timestamp in out.items())
+        return out
+
+    def call(self, address, signature, blocks):
+        blocks = sorted(blocks)
+        data = SELECTORS[signature]
+        results = self.client.batch([('eth_call', [{'to': address, 'data': data}, hex(block)]) for block in blocks])
+        out = {block: int(result, 16) for block, result in zip(blocks, results)}
+        self._record({'call': [address.lower(), signature], 'block': block, 'result': result}
+                     for block, result in out.items())
+        return out
+
+    def initial_state(self, pairs, block):
+        snapshot = read_pair_states(pairs, client=self.client, block=block)
+        state = {pair.lower(): {'total_assets': values['total_assets'] / 10**TOKEN_DECIMALS,
+                                'total_borrow': values['total_borrow'] / 10**TOKEN_DECIMALS,
+                                'borrow_rate': values['borrow_rate']}
+                 for pair, values in snapshot['pairs'].items()}
+        self._record([{'state': state, 'block': block}])
+        return state
+
+class FixtureLogSource:
+    """
+    Replays a JSONL recording made with RpcLogSource(record=...), or a hand-written one:
+    one object per line, each {'log': <eth_getLogs entry>}, {'block': n, 'timestamp': t},
+    {'call': [address, signature], 'block': n, 'result': value} or {'state': {...}, 'block': n}.
+    """
+    def __init__(self, path, max_logs=None):
+        self.max_logs = max_logs
+        self.logs = []
+        self._timestamps = {}
+        self._calls = {}
+        self._states = {}
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if 'log' in entry:
+                    self.logs.append(entry['log'])
+                elif 'call' in entry:
+                    self._calls[(*entry['call'], entry['block'])] = entry['result']
+                elif 'state' in entry:
+                    self._states[entry['block']] = entry['state']
+                else:
+                    self._timestamps[entry['block']] = entry['timestamp']
+        # A range re-read after an interruption is recorded twice
+        unique = {(int(log['blockNumber'], 16), int(log['logIndex'], 16)): log for log in self.logs}
+        self.logs = [unique[key] for key in sorted(unique)]
+        self._log_blocks = np.array([int(log['blockNumber'], 16) for log in self.logs], dtype=np.int64)
+
+    def get_logs(self, addresses, topics, ranges):
+        addresses = {address.lower() for address in addresses}
+        topics = set(topics)
+        results = []
+        for start, end in ranges:
+            lo, hi = np.searchsorted(self._log_blocks, [start, end + 1])
+            logs = [log for log in self.logs[lo:hi]
+                    if log['address'].lower() in addresses and log['topics'][0] in topics]
+            if self.max_logs is not None and len(logs) > self.max_logs:
+                logs = RpcError(f'query returned more than {self.max_logs} results', -32005)
+            results.append(logs)
+        return results
+
+    def timestamps(self, blocks):
+        return {block: self._timestamps[block] for block in blocks}
+
+    def call(self, address, signature, blocks):
+        return {block: self._calls[(address.lower(), signature, block)] for block in blocks}
+
+    def initial_state(self, pairs, block):
+        return self._states.get(block, {})
+
+def _decode(logs, contracts, source, vault):
+    """
+    Decode logs into event columns.
+
+    Logs of one event type share a layout, so their data words are parsed together: the
+    hex is joined, converted once and viewed as big-endian 64-bit limbs.
+    """
+    n = len(logs)
+    events = {
+        'block': np.array([int(log['blockNumber'], 16) for log in logs], dtype=np.int64),
+        'log_index': np.array([int(log['logIndex'], 16) for log in logs], dtype=np.int32),
+        'contract': np.array([contracts.index(log['address'].lower()) for log in logs], dtype=np.int16),
+        'event': np.full(n, -1, dtype=np.int8),
+        'values': np.full((n, 4), np.nan),
+    }
+    topics = np.array([log['topics'][0] for log in logs], dtype=object)
+    for code, name in enumerate(EVENT_NAMES):
+        topic, fields = EVENTS[name]
+        rows = np.flatnonzero(topics == topic)
+        if not len(rows):
+            continue
+        events['event'][rows] = code
+        raw = bytes.fromhex(''.join(logs[i]['data'][2:2 + 64 * len(fields)] for i in rows))
+        limbs = np.frombuffer(raw, dtype='>u8').reshape(len(rows), len(fields), 4).astype(float)
+        words = limbs @ (2.0 ** np.array([192, 128, 64, 0]))
+        if name == 'AddInterest':
+            words[:, 0] /= 10**TOKEN_DECIMALS
+            words[:, 1] *= SECONDS_PER_YEAR / RATE_PRECISION  # ratePerSec -> APR
+            words[:, 2:] /= 10**TOKEN_DECIMALS
+        elif name == 'SyncRewards':
+            words[:, 2] /= 10**TOKEN_DECIMALS
+        else:
+            words /= 10**TOKEN_DECIMALS
+        events['values'][rows, :len(fields)] = words
+
+    blocks = np.unique(events['block'])
+    timestamps = source.timestamps(blocks.tolist()) if len(blocks) else {}
+    events['timestamp'] = np.array([timestamps[b] for b in events['block'].tolist()], dtype=np.int64)
+    if vault is not None:
+        # SyncRewards carries the reward amount only; the vault size comes from totalAssets()
+        syncs = np.flatnonzero(events['event'] == EVENT_NAMES.index('SyncRewards'))
+        if len(syncs):
+            totals = source.call(vault, 'totalAssets()', set(events['block'][syncs].tolist()))
+            events['values'][syncs, 3] = [totals[b] / 10**TOKEN_DECIMALS for b in events['block'][syncs].tolist()]
+    return events
+
+def _write_chunk(output_dir, first, last, events):
+    path = os.path.join(output_dir, 'chunks', f'{first:012d}-{last:012d}.npz')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **events)
+    os.replace(tmp_path, path)
+
+def _chunk_range(path):
+    first, last = os.path.basename(path)[:-len('.npz')].split('-')
+    return int(first), int(last)
+
+def _load_checkpoint(output_dir, config, initial_window, target_logs):
+    path = os.path.join(output_dir, 'checkpoint.json')
+    if not os.path.exists(path):
+        return {**config, 'next_block': config['from_block'], 'window': initial_window, 'target_logs': target_logs,
+                'max_accepted': 0}
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if any(checkpoint.get(key) != value for key, value in config.items()):
+        raise ValueError(f"{path} belongs to a different backfill; use another output_dir")
+    # A chunk written just before an interruption may lie past the checkpoint
+    for chunk in glob.glob(os.path.join(output_dir, 'chunks', '*.npz')):
+        if _chunk_range(chunk)[0] >= checkpoint['next_block']:
+            os.remove(chunk)
+    return checkpoint
+
+def _save_checkpoint(output_dir, checkpoint):
+    path = os.path.join(output_dir, 'checkpoint.json')
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(f'{path}.tmp', path)
+
+def backfill(source, pairs, from_block, to_block, output_dir, vault=None, progress=print, **params):
+    """
+    Stream pair and vault events over a block range into checkpointed chunks, then write
+    utilization and rate time series.
+
+    The range is read in adaptive windows, windows_per_batch at a time in one JSON-RPC
+    batch. Each batch of decoded events is saved as a chunk before the checkpoint moves
+    on, so an interrupted run resumes where it stopped when called again with the same
+    arguments.
+
+    Args:
+        source (RpcLogSource or FixtureLogSource): Where logs come from
+        pairs (iterable): Fraxlend pair addresses
+        from_block, to_block (int): Inclusive block range
+        output_dir (str): Directory for checkpoint.json, chunks/ and series/
+        vault (str, optional): sfrxUSD vault address, for SyncRewards rate updates
+        progress (callable, optional): Called with one line per batch
+        **params: Overrides for BACKFILL_PARAMS
+
+    Returns:
+        dict: Series from build_series()
+    """
+    unknown = set(params) - set(BACKFILL_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown backfill parameters {sorted(unknown)}; expected {sorted(BACKFILL_PARAMS)}")
+    p = {**BACKFILL_PARAMS, **params}
+    contracts = [pair.lower() for pair in pairs] + ([vault.lower()] if vault else [])
+    topics = [EVENTS[name][0] for name in PAIR_EVENTS + (VAULT_EVENTS if vault else ())]
+    config = {'contracts': contracts, 'vault': vault.lower() if vault else None,
+              'from_block': int(from_block), 'to_block': int(to_block)}
+
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint = _load_checkpoint(output_dir, config, p['initial_window'], p['target_logs'])
+    if 'initial_state' not in checkpoint:
+        checkpoint['initial_state'] = source.initial_state(contracts[:len(pairs)], config['from_block'] - 1)
+        _save_checkpoint(output_dir, checkpoint)
+    window, target_logs = checkpoint['window'], checkpoint['target_logs']
+    start_time = time.perf_counter()
+
+    with span('backfill', contracts=len(contracts), blocks=config['to_block'] - config['from_block'] + 1):
+        while checkpoint['next_block'] <= config['to_block']:
+            ranges = []
+            start = checkpoint['next_block']
+            while len(ranges) < p['windows_per_batch'] and start <= config['to_block']:
+                end = min(start + window - 1, config['to_block'])
+                ranges.append((start, end))
+                start = end + 1
+            with span('get_logs', windows=len(ranges), window=window):
+                results = source.get_logs(contracts, topics, ranges)
+
+            # Keep the windows before the first rejected one
+            done = []
+            rejected = False
+            for (start, end), result in zip(ranges, results):
+                if isinstance(result, Exception):
+                    if not _is_range_error(result):
+                        raise result
+                    if end == start:
+                        raise RpcError(f"Block {start} alone exceeds the node's log limit") from result
+                    window = max(p['min_window'], (end - start + 1) // 2)
+                    target_logs = max(1, target_logs // 2, checkpoint['max_accepted'])
+                    rejected = True
+                    break
+                done.append(((start, end), result))
+            if not done:
+                checkpoint.update(window=window, target_logs=target_logs)
+                continue
+
+            logs = [log for _, result in done for log in result]
+            with span('decode_logs', logs=len(logs)):
+                events = _decode(logs, contracts, source, config['vault'])
+            first, last = done[0][0][0], done[-1][0][1]
+            _write_chunk(output_dir, first, last, events)
+
+            busiest = max(len(result) for _, result in done)
+            checkpoint['max_accepted'] = max(checkpoint['max_accepted'], busiest)
+            if not rejected:
+                if busiest < target_logs // 2:
+                    window = min(window * 2, p['max_window'])
+                elif busiest > target_logs:
+                    window = max(p['min_window'], window // 2)
+            checkpoint.update(next_block=last + 1, window=window, target_logs=target_logs)
+            _save_checkpoint(output_dir, checkpoint)
+            if progress:
+                total = config['to_block'] - config['from_block'] + 1
+                progress(f"blocks {first}-{last}: {len(logs)} logs, "
+                         f"{(last + 1 - config['from_block']) / total:.1%} done, next window {window}")
+
+    series = build_series(output_dir)
+    write_series(output_dir, series)
+    if progress:
+        progress(f"Backfill finished in {time.perf_counter() - start_time:.1f}s")
+    return series
+
+def load_events(output_dir):
+    """
+    All decoded events of a backfill as a DataFrame, in chain order.
+    """
+    chunks = sorted(glob.glob(os.path.join(output_dir, 'chunks', '*.npz')))
+    columns = {'block': [], 'log_index': [], 'timestamp': [], 'contract': [], 'event': [], 'values': []}
+    for chunk in chunks:
+        with np.load(chunk) as data:
+            for name in columns:
+                columns[name].append(data[name])
+    if not chunks:
+        return pd.DataFrame(columns=['block', 'log_index', 'timestamp', 'contract', 'event', 'v0', 'v1', 'v2', 'v3'])
+    values = np.concatenate(columns.pop('values'))
+    frame = pd.DataFrame({name: np.concatenate(parts) for name, parts in columns.items()})
+    for i in range(values.shape[1]):
+        frame[f'v{i}'] = values[:, i]
+    return frame.sort_values(['block', 'log_index'], kind='stable', ignore_index=True)
+
+def build_series(output_dir, freq=None):
+    """
+    Rebuild per-pair utilization and borrow rate series, and the sfrxUSD vault rate, from
+    a backfill's events.
+
+    Totals start from the state read just before from_block and move with every Deposit,
+    Withdraw, BorrowAsset, RepayAsset and AddInterest (interest adds to both totals).
+
+    Args:
+        output_dir (str): Backfill directory
+        freq (str, optional): pandas frequency (e.g. '1h') to resample to, keeping the
+            last value of each period; default keeps one row per event
+
+    Returns:
+        dict: {'pairs': {address: DataFrame}, 'vault': DataFrame or None}. Pair frames
+        hold timestamp, block, total_assets, total_borrow, utilization_rate and
+        borrow_rate; the vault frame holds timestamp, block and sfrxusd_interest_rate.
+    """
+    with open(os.path.join(output_dir, 'checkpoint.json')) as f:
+        checkpoint = json.load(f)
+    events = load_events(output_dir)
+    codes = {name: EVENT_NAMES.index(name) for name in EVENT_NAMES}
+    vault = checkpoint['vault']
+    pair_count = len(checkpoint['contracts']) - (vault is not None)
+    series = {'pairs': {}, 'vault': None}
+
+    def finish(frame):
+        frame.insert(0, 'timestamp', pd.to_datetime(frame.pop('timestamp'), unit='s'))
+        if freq:
+            frame = frame.set_index('timestamp').resample(freq).last().ffill().reset_index()
+        return frame
+
+    with span('build_series', events=len(events)):
+        for index, pair in enumerate(checkpoint['contracts'][:pair_count]):
+            rows = events[(events['contract'] == index) & events['event'].isin([codes[n] for n in PAIR_EVENTS])]
+            event, amount = rows['event'].to_numpy(), rows['v0'].to_numpy()
+            sign_assets = (np.isin(event, [codes['Deposit'], codes['AddInterest']]).astype(float)
+                           - (event == codes['Withdraw']))
+            sign_borrow = (np.isin(event, [codes['BorrowAsset'], codes['AddInterest']]).astype(float)
+                           - (event == codes['RepayAsset']))
+            start = checkpoint['initial_state'].get(pair, {})
+            total_assets = start.get('total_assets', 0.0) + np.cumsum(sign_assets * amount)
+            total_borrow = start.get('total_borrow', 0.0) + np.cumsum(sign_borrow * amount)
+            borrow_rate = pd.Series(np.where(event == codes['AddInterest'], rows['v1'], np.nan)).ffill()
+            series['pairs'][pair] = finish(pd.DataFrame({
+                'timestamp': rows['timestamp'].to_numpy(),
+                'block': rows['block'].to_numpy(),
+                'total_assets': total_assets,
+                'total_borrow': total_borrow,
+                'utilization_rate': np.divide(total_borrow, total_assets, out=np.zeros(len(rows)),
+                                              where=total_assets > 0),
+                'borrow_rate': borrow_rate.fillna(start.get('borrow_rate', np.nan)).to_numpy()
+            }))
+
+        if vault is not None:
+            rows = events[(events['contract'] == pair_count) & (events['event'] == codes['SyncRewards'])]
+            cycle = (rows['v0'] - rows['v1']).to_numpy()
+            rate = np.divide(rows['v2'].to_numpy() * SECONDS_PER_YEAR, cycle * rows['v3'].to_numpy(),
+                             out=np.full(len(rows), np.nan), where=(cycle > 0) & (rows['v3'].to_numpy() > 0))
+            series['vault'] = finish(pd.DataFrame({
+                'timestamp': rows['timestamp'].to_numpy(),
+                'block': rows['block'].to_numpy(),
+                'sfrxusd_interest_rate': rate
+            }))
+    return series
+
+def write_series(output_dir, series):
+    """
+    Write build_series() output as CSV files under <output_dir>/series.
+    """
+    series_dir = os.path.join(output_dir, 'series')
+    os.makedirs(series_dir, exist_ok=True)
+    for pair, frame in series['pairs'].items():
+        frame.to_csv(os.path.join(series_dir, f'{pair}.csv'), index=False)
+    if series['vault'] is not None:
+        series['vault'].to_csv(os.path.join(series_dir, 'vault.csv'), index=False)
+
+def write_store(store, series):
+    """
+    Append build_series() output to a TimeSeriesStore, one row per block, with the
+    sfrxUSD rate in effect at each row. Rows the store already holds are skipped, so
+    a growing backfill can be written again after every run.
+    """
+    for pair, frame in series['pairs'].items():
+        frame = frame.drop_duplicates('block', keep='last')
+        if series['vault'] is not None and len(series['vault']):
+            vault = series['vault'][['block', 'sfrxusd_interest_rate']].drop_duplicates('block', keep='last')
+            frame = pd.merge_asof(frame, vault, on='block')
+        store.append_frame(pair, frame)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backfill Fraxlend pair and sfrxUSD vault events into time series.")
+    parser.add_argument('--rpc-url', default=os.environ.get('FRAXLEND_RPC_URL'), help="JSON-RPC endpoint")
+    parser.add_argument('--fixture', help="Replay this recorded JSONL fixture instead of calling a node")
+    parser.add_argument('--record', help="Append everything read from the node to this JSONL fixture")
+    parser.add_argument('--pairs', nargs='+', required=True, help="Fraxlend pair addresses")
+    parser.add_argument('--vault', help="sfrxUSD vault address")
+    parser.add_argument('--from-block', type=int, required=True)
+    parser.add_argument('--to-block', type=int, required=True)
+    parser.add_argument('--output-dir', default=os.path.join('output', 'backfill'))
+    parser.add_argument('--window', type=int, default=BACKFILL_PARAMS['initial_window'], help="Initial blocks per window")
+    parser.add_argument('--store', help="Also append the series to the time-series store in this directory")
+    args = parser.parse_args()
+
+    source = FixtureLogSource(args.fixture) if args.fixture else RpcLogSource(RpcClient(args.rpc_url), record=args.record)
+    series = backfill(source, args.pairs, args.from_block, args.to_block, args.output_dir, vault=args.vault,
+                      initial_window=args.window)
+    print(f"Series written to {os.path.join(args.output_dir, 'series')}")
+    if args.store:
+        from timeseries_store import TimeSeriesStore
+
+        write_store(TimeSeriesStore(args.store), series)
+        print(f"Appended to the time-series store in {args.store}")
@@ -0,0 +1,296 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from accrual import log_growth
+from data_fetcher import APR_TYPES, MARKETS, getBorrowRatesArray, getRatesArray
+from fixed_point import SECONDS_PER_YEAR
+from instrumentation import span
+
+HISTORY_COLUMNS = ('utilization_rate', 'borrow_rate', 'sfrxusd_interest_rate')
+
+# Cumulative return series: lenders' balance growth and borrowers' debt growth per market
+RETURN_SERIES = ('frxUSD_lender', 'sfrxUSD_lender', 'frxUSD_borrower', 'sfrxUSD_borrower')
+
+# What the sfrxUSD counterfactual keeps from history: 'borrow_rate' charges borrowers the
+# same rate, so lenders also earn the unlent yield; 'lend_rate' pays lenders the same
+# yield, so borrowers pay the lower borrow rate that funds it (floored at zero).
+HOLD = ('borrow_rate', 'lend_rate')
+
+def load_history(path):
+    """
+    Read a utilization / borrow rate / sfrxUSD rate history from CSV or Parquet, e.g. a
+    backfill series file. Needs a 'timestamp' column (seconds or dates) and HISTORY_COLUMNS.
+    """
+    if os.path.splitext(path)[1].lower() in ('.parquet', '.pq'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+def _ffill(values):
+    missing = np.isnan(values)
+    if not missing.any():
+        return values
+    index = np.where(missing, 0, np.arange(len(values)))
+    return values[np.maximum.accumulate(index)]
+
+def _history_arrays(history):
+    # DataFrame or dict of arrays (e.g. TimeSeriesStore.range) -> seconds and float columns,
+    # forward-filled, dropping leading rows that still lack a value
+    timestamp = history['timestamp']
+    if pd.api.types.is_datetime64_any_dtype(timestamp) or getattr(timestamp, 'dtype', None) == object:
+        timestamp = pd.to_datetime(timestamp).astype('datetime64[s]').astype(np.int64)
+    timestamp = np.asarray(timestamp, dtype=np.int64)
+    if np.any(np.diff(timestamp) < 0):
+        raise ValueError("History must be sorted by timestamp")
+    missing = [name for name in HISTORY_COLUMNS if name not in history]
+    if missing:
+        raise ValueError(f"History lacks columns {missing}")
+    columns = {name: _ffill(np.asarray(history[name], dtype=float)) for name in HISTORY_COLUMNS}
+    valid = np.logical_and.reduce([~np.isnan(values) for values in columns.values()])
+    first = int(np.argmax(valid)) if valid.any() else len(valid)
+    return timestamp[first:], {name: values[first:] for name, values in columns.items()}
+
+def _market_rates(columns, hold):
+    # Realized frxUSD rates and the sfrxUSD counterfactual, per row
+    u, b, s = (columns[name] for name in HISTORY_COLUMNS)
+    actual = getRatesArray(u, b, s)
+    frxusd = actual['frxUSDRates']
+    if hold == 'borrow_rate':
+        sfrxusd = actual['sfrxUSDRates']
+    else:
+        lend_rate = frxusd['lentAPR'] + frxusd['unlentAPR']
+        borrow = getBorrowRatesArray(u, lend_rate, s)['sfrxUSDRates']['borrowAPR']
+        # Idle markets have no defined rate; there the unlent yield alone beats it anyway
+        borrow = np.maximum(np.nan_to_num(borrow, nan=0.0), 0.0)
+        sfrxusd = getRatesArray(u, borrow, s)['sfrxUSDRates']
+    return {'frxUSD': frxusd, 'sfrxUSD': sfrxusd}
+
+def _rolling_windows(timestamp, window):
+    # Start row and length of the trailing window ending at each row; shared by every series
+    start = np.searchsorted(timestamp, timestamp - window, 'left')
+    elapsed = (timestamp - timestamp[start]).astype(float)
+    # Rows before a full window has passed get NaN
+    elapsed[(timestamp - timestamp[0] < window) | (elapsed == 0)] = np.nan
+    return start, elapsed
+
+def _rolling_apy(log_wealth, windows):
+    # Annualized growth over each trailing window
+    start, elapsed = windows
+    return np.expm1((log_wealth - log_wealth[start]) * (SECONDS_PER_YEAR / elapsed))
+
+def _drawdown(log_wealth):
+    return np.expm1(log_wealth - np.maximum.accumulate(log_wealth))
+
+def _weighted_means(starts, step_seconds, rates, columns):
+    # Time-weighted mean APRs and inputs over contiguous row groups beginning at starts
+    weight = np.add.reduceat(step_seconds, starts)
+    def mean(values):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.add.reduceat(values * step_seconds, starts) / weight
+    means = {f'{market}_{apr_type}': mean(rates[market][apr_type]) for market in MARKETS for apr_type in APR_TYPES}
+    means.update({name: mean(columns[name]) for name in HISTORY_COLUMNS})
+    means['seconds'] = weight
+    return means
+
+def _period_rates(timestamp, step_seconds, rates, columns, freq):
+    # Rows are sorted, so each calendar period is a contiguous run found by bisection
+    first, last = pd.to_datetime([timestamp[0], timestamp[-1]], unit='s')
+    periods = pd.period_range(first, last, freq=freq)
+    bounds = periods.start_time.astype('datetime64[s]').astype(np.int64).to_numpy()
+    starts = np.searchsorted(timestamp, bounds, 'left')
+    starts[0] = 0
+    keep = np.r_[starts[1:], len(timestamp)] > starts
+    frame = pd.DataFrame(_weighted_means(starts[keep], step_seconds, rates, columns), index=periods[keep].astype(str))
+    return frame[frame['seconds'] > 0]
+
+def backtest(history, compounding='block', hold='borrow_rate', window=30 * 86400, end=None, freq='M',
+             series=True):
+    """
+    Replay a pair's history in the frxUSD market it ran as, and as if it had been
+    sfrxUSD-denominated.
+
+    Each row's rates hold until the next row (the last until end). Balances are the
+    exponential of the running sum of per-row log growth, so a multi-year per-block
+    history costs a few passes over its arrays.
+
+    Args:
+        history (pandas.DataFrame or dict): 'timestamp' (seconds or dates) and
+            HISTORY_COLUMNS, sorted by time; gaps are forward-filled
+        compounding (str or float): Compounding interval, as for accrual.log_growth
+        hold (str): 'borrow_rate' or 'lend_rate' (see HOLD)
+        window (float): Rolling-window length in seconds
+        end (int, optional): Timestamp the last row's rates hold until
+        freq (str): pandas period alias for the per-period rates, e.g. 'M', 'W' or 'D'
+        series (bool): Include per-row series; False keeps only the summary and
+            periods, which is much smaller to return from worker processes
+
+    Returns:
+        dict: 'summary' (scalars), 'periods' (DataFrame of time-weighted APRs per period,
+        the layout plot_backtest draws) and, with series, 'timestamp', 'cumulative'
+        (cumulative return per RETURN_SERIES name), 'excess_lender' (sfrxUSD over frxUSD
+        lender wealth, minus one), 'borrower_savings' (one minus sfrxUSD over frxUSD
+        debt), 'rolling' (trailing-window APYs) and 'drawdown' (of excess_lender and
+        borrower_savings wealth)
+    """
+    if hold not in HOLD:
+        raise ValueError(f"Unknown hold {hold!r}; expected one of {HOLD}")
+    timestamp, columns = _history_arrays(history)
+    if len(timestamp) < 2:
+        raise ValueError("Backtest needs at least two rows of history")
+    end = int(timestamp[-1] if end is None else end)
+
+    with span('backtest', rows=len(timestamp)):
+        step_seconds = np.diff(timestamp, append=end).astype(float)
+        rates = _market_rates(columns, hold)
+        # Log wealth at each row, before that row's step accrues
+        log_wealth = {}
+        for market in MARKETS:
+            market_rates = rates[market]
+            for side, apr in (('lender', market_rates['lentAPR'] + market_rates['unlentAPR']),
+                              ('borrower', market_rates['borrowAPR'])):
+                growth = log_growth(apr, step_seconds, compounding)
+                wealth = np.empty(len(growth) + 1)
+                wealth[0] = 0.0
+                np.cumsum(growth, out=wealth[1:])
+                log_wealth[f'{market}_{side}'] = wealth
+        excess = log_wealth['sfrxUSD_lender'] - log_wealth['frxUSD_lender']
+        savings = log_wealth['frxUSD_borrower'] - log_wealth['sfrxUSD_borrower']
+        # Rows plus the end point
+        times = np.append(timestamp, end)
+        years = (end - timestamp[0]) / SECONDS_PER_YEAR
+
+        windows = _rolling_windows(times, window)
+        # The summary only needs the lender windows
+        rolling = {name: _rolling_apy(log_wealth[name], windows)
+                   for name in (RETURN_SERIES if series else ('frxUSD_lender', 'sfrxUSD_lender'))}
+        rolling['excess_lender'] = rolling['sfrxUSD_lender'] - rolling['frxUSD_lender']
+        drawdown = {'excess_lender': _drawdown(excess), 'borrower_savings': _drawdown(savings)}
+
+        summary = {'start': int(timestamp[0]), 'end': end, 'years': years, 'rows': len(timestamp), 'hold': hold}
+        for name in RETURN_SERIES:
+            summary[f'{name}_return'] = float(np.expm1(log_wealth[name][-1]))
+            summary[f'{name}_apy'] = float(np.expm1(log_wealth[name][-1] / years)) if years else np.nan
+        summary['excess_lender_apy'] = summary['sfrxUSD_lender_apy'] - summary['frxUSD_lender_apy']
+        summary['borrower_savings_apy'] = summary['frxUSD_borrower_apy'] - summary['sfrxUSD_borrower_apy']
+        for name, values in drawdown.items():
+            worst = int(np.argmin(values))
+            summary[f'{name}_max_drawdown'] = float(values[worst])
+            summary[f'{name}_max_drawdown_time'] = int(times[worst])
+        rolling_excess = rolling['excess_lender'][~np.isnan(rolling['excess_lender'])]
+        if len(rolling_excess):
+            summary.update({
+                'rolling_excess_min': float(rolling_excess.min()),
+                'rolling_excess_median': float(np.median(rolling_excess)),
+                'rolling_excess_max': float(rolling_excess.max()),
+                'rolling_excess_share_positive': float(np.mean(rolling_excess > 0)),
+            })
+        overall = _weighted_means([0], step_seconds, rates, columns)
+        summary.update({name: float(values[0]) for name, values in overall.items() if name != 'seconds'})
+
+        result = {'summary': summary, 'periods': _period_rates(timestamp, step_seconds, rates, columns, freq)}
+        if series:
+            result.update({
+                'timestamp': times,
+                'cumulative': {name: np.expm1(log_wealth[name]) for name in RETURN_SERIES},
+                'excess_lender': np.expm1(excess),
+                'borrower_savings': -np.expm1(-savings),
+                'rolling': rolling,
+                'drawdown': drawdown,
+            })
+    return result
+
+def _run_pair(task):
+    # Worker entry point; store-backed tasks memory-map their pair in the worker
+    history = task['history']
+    if history is None:
+        from timeseries_store import TimeSeriesStore
+        history = TimeSeriesStore(task['store']).range(task['pair'], task['start'], task['end'])
+    return backtest(history, **task['options'])
+
+def backtest_pairs(histories=None, store=None, pairs=None, start=None, end=None, workers=None, **options):
+    """
+    Backtest many pairs, in parallel across processes.
+
+    Args:
+        histories (dict, optional): {pair: history}, as for backtest()
+        store (str, optional): TimeSeriesStore directory to read pairs from instead;
+            workers map the store themselves, so no history is pickled
+        pairs (iterable, optional): Pairs to read from the store (default: all)
+        start, end (optional): Time range to read from the store
+        workers (int, optional): Worker processes (default: CPU count); 1 runs in-process
+        **options: Passed to backtest()
+
+    Returns:
+        dict: {pair: backtest() result}, in input order
+    """
+    if histories is not None:
+        tasks = [{'pair': pair, 'history': history, 'options': options} for pair, history in histories.items()]
+    else:
+        from timeseries_store import TimeSeriesStore
+        pairs = list(pairs) if pairs is not None else TimeSeriesStore(store).pairs()
+        tasks = [{'pair': pair, 'history': None, 'store': store, 'start': start, 'end': end, 'options': options}
+                 for pair in pairs]
+
+    workers = min(workers or os.cpu_count(), len(tasks)) or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    with span('backtest_pairs', pairs=len(tasks), workers=workers):
+        try:
+            results = list(executor.map(_run_pair, tasks) if executor else map(_run_pair, tasks))
+        finally:
+            if executor:
+                executor.shutdown()
+    return {task['pair']: result for task, result in zip(tasks, results)}
+
+def summary_frame(results):
+    """
+    One row per pair of backtest summaries, with start/end as dates. The time-weighted
+    APR columns also make it a plot_backtest input, comparing pairs instead of periods.
+    """
+    frame = pd.DataFrame.from_dict({pair: result['summary'] for pair, result in results.items()}, orient='index')
+    for column in ('start', 'end', 'excess_lender_max_drawdown_time', 'borrower_savings_max_drawdown_time'):
+        frame[column] = pd.to_datetime(frame[column], unit='s')
+    return frame
+
+if __name__ == "__main__":
+    import argparse
+
+    from accrual import COMPOUNDING_INTERVALS
+
+    parser = argparse.ArgumentParser(description="Backtest Fraxlend pairs as if they had been sfrxUSD-denominated.")
+    parser.add_argument('histories', nargs='*', help="CSV/Parquet history files, one per pair")
+    parser.add_argument('--store', help="Read pairs from this time-series store instead")
+    parser.add_argument('--pairs', nargs='+', default=None, help="Pairs to read from the store (default: all)")
+    parser.add_argument('--hold', choices=HOLD, default='borrow_rate')
+    parser.add_argument('--compounding', choices=list(COMPOUNDING_INTERVALS), default='block')
+    parser.add_argument('--window-days', type=float, default=30, help="Rolling window")
+    parser.add_argument('--freq', default='M', help="Period of the per-period chart, e.g. M, W or D")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output-dir', default=os.path.join('output', 'backtest'))
+    args = parser.parse_args()
+    if not args.histories and not args.store:
+        parser.error("Give history files or --store")
+
+    from visualization import plot_backtest
+
+    options = {'hold': args.hold, 'compounding': args.compounding, 'window': args.window_days * 86400,
+               'freq': args.freq, 'series': False}
+    if args.store:
+        results = backtest_pairs(store=args.store, pairs=args.pairs, workers=args.workers, **options)
+    else:
+        histories = {os.path.splitext(os.path.basename(path))[0]: load_history(path) for path in args.histories}
+        results = backtest_pairs(histories, workers=args.workers, **options)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    summary = summary_frame(results)
+    summary.to_csv(os.path.join(args.output_dir, 'summary.csv'))
+    for pair, result in results.items():
+        plot_backtest(result['periods'], title=f"Realized vs sfrxUSD-denominated APR: {pair}",
+                      save_path=os.path.join(args.output_dir, f'{pair}.png'))
+    if len(results) > 1:
+        plot_backtest(summary, title="Realized vs sfrxUSD-denominated APR by pair",
+                      save_path=os.path.join(args.output_dir, 'pairs.png'))
+    print(summary[['years', 'frxUSD_lender_apy', 'sfrxUSD_lender_apy', 'excess_lender_apy',
+                   'excess_lender_max_drawdown']].to_string())
+    print(f"Summary and charts written to {args.output_dir}")
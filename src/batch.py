@@ -0,0 +1,247 @@
+import csv
+import itertools
+import json
+import os
+import time
+
+# Parameters each chart type reads from a scenario, with their defaults
+CHART_PARAMS = {
+    'utilization': {'borrow_rate': 0.10, 'sfrxusd_interest_rate': 0.08},
+    'borrow_rate': {'utilization_rate': 0.85, 'sfrxusd_interest_rate': 0.08, 'max_borrow_rate': 0.20},
+    'lend_rate': {'utilization_rate': 0.85, 'sfrxusd_interest_rate': 0.08, 'max_lend_rate': 0.20},
+}
+
+def load_manifest(path):
+    """
+    Load scenarios from a JSON, YAML or CSV manifest.
+
+    JSON and YAML manifests hold either a list of scenarios or a mapping with a
+    'scenarios' list. CSV manifests have one scenario per row. Every scenario needs a
+    'chart' key (one of CHART_PARAMS) and may set that chart's parameters, 'title',
+    'name', 'quality' (a render tier), 'format' (png, svg or pdf) and 'apy' (a compounding
+    interval for APY markers). Parameters given as lists are expanded into a grid, see
+    expand_scenarios.
+
+    Args:
+        path (str): Path to the manifest file
+
+    Returns:
+        list: Expanded scenario dicts
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, 'r', newline='') as f:
+        if ext == '.json':
+            manifest = json.load(f)
+        elif ext in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError as e:
+                raise ImportError("YAML manifests require PyYAML (pip install pyyaml)") from e
+            manifest = yaml.safe_load(f)
+        elif ext == '.csv':
+            manifest = [_parse_csv_row(row) for row in csv.DictReader(f)]
+        else:
+            raise ValueError(f"Unsupported manifest format: {ext}")
+
+    if isinstance(manifest, dict):
+        manifest = manifest.get('scenarios', [])
+    return expand_scenarios(manifest)
+
+def _parse_csv_row(row):
+    scenario = {}
+    for key, value in row.items():
+        if value is None or value == '':
+            continue
+        try:
+            scenario[key] = float(value)
+        except ValueError:
+            scenario[key] = value
+    return scenario
+
+def expand_scenarios(scenarios):
+    """
+    Expand list-valued parameters into the Cartesian product of scenarios,
+    e.g. {'chart': 'borrow_rate', 'utilization_rate': [0.5, 0.85], 'sfrxusd_interest_rate': [0.04, 0.08]}
+    becomes four scenarios.
+
+    Raises:
+        ValueError: If a chart type is unknown or two scenarios share a name
+    """
+    expanded = []
+    for scenario in scenarios:
+        chart = scenario.get('chart')
+        if chart not in CHART_PARAMS:
+            raise ValueError(f"Unknown chart type {chart!r}; expected one of {sorted(CHART_PARAMS)}")
+
+        grid_keys = [key for key, value in scenario.items() if isinstance(value, (list, tuple))]
+        for values in itertools.product(*(scenario[key] for key in grid_keys)):
+            point = dict(scenario)
+            point.update(zip(grid_keys, values))
+            for key, default in CHART_PARAMS[chart].items():
+                point[key] = float(point.get(key, default))
+            if grid_keys or 'name' not in point:
+                point['name'] = scenario_name(point)
+            expanded.append(point)
+
+    # Each name is an output file; duplicates would overwrite each other's chart
+    seen, duplicates = set(), []
+    for point in expanded:
+        if point['name'] in seen and point['name'] not in duplicates:
+            duplicates.append(point['name'])
+        seen.add(point['name'])
+    if duplicates:
+        raise ValueError(f"Scenario names must be unique; duplicated: {duplicates}")
+    return expanded
+
+def scenario_name(scenario):
+    """
+    Build a file-name-safe identifier from a scenario's chart type and parameters.
+    """
+    parts = [scenario['chart']]
+    for key in CHART_PARAMS[scenario['chart']]:
+        parts.append(f"{key}={scenario[key]:g}")
+    if 'name' in scenario:
+        parts.insert(0, str(scenario['name']))
+    return '_'.join(parts)
+
+def render_scenario(scenario, output_dir):
+    """
+    Generate and save the chart for a single scenario.
+
+    Args:
+        scenario (dict): Expanded scenario
+        output_dir (str): Directory to write the chart into
+
+    Returns:
+        dict: Results index record with the scenario, output path, timing and status
+    """
+    from instrumentation import TRACER
+
+    with TRACER.trace('scenario', scenario=scenario['name'], chart=scenario['chart']):
+        return _render_scenario(scenario, output_dir)
+
+def scenario_series(scenario):
+    """
+    Evaluate the APR series a scenario's chart plots.
+
+    Args:
+        scenario (dict): Expanded scenario
+
+    Returns:
+        RateSeries: The chart's sweep
+    """
+    from data_fetcher import (
+        generate_apr_comparison_data,
+        generate_fixed_util_apr_data,
+        generate_lend_rate_comparison_data
+    )
+
+    chart = scenario['chart']
+    if chart == 'utilization':
+        return generate_apr_comparison_data(scenario['borrow_rate'], scenario['sfrxusd_interest_rate'], compact=True)
+    if chart == 'borrow_rate':
+        return generate_fixed_util_apr_data(
+            scenario['utilization_rate'], scenario['sfrxusd_interest_rate'], scenario['max_borrow_rate'], compact=True
+        )
+    return generate_lend_rate_comparison_data(
+        scenario['utilization_rate'], scenario['sfrxusd_interest_rate'], scenario['max_lend_rate'], compact=True
+    )
+
+def _render_scenario(scenario, output_dir):
+    from visualization import (
+        plot_stacked_apr_comparison,
+        plot_fixed_util_apr_comparison,
+        plot_lend_rate_apr_comparison
+    )
+
+    start = time.perf_counter()
+    save_path = os.path.join(output_dir, f"{scenario['name']}.{scenario.get('format', 'png')}")
+    record = {'name': scenario['name'], 'scenario': scenario, 'path': save_path}
+    chart = scenario['chart']
+    sfrxusd_interest_rate = scenario['sfrxusd_interest_rate']
+    quality = scenario.get('quality', 'publication')
+    apy = scenario.get('apy') or None
+    try:
+        data = scenario_series(scenario)
+        if chart == 'utilization':
+            title = scenario.get('title') or f"APR Comparison: frxUSD vs sfrxUSD ({scenario['borrow_rate']:.0%} Borrow Rate)"
+            plot_stacked_apr_comparison(data, None, sfrxusd_interest_rate, title=title, save_path=save_path,
+                                        quality=quality, apy=apy)
+        elif chart == 'borrow_rate':
+            plot_fixed_util_apr_comparison(
+                data, None, sfrxusd_interest_rate,
+                utilization_rate=scenario['utilization_rate'],
+                title=scenario.get('title'),
+                save_path=save_path,
+                quality=quality,
+                apy=apy
+            )
+        else:
+            plot_lend_rate_apr_comparison(
+                data, None, sfrxusd_interest_rate,
+                utilization_rate=scenario['utilization_rate'],
+                title=scenario.get('title') or f"APR Comparison by Lend Rate at {scenario['utilization_rate']:.0%} Utilization",
+                save_path=save_path,
+                quality=quality,
+                apy=apy
+            )
+        record['status'] = 'ok'
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = repr(e)
+    record['seconds'] = time.perf_counter() - start
+    return record
+
+def _init_worker(render_cache_dir=None):
+    # Each worker renders headless with its own Agg backend
+    import matplotlib
+    matplotlib.use('Agg')
+    if render_cache_dir:
+        import visualization
+        from render_cache import RenderCache
+        visualization.RENDER_CACHE = RenderCache(render_cache_dir)
+
+def run_batch(scenarios, output_dir, workers=None, progress=print, render_cache_dir=None,
+              quality='publication', fmt='png', apy=None):
+    """
+    Render scenarios on a process pool and write a results index.
+
+    Args:
+        scenarios (list): Expanded scenarios, e.g. from load_manifest
+        output_dir (str): Directory for the charts and index.json
+        workers (int, optional): Number of worker processes (default: CPU count)
+        progress (callable, optional): Called with one line per finished scenario
+        render_cache_dir (str, optional): RenderCache directory shared by the workers
+        quality (str): Render tier for scenarios that do not set 'quality'
+        fmt (str): File format for scenarios that do not set 'format'
+        apy (str, optional): APY compounding interval for scenarios that do not set 'apy'
+
+    Returns:
+        list: Results index records in manifest order
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    os.makedirs(output_dir, exist_ok=True)
+    scenarios = [{'quality': quality, 'format': fmt, 'apy': apy, **scenario} for scenario in scenarios]
+    records = [None] * len(scenarios)
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(render_cache_dir,)) as executor:
+        futures = {
+            executor.submit(render_scenario, scenario, output_dir): i
+            for i, scenario in enumerate(scenarios)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            records[futures[future]] = record
+            if progress:
+                progress(f"[{done}/{len(scenarios)}] {record['status']:5} {record['name']} ({record['seconds']:.2f}s)")
+
+    index = {
+        'elapsed_seconds': time.perf_counter() - start,
+        'scenarios': records
+    }
+    with open(os.path.join(output_dir, 'index.json'), 'w') as f:
+        json.dump(index, f, indent=2)
+    return records
@@ -0,0 +1,297 @@
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from fixed_point import RATE_PRECISION, SECONDS_PER_YEAR
+from instrumentation import span
+
+# 4-byte selectors (first bytes of keccak256 of the signature) of the views we read
+SELECTORS = {
+    'totalAsset()': '0xf9557ccb',
+    'totalBorrow()': '0x8285ef40',
+    'currentRateInfo()': '0x95d14ca8',
+    'convertToAssets(uint256)': '0x07a2d13a',
+    'totalAssets()': '0x01e1d114',
+}
+PAIR_CALLS = ('totalAsset()', 'totalBorrow()', 'currentRateInfo()')
+
+# Client defaults. Backoff doubles per attempt from `backoff` seconds, with jitter.
+RPC_PARAMS = {
+    'timeout': 10.0,
+    'retries': 4,
+    'backoff': 0.25,
+    'max_backoff': 8.0,
+    'batch_size': 100,
+    'pool_size': 8,
+}
+
+class RpcError(RuntimeError):
+    """A JSON-RPC error response, or an HTTP failure that outlasted the retries."""
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+class RpcClient:
+    """
+    JSON-RPC client sending batched requests over one pooled HTTP session.
+
+    Calls are grouped into batches of batch_size; several batches go out concurrently,
+    up to pool_size connections. Connection errors, timeouts, HTTP 429 and 5xx responses
+    are retried with jittered exponential backoff (honoring Retry-After).
+
+    Environment:
+        FRAXLEND_RPC_URL: Default endpoint
+    """
+    def __init__(self, url=None, session=None, **params):
+        unknown = set(params) - set(RPC_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown RPC parameters {sorted(unknown)}; expected {sorted(RPC_PARAMS)}")
+        self.url = url or os.environ.get('FRAXLEND_RPC_URL')
+        if not self.url:
+            raise ValueError("No RPC endpoint; pass url or set FRAXLEND_RPC_URL")
+        self.params = {**RPC_PARAMS, **params}
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.params['pool_size'])
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.requests_sent = 0
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _sleep(self, attempt, retry_after=None):
+        delay = min(self.params['backoff'] * 2**attempt, self.params['max_backoff'])
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        time.sleep(delay * (0.5 + random.random() / 2))
+
+    def _post(self, payload):
+        p = self.params
+        for attempt in range(p['retries'] + 1):
+            last = attempt == p['retries']
+            with self._lock:
+                self.requests_sent += 1
+            try:
+                response = self.session.post(self.url, json=payload, timeout=p['timeout'])
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last:
+                    raise RpcError(f"RPC request failed after {attempt + 1} attempts: {e!r}") from e
+                self._sleep(attempt)
+                continue
+            if response.status_code == 429 or response.status_code >= 500:
+                if last:
+                    raise RpcError(f"RPC endpoint returned HTTP {response.status_code}", code=response.status_code)
+                retry_after = response.headers.get('Retry-After')
+                self._sleep(attempt, float(retry_after) if retry_after and retry_after.isdigit() else None)
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    def _send_batch(self, calls, return_errors=False):
+        payload = [{'jsonrpc': '2.0', 'id': i, 'method': method, 'params': params}
+                   for i, (method, params) in enumerate(calls)]
+        with span('rpc_batch', calls=len(calls)):
+            replies = self._post(payload)
+        if isinstance(replies, dict):
+            # Some endpoints answer a rejected batch with a single error object
+            error = replies.get('error') or {}
+            raise RpcError(error.get('message', 'Malformed batch response'), error.get('code'))
+        by_id = {reply.get('id'): reply for reply in replies}
+        results = []
+        for i, (method, _) in enumerate(calls):
+            reply = by_id.get(i)
+            if reply is None:
+                raise RpcError(f"No response for {method} (id {i})")
+            if 'error' in reply:
+                error = RpcError(f"{method}: {reply['error'].get('message')}", reply['error'].get('code'))
+                if not return_errors:
+                    raise error
+                results.append(error)
+            else:
+                results.append(reply['result'])
+        return results
+
+    def batch(self, calls, return_errors=False):
+        """
+        Send (method, params) calls and return their results in order.
+
+        Args:
+            calls (list): (method, params) pairs
+            return_errors (bool): Put an RpcError in place of each failed call instead
+                of raising the first one
+        """
+        size = self.params['batch_size']
+        chunks = [calls[i:i + size] for i in range(0, len(calls), size)]
+        if len(chunks) <= 1:
+            return self._send_batch(chunks[0], return_errors) if chunks else []
+        with ThreadPoolExecutor(max_workers=min(len(chunks), self.params['pool_size'])) as executor:
+            replies = executor.map(lambda chunk: self._send_batch(chunk, return_errors), chunks)
+            return [result for chunk in replies for result in chunk]
+
+    def call(self, method, params=()):
+        return self.batch([(method, list(params))])[0]
+
+class BlockCache:
+    """
+    On-disk cache of call results at fixed block numbers.
+
+    State at a given block never changes, so entries never expire. Each block is one
+    small JSON file, <directory>/<chain id>/<block>.json, mapping call keys to raw results.
+
+    Environment:
+        FRAXLEND_RPC_CACHE: Default directory
+    """
+    def __init__(self, directory=None):
+        self.directory = directory or os.environ.get('FRAXLEND_RPC_CACHE', os.path.join('output', 'rpc_cache'))
+        self._lock = threading.Lock()
+
+    def _path(self, chain_id, block):
+        return os.path.join(self.directory, str(chain_id), f'{block}.json')
+
+    def get(self, chain_id, block):
+        try:
+            with open(self._path(chain_id, block)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def put(self, chain_id, block, entries):
+        if not entries:
+            return
+        path = self._path(chain_id, block)
+        with self._lock:
+            merged = {**self.get(chain_id, block), **entries}
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(merged, f)
+            os.replace(tmp_path, path)
+
+def _eth_call(address, signature, block, argument=None):
+    data = SELECTORS[signature] + (f'{argument:064x}' if argument is not None else '')
+    return f'{address.lower()}:{data}', ('eth_call', [{'to': address, 'data': data}, hex(block)])
+
+def _words(result):
+    # Split ABI-encoded return data into 256-bit integers
+    raw = bytes.fromhex(result[2:])
+    return [int.from_bytes(raw[i:i + 32], 'big') for i in range(0, len(raw), 32)]
+
+def _fetch(client, cache, chain_id, requests_by_block):
+    # requests_by_block: {block: {cache key: (method, params)}} -> {block: {key: result}}
+    results = {}
+    missing = []
+    for block, calls in requests_by_block.items():
+        cached = cache.get(chain_id, block) if cache is not None else {}
+        results[block] = {key: cached[key] for key in calls if key in cached}
+        missing += [(block, key, call) for key, call in calls.items() if key not in cached]
+    if missing:
+        replies = client.batch([call for _, _, call in missing])
+        fetched = {}
+        for (block, key, _), reply in zip(missing, replies):
+            if key == 'header':
+                # Only the timestamp is used; block headers are large
+                reply = {'timestamp': reply['timestamp']}
+            results[block][key] = reply
+            fetched.setdefault(block, {})[key] = reply
+        if cache is not None:
+            for block, entries in fetched.items():
+                cache.put(chain_id, block, entries)
+    return results
+
+def read_pair_states(pairs, vault=None, client=None, block=None, cache=None, lookback_seconds=86400,
+                     block_time=12):
+    """
+    Read Fraxlend pair state, and the sfrxUSD vault rate, at one block in a single batch.
+
+    Args:
+        pairs (iterable): Pair contract addresses
+        vault (str, optional): sfrxUSD (ERC-4626) vault address; its rate is the share price
+            growth over lookback_seconds, annualized
+        client (RpcClient, optional): Defaults to RpcClient() on FRAXLEND_RPC_URL
+        block (int, optional): Block number (default: latest)
+        cache (BlockCache, optional): Reuse results already read at the same block
+        lookback_seconds (float): Window for the vault rate
+        block_time (float): Seconds per block, used to pick the lookback block
+
+    Returns:
+        dict: 'block', 'timestamp', 'sfrxusd_interest_rate' (None without a vault) and
+        'pairs', mapping each address to total_assets, total_borrow, utilization_rate,
+        borrow_rate and full_utilization_rate (APRs) and rate_per_sec
+    """
+    client = client or RpcClient()
+    pairs = list(pairs)
+    with span('read_pair_states', pairs=len(pairs)):
+        head = client.batch([('eth_chainId', []), ('eth_blockNumber', [])])
+        chain_id = int(head[0], 16)
+        block = int(head[1], 16) if block is None else int(block)
+
+        calls = {block: {'header': ('eth_getBlockByNumber', [hex(block), False])}}
+        for pair in pairs:
+            for signature in PAIR_CALLS:
+                key, call = _eth_call(pair, signature, block)
+                calls[block][key] = call
+        past_block = None
+        if vault is not None:
+            past_block = max(block - int(round(lookback_seconds / block_time)), 0)
+            calls.setdefault(past_block, {})['header'] = ('eth_getBlockByNumber', [hex(past_block), False])
+            for b in (block, past_block):
+                key, call = _eth_call(vault, 'convertToAssets(uint256)', b, 10**18)
+                calls[b][key] = call
+        results = _fetch(client, cache, chain_id, calls)
+
+    snapshot = {
+        'block': block,
+        'timestamp': int(results[block]['header']['timestamp'], 16),
+        'sfrxusd_interest_rate': None,
+        'pairs': {}
+    }
+    for pair in pairs:
+        asset, borrow, rate_info = (_words(results[block][_eth_call(pair, signature, block)[0]])
+                                    for signature in PAIR_CALLS)
+        # currentRateInfo: (lastBlock, feeToProtocolRate, lastTimestamp, ratePerSec[, fullUtilizationRate])
+        snapshot['pairs'][pair] = {
+            'total_assets': asset[0],
+            'total_borrow': borrow[0],
+            'utilization_rate': borrow[0] / asset[0] if asset[0] else 0.0,
+            'rate_per_sec': rate_info[3],
+            'borrow_rate': rate_info[3] * SECONDS_PER_YEAR / RATE_PRECISION,
+            'full_utilization_rate': (rate_info[4] * SECONDS_PER_YEAR / RATE_PRECISION
+                                      if len(rate_info) > 4 else None),
+            'last_timestamp': rate_info[2]
+        }
+    if vault is not None:
+        prices = {b: _words(results[b][_eth_call(vault, 'convertToAssets(uint256)', b, 10**18)[0]])[0]
+                  for b in (block, past_block)}
+        elapsed = snapshot['timestamp'] - int(results[past_block]['header']['timestamp'], 16)
+        if elapsed > 0 and prices[past_block]:
+            growth = prices[block] / prices[past_block] - 1
+            snapshot['sfrxusd_interest_rate'] = growth * SECONDS_PER_YEAR / elapsed
+    return snapshot
+
+def generator_inputs(snapshot, pair, generator):
+    """
+    Keyword arguments for a generate_* function from a pair in a read_pair_states snapshot,
+    e.g. generate_fixed_util_apr_data(**generator_inputs(snapshot, pair, generate_fixed_util_apr_data)).
+    """
+    state = snapshot['pairs'][pair]
+    values = {
+        'current_interest_rate': state['borrow_rate'],
+        'utilization_rate': state['utilization_rate'],
+        'sfrxusd_interest_rate': snapshot['sfrxusd_interest_rate'],
+    }
+    parameters = inspect.signature(generator).parameters
+    return {name: value for name, value in values.items() if name in parameters and value is not None}
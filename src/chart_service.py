@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from batch import CHART_PARAMS, render_scenario, scenario_series
+from html_export import SLIDER_STEP
+from render_cache import RenderCache, content_key, library_versions, source_digest
+
+# Response formats and their content types; 'json' serves the chart's data instead of an image
+FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'json': 'application/json',
+}
+QUALITIES = ('preview', 'publication')
+# Allowed range of every chart parameter after quantization to SLIDER_STEP; together they
+# bound the number of distinct responses the service can ever be asked to render
+PARAM_LIMITS = {
+    'utilization_rate': (0.0, 1.0),
+    'borrow_rate': (0.0, 1.0),
+    'sfrxusd_interest_rate': (0.0, 1.0),
+    'max_borrow_rate': (SLIDER_STEP, 1.0),
+    'max_lend_rate': (SLIDER_STEP, 1.0),
+}
+# Sources whose changes alter responses; hashed into every ETag
+CODE_MODULES = ('data_fetcher', 'visualization', 'batch', 'chart_service')
+
+class BadRequest(ValueError):
+    pass
+
+def quantize(value, step=SLIDER_STEP):
+    """
+    Snap a parameter to the slider grid, e.g. 0.8537 -> 0.85.
+    """
+    return round(round(value / step) * step, 10)
+
+def parse_request(path):
+    """
+    Parse /charts/<chart>.<format>?<parameters> into a normalized chart request.
+
+    Chart parameters default to batch.CHART_PARAMS and are quantized to SLIDER_STEP, so
+    nearby slider positions share one response. Besides the chart's parameters the query
+    may set 'quality' (a render tier, default 'preview') and 'apy' (a compounding interval).
+
+    Args:
+        path (str): Request path including the query string
+
+    Returns:
+        dict: chart, format, quality, apy and the quantized parameters
+
+    Raises:
+        BadRequest: If the chart, format or a parameter is unknown or out of range
+    """
+    url = urlsplit(path)
+    directory, _, name = url.path.rpartition('/')
+    chart, _, fmt = name.partition('.')
+    if directory != '/charts' or chart not in CHART_PARAMS:
+        raise BadRequest(f"Unknown chart {url.path!r}; expected /charts/<{'|'.join(CHART_PARAMS)}>.<format>")
+    if fmt not in FORMATS:
+        raise BadRequest(f"Unknown format {fmt!r}; expected one of {sorted(FORMATS)}")
+
+    query = dict(parse_qsl(url.query))
+    quality = query.pop('quality', 'preview')
+    if quality not in QUALITIES:
+        raise BadRequest(f"Unknown quality {quality!r}; expected one of {list(QUALITIES)}")
+    apy = query.pop('apy', None) or None
+    if apy is not None:
+        from accrual import COMPOUNDING_INTERVALS
+        if apy not in COMPOUNDING_INTERVALS:
+            raise BadRequest(f"Unknown apy interval {apy!r}; expected one of {list(COMPOUNDING_INTERVALS)}")
+
+    params = {}
+    for key, default in CHART_PARAMS[chart].items():
+        try:
+            value = quantize(float(query.pop(key, default)))
+        except (ValueError, OverflowError):
+            raise BadRequest(f"{key} must be a finite number") from None
+        low, high = PARAM_LIMITS[key]
+        if not low <= value <= high:
+            raise BadRequest(f"{key}={value:g} is outside [{low:g}, {high:g}]")
+        params[key] = value
+    if query:
+        raise BadRequest(f"Unknown parameters for the {chart} chart: {sorted(query)}")
+    return {'chart': chart, 'format': fmt, 'quality': quality, 'apy': apy, **params}
+
+def code_version():
+    """
+    Digest of the modules that produce responses, so ETags change with the code.
+    """
+    return source_digest(CODE_MODULES)
+
+def chart_data(request):
+    """
+    The chart's swept axis and every market's APR series as a JSON-ready dict.
+    """
+    return {'request': request, **scenario_series(request).to_dict()}
+
+def render_response(request, key, cache_dir=None):
+    """
+    Render one chart request in a pool worker and add it to the on-disk cache.
+
+    Returns:
+        bytes: Response body
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"{key}.{request['format']}")
+        if request['format'] == 'json':
+            with open(path, 'w') as f:
+                json.dump(chart_data(request), f, separators=(',', ':'))
+        else:
+            scenario = {name: value for name, value in request.items() if name != 'format'}
+            scenario.update(name=key, format=request['format'])
+            record = render_scenario(scenario, tmp)
+            if record['status'] != 'ok':
+                raise RuntimeError(record['error'])
+        with open(path, 'rb') as f:
+            body = f.read()
+        if cache_dir:
+            RenderCache(cache_dir).store(key, path, {'request': request})
+    return body
+
+def _init_worker():
+    # Each worker renders headless with its own Agg backend
+    import matplotlib
+    matplotlib.use('Agg')
+
+class ChartService:
+    """
+    Serve the three APR charts as PNG, SVG or JSON to any number of viewers from one
+    shared render pool.
+
+    Requests are quantized to slider precision and answered from, in order, an in-memory
+    LRU cache, the on-disk RenderCache, or a render on the process pool. Concurrent
+    requests for the same response wait on a single render instead of starting their own,
+    so the cost scales with the number of distinct parameter sets rather than viewers.
+    ETags are derived from the normalized request, library and code versions, so an
+    If-None-Match revalidation is answered with 304 without touching any cache.
+
+    Usage:
+        with ChartService(cache_dir='output/chart_service') as service:
+            requests.get(f'{service.url}/charts/borrow_rate.png?utilization_rate=0.85')
+    """
+    def __init__(self, host='127.0.0.1', port=0, workers=None, cache_dir=None, memory_bytes=64 << 20,
+                 max_age=3600):
+        """
+        Args:
+            host (str): Interface to listen on
+            port (int): Port to listen on; 0 picks a free one
+            workers (int, optional): Render processes (default: CPU count)
+            cache_dir (str, optional): RenderCache directory for rendered responses; None
+                keeps responses in memory only
+            memory_bytes (int): Size bound of the in-memory response cache
+            max_age (int): Cache-Control max-age sent to clients, in seconds
+        """
+        self.cache_dir = cache_dir
+        self.disk = RenderCache(cache_dir) if cache_dir else None
+        self.memory_bytes = memory_bytes
+        self.max_age = max_age
+        self.stats = {'requests': 0, 'not_modified': 0, 'memory_hits': 0, 'disk_hits': 0,
+                      'renders': 0, 'collapsed': 0, 'errors': 0}
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._version = None
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def etag(self, request):
+        if self._version is None:
+            from data_fetcher import RATE_BACKEND
+            self._version = {'code': code_version(), 'libraries': library_versions(), 'rate_backend': RATE_BACKEND}
+        return content_key('chart_service', request, self._version)
+
+    def _remember(self, key, body):
+        # Caller holds the lock
+        if key in self._memory or len(body) > self.memory_bytes:
+            return
+        self._memory[key] = body
+        self._memory_size += len(body)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def get(self, request, key):
+        """
+        Response body for a parsed request, rendering it at most once however many
+        threads ask for it concurrently.
+        """
+        with self._lock:
+            body = self._memory.get(key)
+            if body is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return body
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.stats['collapsed'] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            body = self.disk.read(key, f".{request['format']}") if self.disk is not None else None
+            with self._lock:
+                self.stats['disk_hits' if body is not None else 'renders'] += 1
+            if body is None:
+                body = self._pool.submit(render_response, request, key, self.cache_dir).result()
+            future.set_result(body)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if future.exception() is None:
+                    self._remember(key, future.result())
+        return body
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with service._lock:
+                    service.stats['requests'] += 1
+                if urlsplit(self.path).path == '/stats':
+                    with service._lock:
+                        stats = {**service.stats, 'memory_entries': len(service._memory),
+                                 'memory_bytes': service._memory_size, 'inflight': len(service._inflight)}
+                    return self._send(200, json.dumps(stats).encode(), 'application/json')
+
+                try:
+                    request = parse_request(self.path)
+                except BadRequest as e:
+                    return self._send(400, json.dumps({'error': str(e)}).encode(), 'application/json')
+
+                key = service.etag(request)
+                etag = f'"{key}"'
+                headers = {'ETag': etag, 'Cache-Control': f'public, max-age={service.max_age}'}
+                if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+                    with service._lock:
+                        service.stats['not_modified'] += 1
+                    return self._send(304, b'', None, headers)
+
+                try:
+                    body = service.get(request, key)
+                except Exception as e:
+                    with service._lock:
+                        service.stats['errors'] += 1
+                    return self._send(500, json.dumps({'error': repr(e)}).encode(), 'application/json')
+                self._send(200, body, FORMATS[request['format']], headers)
+
+            def _send(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                if content_type:
+                    self.send_header('Content-Type', content_type)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._pool.shutdown(cancel_futures=True)
+        if self.disk is not None:
+            self.disk.write_manifest()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the APR comparison charts and their data over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--workers', type=int, default=None, help="Number of render processes (default: CPU count)")
+    parser.add_argument('--cache-dir', default=os.environ.get('FRAXLEND_RENDER_CACHE', os.path.join('output', 'chart_service')),
+                        help="On-disk response cache, a RenderCache directory (default: FRAXLEND_RENDER_CACHE or output/chart_service)")
+    parser.add_argument('--memory-mb', type=float, default=64, help="Size of the in-memory response cache")
+    parser.add_argument('--max-age', type=int, default=3600, help="Cache-Control max-age in seconds")
+    args = parser.parse_args()
+
+    service = ChartService(args.host, args.port, workers=args.workers, cache_dir=args.cache_dir,
+                           memory_bytes=int(args.memory_mb * 2**20), max_age=args.max_age)
+    print(f"Serving {', '.join(f'/charts/{chart}.<png|svg|json>' for chart in CHART_PARAMS)} "
+          f"and /stats at {service.url}")
+    service.start()
+    try:
+        while service._thread.is_alive():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        service.stop()
@@ -1,5 +1,13 @@
+import functools
+import hashlib
+import inspect
+import os
+import threading
+from collections import OrderedDict
+
 import numpy as np
-import pandas as pd
+
+from instrumentation import span
 
 def frxUSDRates(utilization_rate, borrowRate, sfrxusdInterestRate):
     return  {
@@ -44,68 +52,587 @@ def getBorrowRates(utilization_rate, lendRate, sfrxusdInterestRate):
         'sfrxUSDRates': calcsfrxUSDBorrowRate(utilization_rate, lendRate, sfrxusdInterestRate)
     }
 
-def generate_apr_comparison_data(current_interest_rate=0.05, sfrxusd_interest_rate=0.04):
+def frxUSDRatesArray(utilization_rate, borrowRate, sfrxusdInterestRate):
+    """
+    Array-native frxUSDRates. Inputs are broadcast against each other and the
+    result holds one column array per APR type.
+    """
+    utilization_rate, borrowRate, sfrxusdInterestRate = np.broadcast_arrays(
+        np.asarray(utilization_rate, dtype=float),
+        np.asarray(borrowRate, dtype=float),
+        np.asarray(sfrxusdInterestRate, dtype=float)
+    )
+    return {
+        'lentAPR': borrowRate * utilization_rate,
+        'unlentAPR': np.zeros(utilization_rate.shape),
+        'borrowAPR': borrowRate.copy()
+    }
+
+def sfrxUSDRatesArray(utilization_rate, borrowRate, sfrxusdInterestRate):
+    """
+    Array-native sfrxUSDRates. Inputs are broadcast against each other and the
+    result holds one column array per APR type.
+    """
+    utilization_rate, borrowRate, sfrxusdInterestRate = np.broadcast_arrays(
+        np.asarray(utilization_rate, dtype=float),
+        np.asarray(borrowRate, dtype=float),
+        np.asarray(sfrxusdInterestRate, dtype=float)
+    )
+    return {
+        'lentAPR': borrowRate * utilization_rate,
+        'unlentAPR': sfrxusdInterestRate * (1 - utilization_rate),
+        'borrowAPR': borrowRate.copy()
+    }
+
+# Rate arithmetic used by getRatesArray / getBorrowRatesArray: 'float', or 'fixed' for
+# the contracts' 1e18 integer arithmetic (see fixed_point.py)
+RATE_BACKENDS = ('float', 'fixed')
+RATE_BACKEND = os.environ.get('FRAXLEND_RATE_BACKEND', 'float')
+
+def set_rate_backend(backend):
+    """
+    Switch the rate kernels between float and on-chain-exact fixed-point arithmetic.
+    """
+    global RATE_BACKEND
+    if backend not in RATE_BACKENDS:
+        raise ValueError(f"Unknown rate backend {backend!r}; expected one of {RATE_BACKENDS}")
+    RATE_BACKEND = backend
+
+def getRatesArray(utilization_rate, borrowRate, sfrxusdInterestRate):
+    if RATE_BACKEND == 'fixed':
+        from fixed_point import getRatesArrayFixed
+        return getRatesArrayFixed(utilization_rate, borrowRate, sfrxusdInterestRate)
+    return {
+        'frxUSDRates': frxUSDRatesArray(utilization_rate, borrowRate, sfrxusdInterestRate),
+        'sfrxUSDRates': sfrxUSDRatesArray(utilization_rate, borrowRate, sfrxusdInterestRate)
+    }
+
+def _divide_by_utilization(numerator, utilization_rate):
+    # Zero utilization has no defined borrow rate, so those points become NaN
+    return np.divide(
+        numerator,
+        utilization_rate,
+        out=np.full(numerator.shape, np.nan),
+        where=utilization_rate != 0
+    )
+
+def calcfrxUSDBorrowRateArray(utilization_rate, lendRate, sfrxusdInterestRate):
+    """
+    Array-native calcfrxUSDBorrowRate. Points with zero utilization get a NaN
+    borrowAPR instead of raising.
+    """
+    utilization_rate, lendRate, sfrxusdInterestRate = np.broadcast_arrays(
+        np.asarray(utilization_rate, dtype=float),
+        np.asarray(lendRate, dtype=float),
+        np.asarray(sfrxusdInterestRate, dtype=float)
+    )
+    return {
+        'lentAPR': lendRate.copy(),
+        'unlentAPR': np.zeros(utilization_rate.shape),
+        'borrowAPR': _divide_by_utilization(lendRate, utilization_rate)
+    }
+
+def calcsfrxUSDBorrowRateArray(utilization_rate, lendRate, sfrxusdInterestRate):
+    """
+    Array-native calcsfrxUSDBorrowRate. Points with zero utilization get NaN
+    lentAPR and borrowAPR instead of raising.
+    """
+    utilization_rate, lendRate, sfrxusdInterestRate = np.broadcast_arrays(
+        np.asarray(utilization_rate, dtype=float),
+        np.asarray(lendRate, dtype=float),
+        np.asarray(sfrxusdInterestRate, dtype=float)
+    )
+    unlentAPR = sfrxusdInterestRate * (1 - utilization_rate)
+    borrowRate = _divide_by_utilization(lendRate - unlentAPR, utilization_rate)
+    return {
+        'lentAPR': borrowRate * utilization_rate,
+        'unlentAPR': unlentAPR,
+        'borrowAPR': borrowRate
+    }
+
+def getBorrowRatesArray(utilization_rate, lendRate, sfrxusdInterestRate):
+    if RATE_BACKEND == 'fixed':
+        from fixed_point import getBorrowRatesArrayFixed
+        return getBorrowRatesArrayFixed(utilization_rate, lendRate, sfrxusdInterestRate)
+    return {
+        'frxUSDRates': calcfrxUSDBorrowRateArray(utilization_rate, lendRate, sfrxusdInterestRate),
+        'sfrxUSDRates': calcsfrxUSDBorrowRateArray(utilization_rate, lendRate, sfrxusdInterestRate)
+    }
+
+def rates_to_frames(axis_name, axis_values, rates):
+    """
+    Build the long-format APR and borrow rate DataFrames from column arrays.
+    
+    Rows are ordered point by point (frxUSD lentAPR, frxUSD unlentAPR, sfrxUSD lentAPR,
+    sfrxUSD unlentAPR), matching the layout the plot functions expect.
+    
+    Args:
+        axis_name (str): Name of the swept parameter column (e.g. 'utilization_rate')
+        axis_values (numpy.ndarray): 1-D array of swept parameter values
+        rates (dict): Output of getRatesArray or getBorrowRatesArray over axis_values
+    
+    Returns:
+        tuple: (DataFrame containing APR data, DataFrame containing borrow rates)
+    """
+    with span('build_frames', points=len(axis_values)):
+        return _rates_to_frames(axis_name, axis_values, rates)
+
+def _rates_to_frames(axis_name, axis_values, rates):
+    # pandas is only needed for the long-format layout; compact callers never load it
+    import pandas as pd
+    
+    axis_values = np.asarray(axis_values, dtype=float)
+    frx = rates['frxUSDRates']
+    sfrx = rates['sfrxUSDRates']
+    n = len(axis_values)
+    
+    data = pd.DataFrame({
+        axis_name: np.repeat(axis_values, 4),
+        'market': np.tile(['frxUSD', 'frxUSD', 'sfrxUSD', 'sfrxUSD'], n).astype(object),
+        'apr_type': np.tile(['lentAPR', 'unlentAPR', 'lentAPR', 'unlentAPR'], n).astype(object),
+        'value': np.column_stack([
+            frx['lentAPR'], frx['unlentAPR'], sfrx['lentAPR'], sfrx['unlentAPR']
+        ]).ravel()
+    })
+    borrow_rates = pd.DataFrame({
+        axis_name: np.repeat(axis_values, 2),
+        'market': np.tile(['frxUSD', 'sfrxUSD'], n).astype(object),
+        'value': np.column_stack([frx['borrowAPR'], sfrx['borrowAPR']]).ravel()
+    })
+    return data, borrow_rates
+
+MARKETS = ('frxUSD', 'sfrxUSD')
+APR_TYPES = ('lentAPR', 'unlentAPR', 'borrowAPR')
+SWEEP_AXES = ('utilization_rate', 'borrow_rate', 'lend_rate', 'sfrxusd_interest_rate')
+
+class RateCube:
+    """
+    Dense, labeled APR cube produced by sweep_rates.
+    
+    `values` has one dimension per swept axis (in SWEEP_AXES order) followed by a
+    market dimension (MARKETS) and an apr_type dimension (APR_TYPES). Parameters that
+    were passed as scalars are kept in `fixed` rather than as axes.
+    """
+    def __init__(self, values, axes, fixed=None):
+        self.values = values
+        self.axes = dict(axes)
+        self.fixed = dict(fixed or {})
+    
+    @property
+    def dims(self):
+        return tuple(self.axes) + ('market', 'apr_type')
+    
+    @property
+    def shape(self):
+        return self.values.shape
+    
+    def _axis_index(self, name, value):
+        if name == 'market':
+            return MARKETS.index(value)
+        if name == 'apr_type':
+            return APR_TYPES.index(value)
+        matches = np.flatnonzero(np.isclose(self.axes[name], value))
+        if len(matches) == 0:
+            raise KeyError(f"{value!r} is not on the {name} axis")
+        return int(matches[0])
+    
+    def sel(self, **coords):
+        """
+        Select a slice of the cube by label, dropping the selected dimensions.
+        
+        Args:
+            **coords: Axis name to value, e.g. sel(sfrxusd_interest_rate=0.08, market='frxUSD')
+        
+        Returns:
+            RateCube or numpy.ndarray: The remaining cube, or the raw array once the market
+            or apr_type dimension has been selected away.
+        """
+        unknown = set(coords) - set(self.dims)
+        if unknown:
+            raise KeyError(f"Unknown dimensions: {sorted(unknown)}")
+        
+        index = tuple(
+            self._axis_index(dim, coords[dim]) if dim in coords else slice(None)
+            for dim in self.dims
+        )
+        values = self.values[index]
+        if 'market' in coords or 'apr_type' in coords:
+            return values
+        
+        axes = {name: vals for name, vals in self.axes.items() if name not in coords}
+        fixed = dict(self.fixed)
+        fixed.update({name: float(self.axes[name][self._axis_index(name, value)])
+                      for name, value in coords.items()})
+        return RateCube(values, axes, fixed)
+    
+    def as_rates(self):
+        """
+        Return the cube in the nested getRatesArray layout
+        ({'frxUSDRates': {'lentAPR': ...}, 'sfrxUSDRates': {...}}).
+        """
+        return {
+            f'{market}Rates': {
+                apr_type: self.values[..., m, a] for a, apr_type in enumerate(APR_TYPES)
+            }
+            for m, market in enumerate(MARKETS)
+        }
+
+class RateSeries:
+    """
+    Compact, wide layout for a 1-D sweep.
+    
+    Holds one contiguous float array per (market, apr_type) series, indexed by the
+    sweep axis. Markets and APR types are addressed by their integer codes in MARKETS
+    and APR_TYPES rather than by per-row strings, so a sweep of n points costs
+    6 * n floats plus the axis itself.
+    """
+    def __init__(self, axis_name, axis, values):
+        self.axis_name = axis_name
+        self.axis = np.asarray(axis, dtype=float)
+        # values has shape (len(MARKETS), len(APR_TYPES), len(axis))
+        self.values = np.ascontiguousarray(values)
+    
+    @classmethod
+    def from_cube(cls, cube):
+        if len(cube.axes) != 1:
+            raise ValueError(f"RateSeries needs a 1-D cube, got dims {cube.dims}")
+        (axis_name, axis), = cube.axes.items()
+        return cls(axis_name, axis, np.moveaxis(cube.values, 0, -1))
+    
+    def __len__(self):
+        return len(self.axis)
+    
+    def series(self, market, apr_type):
+        return self.values[MARKETS.index(market), APR_TYPES.index(apr_type)]
+    
+    def to_frames(self):
+        """
+        Expand to the long-format (APR data, borrow rates) DataFrames returned by the
+        generate_* functions.
+        """
+        rates = {
+            f'{market}Rates': {apr_type: self.series(market, apr_type) for apr_type in APR_TYPES}
+            for market in MARKETS
+        }
+        return rates_to_frames(self.axis_name, self.axis, rates)
+    
+    def to_dict(self):
+        """
+        JSON-ready {'axis_name', 'axis', 'series': {market: {apr_type: list}}}, with NaN
+        (e.g. APRs at zero utilization) as None.
+        """
+        values = np.where(np.isfinite(self.values), self.values, None)
+        return {
+            'axis_name': self.axis_name,
+            'axis': self.axis.tolist(),
+            'series': {
+                market: {apr_type: values[m, a].tolist() for a, apr_type in enumerate(APR_TYPES)}
+                for m, market in enumerate(MARKETS)
+            }
+        }
+
+def sweep_spec(utilization_rate, sfrxusd_interest_rate, borrow_rate=None, lend_rate=None):
+    """
+    Split sweep parameters into swept axes and fixed values.
+    
+    Args:
+        utilization_rate (float or array-like): Utilization rate(s)
+        sfrxusd_interest_rate (float or array-like): sfrxUSD interest rate(s)
+        borrow_rate (float or array-like, optional): Borrow rate(s)
+        lend_rate (float or array-like, optional): Lend rate(s)
+    
+    Returns:
+        tuple: ({axis name: 1-D array} in SWEEP_AXES order, {parameter name: float})
+    """
+    if (borrow_rate is None) == (lend_rate is None):
+        raise ValueError("Exactly one of borrow_rate and lend_rate must be given")
+    
+    params = {
+        'utilization_rate': utilization_rate,
+        'borrow_rate': borrow_rate,
+        'lend_rate': lend_rate,
+        'sfrxusd_interest_rate': sfrxusd_interest_rate
+    }
+    axes = {}
+    fixed = {}
+    for name in SWEEP_AXES:
+        value = params[name]
+        if value is None:
+            continue
+        array = np.asarray(value, dtype=float)
+        if array.ndim == 0:
+            fixed[name] = float(array)
+        elif array.ndim == 1:
+            axes[name] = array
+        else:
+            raise ValueError(f"{name} must be a scalar or a 1-D array")
+    return axes, fixed
+
+def sweep_rates(utilization_rate, sfrxusd_interest_rate, borrow_rate=None, lend_rate=None,
+                chunk_size=1_000_000, dtype=np.float64, out=None):
+    """
+    Evaluate both markets over the Cartesian product of the given parameter axes.
+    
+    Each parameter may be a scalar (held fixed) or a 1-D array (swept). Exactly one of
+    borrow_rate and lend_rate must be given: borrow rates are evaluated with getRatesArray,
+    lend rates with getBorrowRatesArray. The grid is evaluated in chunks of roughly
+    chunk_size points along the leading axis so temporaries stay bounded.
+    
+    Args:
+        utilization_rate (float or array-like): Utilization rate(s)
+        sfrxusd_interest_rate (float or array-like): sfrxUSD interest rate(s)
+        borrow_rate (float or array-like, optional): Borrow rate(s)
+        lend_rate (float or array-like, optional): Lend rate(s)
+        chunk_size (int): Approximate number of grid points evaluated at once
+        dtype (numpy.dtype): Storage dtype of the cube (float32 halves memory)
+        out (numpy.ndarray, optional): Preallocated output, e.g. a numpy.memmap for
+            cubes larger than RAM. Must have the cube's shape.
+    
+    Returns:
+        RateCube: Cube with dims (*swept axes, market, apr_type)
+    """
+    axes, fixed = sweep_spec(utilization_rate, sfrxusd_interest_rate, borrow_rate, lend_rate)
+    with span('sweep_rates', axes=list(axes)):
+        return _sweep_rates(axes, fixed, borrow_rate is not None, chunk_size, dtype, out)
+
+def _sweep_rates(axes, fixed, by_borrow_rate, chunk_size, dtype, out):
+    grid_shape = tuple(len(values) for values in axes.values())
+    cube_shape = grid_shape + (len(MARKETS), len(APR_TYPES))
+    if out is None:
+        out = np.empty(cube_shape, dtype=dtype)
+    elif out.shape != cube_shape:
+        raise ValueError(f"out has shape {out.shape}, expected {cube_shape}")
+    
+    rate_fn = getRatesArray if by_borrow_rate else getBorrowRatesArray
+    rate_name = 'borrow_rate' if by_borrow_rate else 'lend_rate'
+    names = list(axes)
+    
+    if not names:
+        rates = rate_fn(fixed['utilization_rate'], fixed[rate_name], fixed['sfrxusd_interest_rate'])
+        _store_rates(out, rates)
+        return RateCube(out, axes, fixed)
+    
+    # Reshape each axis so it broadcasts along its own dimension
+    def grid_value(name, leading):
+        if name in fixed:
+            return fixed[name]
+        dim = names.index(name)
+        values = leading if dim == 0 else axes[name]
+        return values.reshape([-1 if i == dim else 1 for i in range(len(names))])
+    
+    row_points = int(np.prod(grid_shape[1:], dtype=np.int64))
+    rows_per_chunk = max(1, chunk_size // max(row_points, 1))
+    leading_axis = axes[names[0]]
+    
+    for start in range(0, len(leading_axis), rows_per_chunk):
+        stop = min(start + rows_per_chunk, len(leading_axis))
+        leading = leading_axis[start:stop]
+        rates = rate_fn(
+            grid_value('utilization_rate', leading),
+            grid_value(rate_name, leading),
+            grid_value('sfrxusd_interest_rate', leading)
+        )
+        _store_rates(out[start:stop], rates)
+    
+    return RateCube(out, axes, fixed)
+
+def _store_rates(out, rates):
+    for m, market in enumerate(MARKETS):
+        for a, apr_type in enumerate(APR_TYPES):
+            out[..., m, a] = rates[f'{market}Rates'][apr_type]
+
+# Bump when the .npz layout of disk cache entries changes
+CACHE_FORMAT = 1
+# Modules whose code computes cached results
+CACHE_MODULES = ('data_fetcher', 'fixed_point')
+
+class ResultCache:
+    """
+    LRU cache of generator results, bounded by entry count and bytes, with an
+    optional on-disk .npz tier that survives kernel restarts.
+    
+    Results are stored as RateSeries so both the memory and disk tiers hold the
+    compact layout; callers asking for DataFrames get them rebuilt from the series.
+    Cached series are shared between callers, so their arrays are made read-only;
+    copy them before modifying. Disk entries are keyed by CACHE_FORMAT and the source
+    of CACHE_MODULES as well, so results from older code are never reused.
+    """
+    def __init__(self, max_entries=256, max_bytes=64 * 2**20, disk_dir=None, enabled=True):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._code_version = None
+    
+    @staticmethod
+    def _nbytes(series):
+        return series.values.nbytes + series.axis.nbytes
+    
+    @staticmethod
+    def _freeze(series):
+        series.axis.flags.writeable = False
+        series.values.flags.writeable = False
+        return series
+    
+    def _disk_path(self, key):
+        if self._code_version is None:
+            from render_cache import source_digest
+            self._code_version = source_digest(CACHE_MODULES)
+        digest = hashlib.sha1(repr((CACHE_FORMAT, self._code_version, key)).encode()).hexdigest()
+        return os.path.join(self.disk_dir, f'{digest}.npz')
+    
+    def _load_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with np.load(path) as npz:
+                return RateSeries(str(npz['axis_name']), npz['axis'], npz['values'])
+        except (OSError, KeyError, ValueError):
+            return None
+    
+    def _store_disk(self, key, series):
+        os.makedirs(self.disk_dir, exist_ok=True)
+        path = self._disk_path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, axis_name=series.axis_name, axis=series.axis, values=series.values)
+        os.replace(tmp_path, path)
+    
+    def _insert(self, key, series):
+        self._freeze(series)
+        size = self._nbytes(series)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = series
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= self._nbytes(evicted)
+            self.evictions += 1
+    
+    def get(self, key):
+        with self._lock:
+            series = self._entries.get(key)
+            if series is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return series
+        
+        series = self._load_disk(key)
+        with self._lock:
+            if series is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._insert(key, series)
+        return series
+    
+    def put(self, key, series):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._nbytes(self._entries.pop(key))
+            self._insert(key, series)
+        if self.disk_dir:
+            self._store_disk(key, series)
+    
+    def clear(self, disk=False):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if disk and self.disk_dir and os.path.isdir(self.disk_dir):
+            for name in os.listdir(self.disk_dir):
+                if name.endswith('.npz'):
+                    os.remove(os.path.join(self.disk_dir, name))
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes
+            }
+
+# Shared cache used by the generate_* functions
+RESULT_CACHE = ResultCache(disk_dir=os.environ.get('FRAXLEND_CACHE_DIR'))
+
+def _normalize_param(value):
+    # Slider values like 0.1 and 0.1000000000000001 should share a cache entry
+    return round(float(value), 12)
+
+def cached_generator(fn):
+    """
+    Memoize a generate_* function in RESULT_CACHE.
+    
+    The key is the function name plus its normalized, default-filled parameters,
+    which fully determine the sweep grid, plus the rate backend when it is not 'float'.
+    The wrapped function must accept compact=True.
+    """
+    signature = inspect.signature(fn)
+    
+    @functools.wraps(fn)
+    def wrapper(*args, compact=False, **kwargs):
+        with span(fn.__name__):
+            if not RESULT_CACHE.enabled:
+                return fn(*args, compact=compact, **kwargs)
+            
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {
+                name: _normalize_param(value)
+                for name, value in bound.arguments.items()
+                if name != 'compact'
+            }
+            key = (fn.__name__, tuple(params.items()))
+            if RATE_BACKEND != 'float':
+                key += (('rate_backend', RATE_BACKEND),)
+            
+            with span('result_cache_get'):
+                series = RESULT_CACHE.get(key)
+            if series is None:
+                series = fn(compact=True, **params)
+                with span('result_cache_put'):
+                    RESULT_CACHE.put(key, series)
+            return series if compact else series.to_frames()
+    
+    return wrapper
+
+@cached_generator
+def generate_apr_comparison_data(current_interest_rate=0.05, sfrxusd_interest_rate=0.04, compact=False):
     """
     Generate APR data for frxUSD and sfrxUSD markets across different utilization rates.
     
     Args:
         current_interest_rate (float): The current interest rate
         sfrxusd_interest_rate (float): The sfrxUSD interest rate
+        compact (bool): Return a RateSeries instead of long-format DataFrames
     
     Returns:
-        tuple: (DataFrame containing APR data, DataFrame containing borrow rates)
+        tuple: (DataFrame containing APR data, DataFrame containing borrow rates),
+        or a RateSeries if compact is True
     """
     # Generate utilization rates from 0 to 1
     utilization_rates = np.linspace(0, 1, 21)  # 5% increments
     
-    data = []
-    borrow_rates = []
-    for util in utilization_rates:
-        rates = getRates(util, current_interest_rate, sfrxusd_interest_rate)
-        
-        # Add frxUSD data
-        data.append({
-            'utilization_rate': util,
-            'market': 'frxUSD',
-            'apr_type': 'lentAPR',
-            'value': rates['frxUSDRates']['lentAPR']
-        })
-        data.append({
-            'utilization_rate': util,
-            'market': 'frxUSD',
-            'apr_type': 'unlentAPR',
-            'value': rates['frxUSDRates']['unlentAPR']
-        })
-        
-        # Add sfrxUSD data
-        data.append({
-            'utilization_rate': util,
-            'market': 'sfrxUSD',
-            'apr_type': 'lentAPR',
-            'value': rates['sfrxUSDRates']['lentAPR']
-        })
-        data.append({
-            'utilization_rate': util,
-            'market': 'sfrxUSD',
-            'apr_type': 'unlentAPR',
-            'value': rates['sfrxUSDRates']['unlentAPR']
-        })
-        
-        # Add borrow rates
-        borrow_rates.append({
-            'utilization_rate': util,
-            'market': 'frxUSD',
-            'value': rates['frxUSDRates']['borrowAPR']
-        })
-        borrow_rates.append({
-            'utilization_rate': util,
-            'market': 'sfrxUSD',
-            'value': rates['sfrxUSDRates']['borrowAPR']
-        })
-    
-    return pd.DataFrame(data), pd.DataFrame(borrow_rates)
-
-def generate_fixed_util_apr_data(utilization_rate=0.85, sfrxusd_interest_rate=0.04, max_borrow_rate=0.20):
+    cube = sweep_rates(utilization_rates, sfrxusd_interest_rate, borrow_rate=current_interest_rate)
+    if compact:
+        return RateSeries.from_cube(cube)
+    return rates_to_frames('utilization_rate', utilization_rates, cube.as_rates())
+
+@cached_generator
+def generate_fixed_util_apr_data(utilization_rate=0.85, sfrxusd_interest_rate=0.04, max_borrow_rate=0.20, compact=False):
     """
     Generate APR data for frxUSD and sfrxUSD markets across different borrow rates at fixed utilization.
     
@@ -113,62 +640,22 @@ def generate_fixed_util_apr_data(utilization_rate=0.85, sfrxusd_interest_rate=0.
         utilization_rate (float): Fixed utilization rate (default 85%)
         sfrxusd_interest_rate (float): The sfrxUSD interest rate
         max_borrow_rate (float): Maximum borrow rate to plot (default 20%)
+        compact (bool): Return a RateSeries instead of long-format DataFrames
     
     Returns:
-        tuple: (DataFrame containing APR data, DataFrame containing borrow rates)
+        tuple: (DataFrame containing APR data, DataFrame containing borrow rates),
+        or a RateSeries if compact is True
     """
     # Generate borrow rates from 0 to max_borrow_rate in 1% increments
     borrow_rates_array = np.linspace(0, max_borrow_rate, int(max_borrow_rate * 100) + 1)
     
-    data = []
-    borrow_rates_data = []
-    
-    for borrow_rate in borrow_rates_array:
-        rates = getRates(utilization_rate, borrow_rate, sfrxusd_interest_rate)
-        
-        # Add frxUSD data
-        data.append({
-            'borrow_rate': borrow_rate,
-            'market': 'frxUSD',
-            'apr_type': 'lentAPR',
-            'value': rates['frxUSDRates']['lentAPR']
-        })
-        data.append({
-            'borrow_rate': borrow_rate,
-            'market': 'frxUSD',
-            'apr_type': 'unlentAPR',
-            'value': rates['frxUSDRates']['unlentAPR']
-        })
-        
-        # Add sfrxUSD data
-        data.append({
-            'borrow_rate': borrow_rate,
-            'market': 'sfrxUSD',
-            'apr_type': 'lentAPR',
-            'value': rates['sfrxUSDRates']['lentAPR']
-        })
-        data.append({
-            'borrow_rate': borrow_rate,
-            'market': 'sfrxUSD',
-            'apr_type': 'unlentAPR',
-            'value': rates['sfrxUSDRates']['unlentAPR']
-        })
-        
-        # Add borrow rates
-        borrow_rates_data.append({
-            'borrow_rate': borrow_rate,
-            'market': 'frxUSD',
-            'value': rates['frxUSDRates']['borrowAPR']
-        })
-        borrow_rates_data.append({
-            'borrow_rate': borrow_rate,
-            'market': 'sfrxUSD',
-            'value': rates['sfrxUSDRates']['borrowAPR']
-        })
-    
-    return pd.DataFrame(data), pd.DataFrame(borrow_rates_data)
-
-def generate_lend_rate_comparison_data(utilization_rate=0.85, sfrxusd_interest_rate=0.08, max_lend_rate=0.20):
+    cube = sweep_rates(utilization_rate, sfrxusd_interest_rate, borrow_rate=borrow_rates_array)
+    if compact:
+        return RateSeries.from_cube(cube)
+    return rates_to_frames('borrow_rate', borrow_rates_array, cube.as_rates())
+
+@cached_generator
+def generate_lend_rate_comparison_data(utilization_rate=0.85, sfrxusd_interest_rate=0.08, max_lend_rate=0.20, compact=False):
     """
     Generate APR data for frxUSD and sfrxUSD markets across different lend rates at fixed utilization.
     
@@ -176,57 +663,16 @@ def generate_lend_rate_comparison_data(utilization_rate=0.85, sfrxusd_interest_r
         utilization_rate (float): Fixed utilization rate (default 85%)
         sfrxusd_interest_rate (float): The sfrxUSD interest rate
         max_lend_rate (float): Maximum lend rate to plot (default 20%)
+        compact (bool): Return a RateSeries instead of long-format DataFrames
     
     Returns:
-        tuple: (DataFrame containing APR data, DataFrame containing borrow rates)
+        tuple: (DataFrame containing APR data, DataFrame containing borrow rates),
+        or a RateSeries if compact is True
     """
     # Generate lend rates from 0 to max_lend_rate in 1% increments
     lend_rates_array = np.linspace(0, max_lend_rate, int(max_lend_rate * 100) + 1)
     
-    data = []
-    borrow_rates_data = []
-    
-    for lend_rate in lend_rates_array:
-        rates = getBorrowRates(utilization_rate, lend_rate, sfrxusd_interest_rate)
-        
-        # Add frxUSD data
-        data.append({
-            'lend_rate': lend_rate,
-            'market': 'frxUSD',
-            'apr_type': 'lentAPR',
-            'value': rates['frxUSDRates']['lentAPR']
-        })
-        data.append({
-            'lend_rate': lend_rate,
-            'market': 'frxUSD',
-            'apr_type': 'unlentAPR',
-            'value': rates['frxUSDRates']['unlentAPR']
-        })
-        
-        # Add sfrxUSD data
-        data.append({
-            'lend_rate': lend_rate,
-            'market': 'sfrxUSD',
-            'apr_type': 'lentAPR',
-            'value': rates['sfrxUSDRates']['lentAPR']
-        })
-        data.append({
-            'lend_rate': lend_rate,
-            'market': 'sfrxUSD',
-            'apr_type': 'unlentAPR',
-            'value': rates['sfrxUSDRates']['unlentAPR']
-        })
-        
-        # Add borrow rates
-        borrow_rates_data.append({
-            'lend_rate': lend_rate,
-            'market': 'frxUSD',
-            'value': rates['frxUSDRates']['borrowAPR']
-        })
-        borrow_rates_data.append({
-            'lend_rate': lend_rate,
-            'market': 'sfrxUSD',
-            'value': rates['sfrxUSDRates']['borrowAPR']
-        })
-    
-    return pd.DataFrame(data), pd.DataFrame(borrow_rates_data) 
\ No newline at end of file
+    cube = sweep_rates(utilization_rate, sfrxusd_interest_rate, lend_rate=lend_rates_array)
+    if compact:
+        return RateSeries.from_cube(cube)
+    return rates_to_frames('lend_rate', lend_rates_array, cube.as_rates())
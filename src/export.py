@@ -0,0 +1,164 @@
+import json
+import os
+
+import numpy as np
+
+import data_fetcher
+from data_fetcher import (
+    MARKETS,
+    APR_TYPES,
+    getRatesArray,
+    getBorrowRatesArray,
+    sweep_spec
+)
+
+# File extension and supported compression codecs for each export format
+EXPORT_FORMATS = {
+    'parquet': ('.parquet', (None, 'snappy', 'gzip', 'zstd', 'lz4', 'brotli')),
+    'arrow': ('.arrow', (None, 'lz4', 'zstd')),
+    'csv': ('.csv', (None, 'gzip')),
+}
+
+def rate_columns():
+    """
+    Names of the wide APR columns, one per (market, apr_type).
+    """
+    return [f'{market}_{apr_type}' for market in MARKETS for apr_type in APR_TYPES]
+
+def iter_sweep_chunks(utilization_rate, sfrxusd_interest_rate, borrow_rate=None, lend_rate=None,
+                      chunk_size=1_000_000, dtype=np.float64, start_chunk=0):
+    """
+    Evaluate a sweep chunk by chunk in wide format.
+
+    Grid points are taken in C order over the swept axes (SWEEP_AXES order), so chunk
+    boundaries depend only on the sweep and chunk_size, which makes runs resumable.
+
+    Args:
+        utilization_rate, sfrxusd_interest_rate, borrow_rate, lend_rate: As for sweep_rates
+        chunk_size (int): Grid points per chunk
+        dtype (numpy.dtype): dtype of the rate columns
+        start_chunk (int): First chunk to produce
+
+    Yields:
+        tuple: (chunk index, {column name: 1-D array}) with one column per swept axis
+        followed by rate_columns()
+    """
+    axes, fixed = sweep_spec(utilization_rate, sfrxusd_interest_rate, borrow_rate, lend_rate)
+    rate_fn = getRatesArray if borrow_rate is not None else getBorrowRatesArray
+    rate_name = 'borrow_rate' if borrow_rate is not None else 'lend_rate'
+    grid_shape = tuple(len(values) for values in axes.values())
+    total = int(np.prod(grid_shape, dtype=np.int64))
+
+    for chunk, start in enumerate(range(start_chunk * chunk_size, total, chunk_size), start_chunk):
+        flat = np.arange(start, min(start + chunk_size, total))
+        indices = np.unravel_index(flat, grid_shape) if grid_shape else ()
+        columns = {name: values[idx] for (name, values), idx in zip(axes.items(), indices)}
+
+        def value(name):
+            return columns[name] if name in columns else fixed[name]
+
+        rates = rate_fn(value('utilization_rate'), value(rate_name), value('sfrxusd_interest_rate'))
+        for market in MARKETS:
+            for apr_type in APR_TYPES:
+                column = np.broadcast_to(rates[f'{market}Rates'][apr_type], flat.shape)
+                columns[f'{market}_{apr_type}'] = column.astype(dtype)
+        yield chunk, columns
+
+def _write_part(path, columns, fmt, compression):
+    tmp_path = f'{path}.tmp'
+    if fmt == 'csv':
+        import pandas as pd
+        pd.DataFrame(columns).to_csv(tmp_path, index=False, compression=compression)
+    else:
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError(f"{fmt} export requires pyarrow (pip install pyarrow)") from e
+        table = pa.table(columns)
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            pq.write_table(table, tmp_path, compression=compression or 'none', row_group_size=len(table))
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
+    # A part only appears under its final name once fully written
+    os.replace(tmp_path, path)
+
+def export_sweep(output_dir, utilization_rate, sfrxusd_interest_rate, borrow_rate=None, lend_rate=None,
+                 format='parquet', chunk_size=1_000_000, compression=None, dtype=np.float64, progress=None):
+    """
+    Stream a sweep to a directory of Parquet, Arrow IPC or CSV part files.
+
+    Each chunk is written to its own part file (part-00000.parquet, ...) as soon as it is
+    evaluated, so memory is bounded by chunk_size rather than by the sweep. _sweep.json
+    records the sweep and the rate backend; re-running with the same arguments (and
+    backend) skips completed parts and resumes after the last completed chunk. _SUCCESS
+    is written when every part exists.
+
+    Args:
+        output_dir (str): Dataset directory
+        utilization_rate, sfrxusd_interest_rate, borrow_rate, lend_rate: As for sweep_rates
+        format (str): One of EXPORT_FORMATS
+        chunk_size (int): Grid points per part file
+        compression (str, optional): Codec for the chosen format
+        dtype (numpy.dtype): dtype of the rate columns
+        progress (callable, optional): Called with (completed chunks, total chunks)
+
+    Returns:
+        dict: Sweep summary as written to _sweep.json
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format {format!r}; expected one of {sorted(EXPORT_FORMATS)}")
+    ext, codecs = EXPORT_FORMATS[format]
+    if compression not in codecs:
+        raise ValueError(f"Unsupported {format} compression {compression!r}; expected one of {codecs}")
+    if compression == 'gzip' and format == 'csv':
+        ext += '.gz'
+
+    axes, fixed = sweep_spec(utilization_rate, sfrxusd_interest_rate, borrow_rate, lend_rate)
+    total_points = int(np.prod([len(values) for values in axes.values()], dtype=np.int64))
+    summary = {
+        'axes': {name: values.tolist() for name, values in axes.items()},
+        'fixed': fixed,
+        'columns': list(axes) + rate_columns(),
+        'format': format,
+        'compression': compression,
+        'dtype': np.dtype(dtype).name,
+        'chunk_size': chunk_size,
+        'points': total_points,
+        'chunks': -(-total_points // chunk_size),
+        'rate_backend': data_fetcher.RATE_BACKEND
+    }
+
+    os.makedirs(output_dir, exist_ok=True)
+    spec_path = os.path.join(output_dir, '_sweep.json')
+    if os.path.exists(spec_path):
+        with open(spec_path) as f:
+            recorded = json.load(f)
+        if recorded.get('rate_backend') != summary['rate_backend']:
+            raise ValueError(f"{output_dir} was written with the {recorded.get('rate_backend', 'unrecorded')!r} "
+                             f"rate backend, not {summary['rate_backend']!r}; switch backends or use a new directory")
+        if recorded != summary:
+            raise ValueError(f"{output_dir} holds a different sweep; use a new directory to start over")
+    else:
+        with open(spec_path, 'w') as f:
+            json.dump(summary, f)
+
+    def part_path(chunk):
+        return os.path.join(output_dir, f'part-{chunk:05d}{ext}')
+
+    # Resume after the last chunk whose part file was completed
+    start_chunk = 0
+    while start_chunk < summary['chunks'] and os.path.exists(part_path(start_chunk)):
+        start_chunk += 1
+
+    chunks = iter_sweep_chunks(utilization_rate, sfrxusd_interest_rate, borrow_rate, lend_rate,
+                               chunk_size=chunk_size, dtype=dtype, start_chunk=start_chunk)
+    for chunk, columns in chunks:
+        _write_part(part_path(chunk), columns, format, compression)
+        if progress:
+            progress(chunk + 1, summary['chunks'])
+
+    open(os.path.join(output_dir, '_SUCCESS'), 'w').close()
+    return summary
@@ -0,0 +1,394 @@
+import numpy as np
+
+from data_fetcher import (
+    MARKETS,
+    APR_TYPES,
+    frxUSDRatesArray,
+    sfrxUSDRatesArray,
+    calcfrxUSDBorrowRateArray,
+    calcsfrxUSDBorrowRateArray
+)
+from instrumentation import span
+
+# Contract precisions: rates are per-second at 1e18, utilization at 1e5
+RATE_PRECISION = 10**18
+UTIL_PRECISION = 10**5
+SECONDS_PER_YEAR = 365 * 86400
+
+LIMB_BITS = 32
+_LIMB_MASK = np.uint64(2**LIMB_BITS - 1)
+_LIMB_SHIFT = np.uint64(LIMB_BITS)
+# Largest divisor that keeps (remainder << 32) | limb inside a uint64
+_MAX_SHORT_DIVISOR = 2**31
+
+# --- Wide unsigned integers -------------------------------------------------------
+#
+# A wide integer array is a uint64 array of shape (..., limbs) holding 32-bit limbs,
+# least significant first. Products of two limbs fit in a uint64, so multiplication and
+# short division run as a handful of vectorized passes over the limbs.
+
+def to_wide(values, limbs=4):
+    """
+    Convert non-negative integers to a wide integer array.
+
+    Args:
+        values (array-like): NumPy integers, or Python ints (object arrays) of any size
+        limbs (int): Number of 32-bit limbs (4 limbs hold uint128)
+
+    Returns:
+        numpy.ndarray: uint64 array of shape values.shape + (limbs,)
+    """
+    values = np.asarray(values)
+    out = np.zeros(values.shape + (limbs,), dtype=np.uint64)
+    if values.dtype == object:
+        if np.any(values < 0):
+            raise ValueError("Wide integers must be non-negative")
+        rest = values
+        for i in range(limbs):
+            out[..., i] = (rest & int(_LIMB_MASK)).astype(np.uint64)
+            rest = rest >> LIMB_BITS
+        if np.any(rest != 0):
+            raise OverflowError(f"Value does not fit in {limbs} limbs")
+        return out
+
+    if values.dtype.kind not in 'iu':
+        raise TypeError(f"Expected integers, got {values.dtype}")
+    if values.dtype.kind == 'i' and np.any(values < 0):
+        raise ValueError("Wide integers must be non-negative")
+    values = values.astype(np.uint64)
+    out[..., 0] = values & _LIMB_MASK
+    if limbs > 1:
+        out[..., 1] = values >> _LIMB_SHIFT
+    elif np.any(values >> _LIMB_SHIFT):
+        raise OverflowError("Value does not fit in 1 limb")
+    return out
+
+def from_wide(wide):
+    """
+    Convert a wide integer array to Python ints (object array), e.g. for reporting.
+    """
+    total = np.zeros(wide.shape[:-1], dtype=object)
+    for i in reversed(range(wide.shape[-1])):
+        total = (total << LIMB_BITS) + wide[..., i].astype(object)
+    return total
+
+def wide_to_int64(wide):
+    """
+    Narrow a wide integer array to int64, raising OverflowError if any value exceeds 2**63 - 1.
+    """
+    if np.any(wide[..., 2:]) or np.any(wide[..., 1] >> np.uint64(LIMB_BITS - 1)):
+        raise OverflowError("Wide integer does not fit in int64")
+    return ((wide[..., 1] << _LIMB_SHIFT) | wide[..., 0]).astype(np.int64)
+
+def _carry(acc):
+    # Propagate carries so every limb is below 2**32
+    carry = np.zeros(acc.shape[:-1], dtype=np.uint64)
+    for k in range(acc.shape[-1]):
+        value = acc[..., k] + carry
+        acc[..., k] = value & _LIMB_MASK
+        carry = value >> _LIMB_SHIFT
+    if np.any(carry):
+        raise OverflowError("Wide integer overflow")
+    return acc
+
+def wide_mul(a, b):
+    """
+    Exact product of two wide integer arrays (leading dimensions broadcast).
+    """
+    shape = np.broadcast_shapes(a.shape[:-1], b.shape[:-1])
+    acc = np.zeros(shape + (a.shape[-1] + b.shape[-1],), dtype=np.uint64)
+    for i in range(a.shape[-1]):
+        for j in range(b.shape[-1]):
+            product = a[..., i] * b[..., j]
+            acc[..., i + j] += product & _LIMB_MASK
+            acc[..., i + j + 1] += product >> _LIMB_SHIFT
+    return _carry(acc)
+
+def wide_divmod_small(wide, divisor):
+    """
+    Floor division of a wide integer array by divisors below 2**31.
+
+    Args:
+        wide (numpy.ndarray): Wide integer array
+        divisor (int or numpy.ndarray): Positive divisor(s), broadcast against the values
+
+    Returns:
+        tuple: (wide quotient, uint64 remainder)
+    """
+    divisor = np.asarray(divisor, dtype=np.uint64)
+    quotient = np.empty(np.broadcast_shapes(wide.shape[:-1], divisor.shape) + wide.shape[-1:], dtype=np.uint64)
+    remainder = np.zeros(quotient.shape[:-1], dtype=np.uint64)
+    for k in reversed(range(wide.shape[-1])):
+        current = (remainder << _LIMB_SHIFT) | wide[..., k]
+        quotient[..., k] = current // divisor
+        remainder = current - quotient[..., k] * divisor
+    return quotient, remainder
+
+def _divisor_chunks(denominator):
+    # floor(floor(x / a) / b) == floor(x / (a * b)), so a large constant divisor can be
+    # applied as a chain of short divisions
+    chunks = []
+    while denominator >= _MAX_SHORT_DIVISOR:
+        for factor in (10**9, 2**30):
+            if denominator % factor == 0:
+                chunks.append(factor)
+                denominator //= factor
+                break
+        else:
+            raise ValueError(f"Denominator {denominator} has no factorization into short divisors")
+    chunks.append(denominator)
+    return chunks
+
+def wide_floordiv(wide, denominator):
+    """
+    Floor division of a wide integer array by a constant (e.g. RATE_PRECISION) or by an
+    array of divisors below 2**31.
+    """
+    if np.ndim(denominator):
+        return wide_divmod_small(wide, denominator)[0]
+    for chunk in _divisor_chunks(int(denominator)):
+        wide = wide_divmod_small(wide, chunk)[0]
+    return wide
+
+def mul_div(a, b, denominator):
+    """
+    a * b / denominator with Solidity integer semantics, elementwise and overflow-safe.
+
+    Results are truncated toward zero (floor for non-negative operands). Products that
+    provably fit in int64 take a direct path; otherwise the product is formed exactly in
+    wide limbs. A zero array denominator gives 0 at that point instead of reverting.
+
+    Args:
+        a, b (array-like): int64 operands
+        denominator (int or numpy.ndarray): Constant, or non-negative divisors below 2**31
+
+    Returns:
+        numpy.ndarray: int64 quotients
+    """
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64))
+    negative = (a < 0) ^ (b < 0)
+    abs_a, abs_b = np.abs(a), np.abs(b)
+    # Any ndarray (0-d included, e.g. one utilization) may hold zeros; only plain ints are constants
+    array_denominator = isinstance(denominator, np.ndarray) or np.ndim(denominator) > 0
+    if array_denominator:
+        denominator = np.broadcast_to(np.asarray(denominator, dtype=np.int64), a.shape)
+        zero = denominator == 0
+        divisor = np.where(zero, 1, denominator)
+    else:
+        divisor = denominator
+
+    bound = int(abs_a.max(initial=0)) * int(abs_b.max(initial=0))
+    if bound < 2**63:
+        quotient = (abs_a * abs_b) // divisor
+    else:
+        wide = wide_mul(to_wide(abs_a, 2), to_wide(abs_b, 2))
+        quotient = wide_to_int64(wide_floordiv(wide, divisor.astype(np.uint64) if array_denominator else divisor))
+    quotient = np.where(negative, -quotient, quotient)
+    return np.where(zero, 0, quotient) if array_denominator else quotient
+
+# --- Unit conversions -------------------------------------------------------------
+
+def apr_to_rate_per_sec(apr):
+    """
+    Quantize APRs (floats) to per-second rates at RATE_PRECISION, rounding to nearest.
+    """
+    return np.rint(np.asarray(apr, dtype=float) * (RATE_PRECISION / SECONDS_PER_YEAR)).astype(np.int64)
+
+def rate_per_sec_to_apr(rate_per_sec):
+    """
+    Convert per-second rates at RATE_PRECISION back to float APRs.
+    """
+    return np.asarray(rate_per_sec, dtype=float) * (SECONDS_PER_YEAR / RATE_PRECISION)
+
+def utilization_to_fixed(utilization_rate):
+    """
+    Quantize utilization fractions to UTIL_PRECISION, rounding to nearest.
+    """
+    return np.rint(np.asarray(utilization_rate, dtype=float) * UTIL_PRECISION).astype(np.int64)
+
+# --- Rate kernels -----------------------------------------------------------------
+#
+# Integer counterparts of the data_fetcher rate kernels. Inputs and outputs are
+# per-second rates at RATE_PRECISION and utilization at UTIL_PRECISION.
+
+def _broadcast_fixed(*values):
+    return np.broadcast_arrays(*(np.asarray(value, dtype=np.int64) for value in values))
+
+def frxUSDRatesFixed(utilization, borrowRate, sfrxusdRate):
+    utilization, borrowRate, sfrxusdRate = _broadcast_fixed(utilization, borrowRate, sfrxusdRate)
+    return {
+        'lentAPR': mul_div(borrowRate, utilization, UTIL_PRECISION),
+        'unlentAPR': np.zeros(utilization.shape, dtype=np.int64),
+        'borrowAPR': borrowRate.copy()
+    }
+
+def sfrxUSDRatesFixed(utilization, borrowRate, sfrxusdRate):
+    utilization, borrowRate, sfrxusdRate = _broadcast_fixed(utilization, borrowRate, sfrxusdRate)
+    return {
+        'lentAPR': mul_div(borrowRate, utilization, UTIL_PRECISION),
+        'unlentAPR': mul_div(sfrxusdRate, UTIL_PRECISION - utilization, UTIL_PRECISION),
+        'borrowAPR': borrowRate.copy()
+    }
+
+def getRatesFixed(utilization, borrowRate, sfrxusdRate):
+    return {
+        'frxUSDRates': frxUSDRatesFixed(utilization, borrowRate, sfrxusdRate),
+        'sfrxUSDRates': sfrxUSDRatesFixed(utilization, borrowRate, sfrxusdRate)
+    }
+
+def calcfrxUSDBorrowRateFixed(utilization, lendRate, sfrxusdRate):
+    """
+    Integer calcfrxUSDBorrowRate. Zero utilization gives a zero borrowAPR.
+    """
+    utilization, lendRate, sfrxusdRate = _broadcast_fixed(utilization, lendRate, sfrxusdRate)
+    return {
+        'lentAPR': lendRate.copy(),
+        'unlentAPR': np.zeros(utilization.shape, dtype=np.int64),
+        'borrowAPR': mul_div(lendRate, UTIL_PRECISION, utilization)
+    }
+
+def calcsfrxUSDBorrowRateFixed(utilization, lendRate, sfrxusdRate):
+    """
+    Integer calcsfrxUSDBorrowRate. Zero utilization gives zero lentAPR and borrowAPR.
+    """
+    utilization, lendRate, sfrxusdRate = _broadcast_fixed(utilization, lendRate, sfrxusdRate)
+    unlentAPR = mul_div(sfrxusdRate, UTIL_PRECISION - utilization, UTIL_PRECISION)
+    borrowRate = mul_div(lendRate - unlentAPR, UTIL_PRECISION, utilization)
+    return {
+        'lentAPR': mul_div(borrowRate, utilization, UTIL_PRECISION),
+        'unlentAPR': unlentAPR,
+        'borrowAPR': borrowRate
+    }
+
+def getBorrowRatesFixed(utilization, lendRate, sfrxusdRate):
+    return {
+        'frxUSDRates': calcfrxUSDBorrowRateFixed(utilization, lendRate, sfrxusdRate),
+        'sfrxUSDRates': calcsfrxUSDBorrowRateFixed(utilization, lendRate, sfrxusdRate)
+    }
+
+def accrue_interest(principal, rate_per_sec, seconds, wide=False):
+    """
+    Interest accrued on each position as the pair computes it:
+    seconds * principal * rate_per_sec / RATE_PRECISION, floored.
+
+    Args:
+        principal (array-like): Borrowed amounts as integers (NumPy integers, or Python
+            ints for amounts beyond uint64), or a wide integer array if wide is True
+        rate_per_sec (array-like): Per-second rates at RATE_PRECISION
+        seconds (array-like): Elapsed seconds
+        wide (bool): principal is already a wide integer array whose last axis holds limbs
+
+    Returns:
+        numpy.ndarray: Wide integer array of accrued interest (see from_wide)
+    """
+    principal = np.asarray(principal)
+    if not wide:
+        principal = to_wide(principal)
+    elif principal.dtype != np.uint64 or principal.ndim == 0:
+        raise TypeError(f"A wide principal must be a uint64 array of limbs, got {principal.dtype} "
+                        f"with shape {principal.shape}")
+    with span('accrue_interest', positions=int(np.prod(principal.shape[:-1]))):
+        factor = wide_mul(to_wide(np.asarray(seconds, dtype=np.int64), 2),
+                          to_wide(np.asarray(rate_per_sec, dtype=np.int64), 2))
+        return wide_floordiv(wide_mul(principal, factor), RATE_PRECISION)
+
+# --- Float-facing backend -----------------------------------------------------------
+
+def _to_apr(rates, utilization=None):
+    out = {}
+    for market_key, market_rates in rates.items():
+        out[market_key] = {apr_type: rate_per_sec_to_apr(value) for apr_type, value in market_rates.items()}
+        if utilization is not None:
+            # Match the float path, which has no borrow rate at zero utilization
+            undefined = utilization == 0
+            out[market_key]['borrowAPR'] = np.where(undefined, np.nan, out[market_key]['borrowAPR'])
+            if market_key == 'sfrxUSDRates':
+                out[market_key]['lentAPR'] = np.where(undefined, np.nan, out[market_key]['lentAPR'])
+    return out
+
+def getRatesArrayFixed(utilization_rate, borrowRate, sfrxusdInterestRate):
+    """
+    getRatesArray evaluated with contract integer arithmetic: float inputs are quantized
+    to contract precision, the kernels run on integers and results return as float APRs.
+    """
+    with span('rates_fixed'):
+        return _to_apr(getRatesFixed(
+            utilization_to_fixed(utilization_rate),
+            apr_to_rate_per_sec(borrowRate),
+            apr_to_rate_per_sec(sfrxusdInterestRate)
+        ))
+
+def getBorrowRatesArrayFixed(utilization_rate, lendRate, sfrxusdInterestRate):
+    """
+    getBorrowRatesArray evaluated with contract integer arithmetic, as getRatesArrayFixed.
+    """
+    utilization = utilization_to_fixed(utilization_rate)
+    with span('borrow_rates_fixed'):
+        return _to_apr(getBorrowRatesFixed(
+            utilization,
+            apr_to_rate_per_sec(lendRate),
+            apr_to_rate_per_sec(sfrxusdInterestRate)
+        ), utilization)
+
+def cross_check(utilization_rate, rate, sfrxusd_interest_rate, by_borrow_rate=True, atol=1e-10):
+    """
+    Compare the integer backend against the float kernels.
+
+    Inputs are first quantized to contract precision, and the float kernels are run on
+    the quantized values, so any difference comes from integer rounding alone (at most a
+    few wei per second, about 1e-10 APR). The borrow rate inverse divides by utilization,
+    which scales its rounding by UTIL_PRECISION / utilization, so atol scales with it there.
+
+    Args:
+        utilization_rate, rate, sfrxusd_interest_rate: As for getRatesArray (rate is the
+            borrow rate) or getBorrowRatesArray (rate is the lend rate)
+        by_borrow_rate (bool): Check getRates (True) or getBorrowRates (False)
+        atol (float): Largest acceptable absolute APR difference
+
+    Returns:
+        dict: 'ok', largest raw 'max_abs_diff', per-series 'diffs' and the number of 'points'
+    """
+    utilization = utilization_to_fixed(utilization_rate)
+    rate_fixed = apr_to_rate_per_sec(rate)
+    sfrxusd_fixed = apr_to_rate_per_sec(sfrxusd_interest_rate)
+    quantized = (utilization / UTIL_PRECISION, rate_per_sec_to_apr(rate_fixed), rate_per_sec_to_apr(sfrxusd_fixed))
+
+    tolerance = atol
+    if by_borrow_rate:
+        exact = _to_apr(getRatesFixed(utilization, rate_fixed, sfrxusd_fixed))
+        reference = {'frxUSDRates': frxUSDRatesArray(*quantized), 'sfrxUSDRates': sfrxUSDRatesArray(*quantized)}
+    else:
+        exact = _to_apr(getBorrowRatesFixed(utilization, rate_fixed, sfrxusd_fixed), utilization)
+        reference = {'frxUSDRates': calcfrxUSDBorrowRateArray(*quantized),
+                     'sfrxUSDRates': calcsfrxUSDBorrowRateArray(*quantized)}
+        tolerance = atol * UTIL_PRECISION / np.maximum(utilization, 1)
+
+    diffs = {}
+    ok = True
+    points = 0
+    for market in MARKETS:
+        for apr_type in APR_TYPES:
+            a = exact[f'{market}Rates'][apr_type]
+            b = reference[f'{market}Rates'][apr_type]
+            points = max(points, np.size(a))
+            if (np.isfinite(a) != np.isfinite(b)).any():
+                diffs[f'{market}.{apr_type}'] = float('inf')
+                ok = False
+                continue
+            diff = np.abs(np.where(np.isfinite(a), a - b, 0.0))
+            diffs[f'{market}.{apr_type}'] = float(diff.max(initial=0.0))
+            ok &= bool(np.all(diff <= tolerance))
+    return {'ok': ok, 'max_abs_diff': max(diffs.values()), 'diffs': diffs, 'points': points}
+
+if __name__ == "__main__":
+    # Cross-check the integer backend on grids and on scalar (0-d) inputs, zero utilization included
+    grid = np.linspace(0, 1, 101)[:, None, None], np.linspace(0, 0.5, 51)[None, :, None], np.linspace(0, 0.2, 21)
+    cases = {'grid': grid, 'scalar': (0.85, 0.10, 0.08), 'scalar, zero utilization': (0.0, 0.05, 0.08)}
+    failed = False
+    for name, inputs in cases.items():
+        for by_borrow_rate in (True, False):
+            result = cross_check(*inputs, by_borrow_rate=by_borrow_rate)
+            failed |= not result['ok']
+            print(f"{name:26} {'getRates' if by_borrow_rate else 'getBorrowRates':15} "
+                  f"{'ok' if result['ok'] else 'FAILED':7} max diff {result['max_abs_diff']:.2e} over {result['points']} points")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,459 @@
+import base64
+import html
+import json
+import os
+import zlib
+
+import numpy as np
+
+import data_fetcher
+from data_fetcher import APR_TYPES, MARKETS, sweep_rates
+from instrumentation import span
+
+# Slider ranges of the interactive notebook; each starts at 0 and moves in SLIDER_STEP steps
+SLIDERS = {
+    'utilization_rate': {'label': 'Utilization Rate', 'max': 1.0, 'value': 0.85},
+    'borrow_rate': {'label': 'Borrow APR', 'max': 0.20, 'value': 0.10},
+    'sfrxusd_interest_rate': {'label': 'sfrxUSD Rate', 'max': 0.20, 'value': 0.08},
+}
+SLIDER_STEP = 0.01
+# The lend rate chart sweeps lend rates over the borrow rate slider's range
+LEND_RATE_AXIS = 'borrow_rate'
+# Utilization points of the first chart, as in generate_apr_comparison_data
+UTILIZATION_CHART_POINTS = np.linspace(0, 1, 21)
+
+# Cube values are stored as multiples of QUANTUM in 32-bit integers; anything beyond
+# +-QUANTUM * 2**31 (214 = 21,400% APR) cannot be embedded
+QUANTUM = 1e-7
+
+def slider_grid(name, sliders=None):
+    """
+    Every value a slider can take, e.g. 0.00, 0.01, ..., 0.20.
+    """
+    slider = (sliders or SLIDERS)[name]
+    return np.linspace(0, slider['max'], int(round(slider['max'] / SLIDER_STEP)) + 1)
+
+def build_cubes(sliders=None):
+    """
+    Evaluate both markets at every slider position.
+
+    Returns:
+        dict: 'rates', a RateCube over (utilization_rate, borrow_rate, sfrxusd_interest_rate)
+        for the borrow-rate charts, and 'borrow', over (utilization_rate, lend_rate,
+        sfrxusd_interest_rate) for the lend-rate chart
+    """
+    utilization = slider_grid('utilization_rate', sliders)
+    rate = slider_grid('borrow_rate', sliders)
+    lend = slider_grid(LEND_RATE_AXIS, sliders)
+    sfrxusd = slider_grid('sfrxusd_interest_rate', sliders)
+    return {
+        'rates': sweep_rates(utilization, sfrxusd, borrow_rate=rate),
+        'borrow': sweep_rates(utilization, sfrxusd, lend_rate=lend),
+    }
+
+def encode_cubes(cubes, quantum=QUANTUM):
+    """
+    Pack cubes into one compressed binary blob.
+
+    Each (cube, market, apr_type) series is flattened in C order. Constant series are
+    kept in the metadata only. Others are quantized to integer multiples of quantum,
+    delta-coded along the flattened grid (the rates are piecewise linear, so most deltas
+    repeat), split into four byte planes and deflated together. Series with NaNs (zero
+    utilization has no borrow rate) also carry a byte mask.
+
+    Returns:
+        tuple: (metadata dict, zlib-compressed bytes)
+    """
+    planes = []
+    offset = 0
+    meta = {'quantum': quantum, 'series': [], 'cubes': {}}
+    for cube_name, cube in cubes.items():
+        meta['cubes'][cube_name] = {
+            'axes': {name: values.tolist() for name, values in cube.axes.items()},
+            'shape': list(cube.shape[:-2]),
+        }
+        points = int(np.prod(cube.shape[:-2]))
+        for m, market in enumerate(MARKETS):
+            for a, apr_type in enumerate(APR_TYPES):
+                values = np.ascontiguousarray(cube.values[..., m, a], dtype=float).ravel()
+                entry = {'cube': cube_name, 'market': market, 'apr_type': apr_type, 'points': points}
+                nan = np.isnan(values)
+                finite = values[~nan]
+                if len(finite) and np.all(finite == finite[0]) and not nan.any():
+                    entry.update(kind='constant', value=float(finite[0]))
+                    meta['series'].append(entry)
+                    continue
+                quantized = np.round(np.where(nan, 0.0, values) / quantum)
+                if np.abs(quantized).max(initial=0) >= 2**31:
+                    raise ValueError(f"{cube_name} {market} {apr_type} exceeds the embeddable range "
+                                     f"of +-{quantum * 2**31:g}")
+                # Deltas wrap in int32; the page sums them back with 32-bit integer addition
+                deltas = np.diff(quantized.astype(np.int64), prepend=0).astype(np.int32)
+                entry.update(kind='delta', offset=offset)
+                planes.append(deltas.view(np.uint8).reshape(-1, 4).T.tobytes())
+                offset += 4 * points
+                if nan.any():
+                    entry['nan_offset'] = offset
+                    planes.append(nan.astype(np.uint8).tobytes())
+                    offset += points
+                meta['series'].append(entry)
+    return meta, zlib.compress(b''.join(planes), 9)
+
+def decode_cubes(meta, blob):
+    """
+    Inverse of encode_cubes, as the page does it.
+
+    Returns:
+        dict: {(cube, market, apr_type): array shaped like the cube's grid}
+    """
+    raw = np.frombuffer(zlib.decompress(blob), dtype=np.uint8)
+    out = {}
+    for entry in meta['series']:
+        points = entry['points']
+        shape = meta['cubes'][entry['cube']]['shape']
+        if entry['kind'] == 'constant':
+            values = np.full(points, entry['value'])
+        else:
+            planes = raw[entry['offset']:entry['offset'] + 4 * points].reshape(4, points)
+            deltas = np.ascontiguousarray(planes.T).view(np.int32).ravel()
+            values = np.cumsum(deltas, dtype=np.int32) * meta['quantum']
+            if 'nan_offset' in entry:
+                values[raw[entry['nan_offset']:entry['nan_offset'] + points] == 1] = np.nan
+        out[(entry['cube'], entry['market'], entry['apr_type'])] = values.reshape(shape)
+    return out
+
+def export_html(path, sliders=None, title="Fraxlend APR Comparison: frxUSD vs sfrxUSD"):
+    """
+    Write a standalone page that draws the three comparison charts in the browser.
+
+    Both markets are precomputed at every slider position (see build_cubes) and embedded
+    in the page, so moving a slider only indexes the decoded arrays and repaints a
+    canvas: no kernel, server or network access is needed after the page loads.
+
+    Args:
+        path (str): Output .html file
+        sliders (dict, optional): Overrides for SLIDERS, e.g. a wider borrow rate range
+        title (str): Page title
+
+    Returns:
+        dict: 'path', 'bytes' (page size), 'points' (grid points per cube) and
+        'max_error' (largest quantization error)
+    """
+    from visualization import StackedAPRChart
+
+    sliders = {name: {**SLIDERS[name], **(sliders or {}).get(name, {})} for name in SLIDERS}
+    with span('export_html'):
+        cubes = build_cubes(sliders)
+        meta, blob = encode_cubes(cubes)
+        decoded = decode_cubes(meta, blob)
+        max_error = max(float(np.nanmax(np.abs(decoded[(name, market, apr_type)]
+                                               - cubes[name].values[..., m, a]), initial=0))
+                        for name in cubes for m, market in enumerate(MARKETS)
+                        for a, apr_type in enumerate(APR_TYPES))
+
+        utilization = slider_grid('utilization_rate', sliders)
+        meta.update({
+            'sliders': {name: {**slider, 'step': SLIDER_STEP} for name, slider in sliders.items()},
+            'utilization_chart_index': [int(np.argmin(np.abs(utilization - u))) for u in UTILIZATION_CHART_POINTS],
+            'style': {
+                'colors': StackedAPRChart.colors,
+                'line_colors': StackedAPRChart.line_colors,
+                'rate_color': '#8e44ad',
+            },
+            'rate_backend': data_fetcher.RATE_BACKEND,
+        })
+        page = (PAGE_TEMPLATE
+                .replace('__TITLE__', html.escape(title))
+                .replace('__META__', json.dumps(meta, separators=(',', ':')))
+                .replace('__DATA__', base64.b64encode(blob).decode('ascii')))
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(page)
+        os.replace(tmp_path, path)
+    return {'path': path, 'bytes': len(page.encode()), 'points': meta['cubes']['rates']['shape'],
+            'max_error': max_error}
+
+PAGE_TEMPLATE = r'''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>__TITLE__</title>
+<style>
+  body { font-family: "DejaVu Sans", Arial, sans-serif; margin: 24px auto; max-width: 1100px; color: #222; }
+  h1 { font-size: 24px; }
+  h2 { font-size: 19px; margin-top: 32px; }
+  .sliders { position: sticky; top: 0; background: #fff; padding: 8px 0; z-index: 1; border-bottom: 1px solid #eee; }
+  .slider { display: flex; align-items: center; gap: 12px; margin: 4px 0; }
+  .slider label { width: 140px; }
+  .slider input { width: 320px; }
+  .slider output { width: 48px; font-variant-numeric: tabular-nums; }
+  canvas { width: 100%; height: 560px; display: block; }
+  .note { color: #777; font-size: 12px; }
+</style>
+</head>
+<body>
+<h1>__TITLE__</h1>
+<div class="sliders" id="sliders"></div>
+<h2>APR Comparison: frxUSD vs sfrxUSD</h2>
+<canvas id="chart-utilization"></canvas>
+<h2>APR Comparison by Utilization</h2>
+<canvas id="chart-borrow"></canvas>
+<h2>APR Comparison by Lend Rate</h2>
+<canvas id="chart-lend"></canvas>
+<p class="note" id="note"></p>
+<script type="application/octet-stream" id="cube-data">__DATA__</script>
+<script>
+"use strict";
+const META = __META__;
+const MARKETS = ['frxUSD', 'sfrxUSD'];
+
+async function loadSeries() {
+  const text = document.getElementById('cube-data').textContent.trim();
+  const bytes = Uint8Array.from(atob(text), c => c.charCodeAt(0));
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+  const raw = new Uint8Array(await new Response(stream).arrayBuffer());
+  const series = {};
+  for (const s of META.series) {
+    const out = new Float64Array(s.points);
+    if (s.kind === 'constant') {
+      out.fill(s.value);
+    } else {
+      // Four byte planes of int32 deltas, summed with wrapping 32-bit addition
+      const n = s.points, o = s.offset;
+      let acc = 0;
+      for (let i = 0; i < n; i++) {
+        acc = (acc + (raw[o + i] | (raw[o + n + i] << 8) | (raw[o + 2 * n + i] << 16) | (raw[o + 3 * n + i] << 24))) | 0;
+        out[i] = acc * META.quantum;
+      }
+      if (s.nan_offset !== undefined) {
+        for (let i = 0; i < n; i++) if (raw[s.nan_offset + i]) out[i] = NaN;
+      }
+    }
+    series[`${s.cube}.${s.market}.${s.apr_type}`] = out;
+  }
+  return series;
+}
+
+function pct(v, digits) { return (v * 100).toFixed(digits) + '%'; }
+
+function niceTicks(lo, hi) {
+  const span = hi - lo || 1;
+  const raw = span / 8, mag = Math.pow(10, Math.floor(Math.log10(raw)));
+  const step = [1, 2, 2.5, 5, 10].map(m => m * mag).find(s => s >= raw);
+  const ticks = [];
+  for (let t = Math.ceil(lo / step) * step; t <= hi + step * 1e-9; t += step) ticks.push(t);
+  return {ticks, digits: Math.max(1, -Math.floor(Math.log10(step * 100) + 1e-9) + 1)};
+}
+
+// Stacked lent/unlent bars per market with borrow lines and the sfrxUSD rate, in the
+// style of visualization.StackedAPRChart
+function drawChart(canvas, chart) {
+  const style = META.style;
+  const dpr = window.devicePixelRatio || 1;
+  const W = canvas.clientWidth, H = canvas.clientHeight;
+  if (canvas.width !== Math.round(W * dpr) || canvas.height !== Math.round(H * dpr)) {
+    canvas.width = Math.round(W * dpr);
+    canvas.height = Math.round(H * dpr);
+  }
+  const g = canvas.getContext('2d');
+  g.setTransform(dpr, 0, 0, dpr, 0, 0);
+  g.clearRect(0, 0, W, H);
+  const pad = {l: 72, r: 215, t: 46, b: 72};
+  const pw = W - pad.l - pad.r, ph = H - pad.t - pad.b;
+  const n = chart.labels.length;
+
+  let lo = Math.min(0, chart.rate), hi = Math.max(0, chart.rate);
+  for (const m of MARKETS) {
+    const d = chart.data[m];
+    for (let i = 0; i < n; i++) {
+      for (const v of [d.lent[i], d.lent[i] + d.unlent[i], d.borrow[i]]) {
+        if (Number.isFinite(v)) { lo = Math.min(lo, v); hi = Math.max(hi, v); }
+      }
+    }
+  }
+  const margin = (hi - lo || 0.01) * 0.05;
+  hi += margin;
+  if (lo < 0) lo -= margin;
+  const x = v => pad.l + (v + 0.6) / (n + 0.2) * pw;
+  const y = v => pad.t + (hi - v) / (hi - lo) * ph;
+
+  // Grid and axes
+  const {ticks, digits} = niceTicks(lo, hi);
+  g.font = '12px sans-serif';
+  g.fillStyle = '#333';
+  g.strokeStyle = '#ccc';
+  g.lineWidth = 1;
+  g.textAlign = 'right';
+  g.textBaseline = 'middle';
+  g.setLineDash([4, 3]);
+  for (const t of ticks) {
+    g.beginPath(); g.moveTo(pad.l, y(t)); g.lineTo(pad.l + pw, y(t)); g.stroke();
+    g.fillText(pct(t, digits), pad.l - 6, y(t));
+  }
+  g.setLineDash([]);
+  g.strokeStyle = '#999';
+  g.strokeRect(pad.l, pad.t, pw, ph);
+  g.save();
+  g.beginPath(); g.rect(pad.l, pad.t, pw, ph); g.clip();
+
+  // Bars
+  const width = 0.35, unit = pw / (n + 0.2);
+  MARKETS.forEach((m, k) => {
+    const d = chart.data[m], offset = k === 0 ? -width / 2 : width / 2;
+    for (let i = 0; i < n; i++) {
+      const left = x(i + offset - width / 2), w = width * unit;
+      const lent = d.lent[i], total = d.lent[i] + d.unlent[i];
+      // Undefined rates (zero utilization) get no bar, as in matplotlib
+      if (!Number.isFinite(total)) continue;
+      g.fillStyle = style.colors[m][0];
+      g.fillRect(left, Math.min(y(0), y(lent)), w, Math.abs(y(0) - y(lent)));
+      g.fillStyle = style.colors[m][1];
+      const top = Math.min(y(lent), y(total)), h = Math.abs(y(lent) - y(total));
+      g.fillRect(left, top, w, h);
+      if (m === 'sfrxUSD' && h > 0) {
+        g.save();
+        g.beginPath(); g.rect(left, top, w, h); g.clip();
+        g.strokeStyle = 'rgba(255,255,255,0.8)';
+        for (let s = -h; s < w; s += 7) { g.beginPath(); g.moveTo(left + s, top + h); g.lineTo(left + s + h, top); g.stroke(); }
+        g.restore();
+      }
+    }
+  });
+
+  // sfrxUSD interest rate
+  g.strokeStyle = style.rate_color; g.lineWidth = 2; g.setLineDash([7, 4]);
+  g.beginPath(); g.moveTo(pad.l, y(chart.rate)); g.lineTo(pad.l + pw, y(chart.rate)); g.stroke();
+
+  // Borrow lines
+  const lines = chart.perMarketBorrow
+    ? MARKETS.map(m => ({label: `${m} Borrow APR`, color: style.line_colors[m], values: chart.data[m].borrow, dash: m === 'frxUSD' ? [] : [8, 4]}))
+    : [{label: 'Borrow APR', color: '#e74c3c', values: chart.data.frxUSD.borrow, dash: []}];
+  for (const line of lines) {
+    g.strokeStyle = g.fillStyle = line.color; g.lineWidth = 2.5; g.setLineDash(line.dash);
+    g.beginPath();
+    let pen = false;
+    for (let i = 0; i < n; i++) {
+      const v = line.values[i];
+      if (!Number.isFinite(v)) { pen = false; continue; }
+      pen ? g.lineTo(x(i), y(v)) : g.moveTo(x(i), y(v));
+      pen = true;
+    }
+    g.stroke();
+    g.setLineDash([]);
+    for (let i = 0; i < n; i++) {
+      if (Number.isFinite(line.values[i])) { g.beginPath(); g.arc(x(i), y(line.values[i]), 2.5, 0, 2 * Math.PI); g.fill(); }
+    }
+  }
+  g.restore();
+
+  // x labels, title
+  g.fillStyle = '#333'; g.textAlign = 'right'; g.textBaseline = 'top';
+  for (let i = 0; i < n; i += chart.tickStep) {
+    g.save(); g.translate(x(i) + 4, pad.t + ph + 6); g.rotate(-Math.PI / 4); g.fillText(chart.labels[i], 0, 0); g.restore();
+  }
+  g.textAlign = 'center';
+  g.font = '14px sans-serif';
+  g.fillText(chart.xlabel, pad.l + pw / 2, pad.t + ph + 50);
+  g.font = '17px sans-serif';
+  g.textBaseline = 'bottom';
+  g.fillText(chart.title, pad.l + pw / 2, pad.t - 14);
+  g.save(); g.translate(16, pad.t + ph / 2); g.rotate(-Math.PI / 2); g.font = '14px sans-serif'; g.fillText('APR', 0, 0); g.restore();
+
+  // Legend
+  const entries = [
+    ...lines.map(l => ({type: 'line', color: l.color, dash: l.dash, label: l.label})),
+    {type: 'line', color: style.rate_color, dash: [7, 4], label: 'sfrxUSD Interest Rate'},
+    ...MARKETS.flatMap(m => [
+      {type: 'bar', color: style.colors[m][0], label: `${m} Lent APR`},
+      {type: 'bar', color: style.colors[m][1], label: `${m} Unlent APR`, hatch: m === 'sfrxUSD'},
+    ]),
+  ];
+  const lx = pad.l + pw + 16;
+  g.font = '12px sans-serif'; g.textAlign = 'left'; g.textBaseline = 'middle';
+  entries.forEach((e, i) => {
+    const ly = pad.t + 10 + i * 20;
+    if (e.type === 'line') {
+      g.strokeStyle = e.color; g.lineWidth = 2.5; g.setLineDash(e.dash);
+      g.beginPath(); g.moveTo(lx, ly); g.lineTo(lx + 24, ly); g.stroke(); g.setLineDash([]);
+    } else {
+      g.fillStyle = e.color; g.fillRect(lx, ly - 6, 24, 12);
+      if (e.hatch) {
+        g.strokeStyle = 'rgba(255,255,255,0.8)'; g.lineWidth = 1;
+        for (let s = 0; s < 24; s += 7) { g.beginPath(); g.moveTo(lx + s, ly + 6); g.lineTo(lx + s + 6, ly - 6); g.stroke(); }
+      }
+    }
+    g.fillStyle = '#333'; g.fillText(e.label, lx + 32, ly);
+  });
+}
+
+function main(series) {
+  const axes = META.cubes.rates.axes;
+  const [nu, nb, ns] = META.cubes.rates.shape;
+  const nl = META.cubes.borrow.shape[1];
+  const state = {};
+  const container = document.getElementById('sliders');
+  for (const [name, s] of Object.entries(META.sliders)) {
+    const row = document.createElement('div');
+    row.className = 'slider';
+    const steps = Math.round(s.max / s.step);
+    row.innerHTML = `<label>${s.label}:</label><input type="range" min="0" max="${steps}" step="1"><output></output>`;
+    const input = row.querySelector('input'), output = row.querySelector('output');
+    input.value = Math.round(s.value / s.step);
+    const read = () => { state[name] = +input.value; output.textContent = pct(state[name] * s.step, 0); };
+    input.addEventListener('input', () => { read(); schedule(); });
+    read();
+    container.appendChild(row);
+  }
+
+  const pick = (cube, m, type, indices) => indices.map(i => series[`${cube}.${m}.${type}`][i]);
+  const market = (cube, indices) => Object.fromEntries(MARKETS.map(m => [m, {
+    lent: pick(cube, m, 'lentAPR', indices),
+    unlent: pick(cube, m, 'unlentAPR', indices),
+    borrow: pick(cube, m, 'borrowAPR', indices),
+  }]));
+  const range = k => Array.from({length: k}, (_, i) => i);
+
+  function render() {
+    const u = state.utilization_rate, b = state.borrow_rate, s = state.sfrxusd_interest_rate;
+    const rate = axes.sfrxusd_interest_rate[s], util = axes.utilization_rate[u];
+    const ui = META.utilization_chart_index;
+    drawChart(document.getElementById('chart-utilization'), {
+      title: `APR Comparison: frxUSD vs sfrxUSD (${pct(axes.borrow_rate[b], 0)} Borrow Rate)`,
+      xlabel: 'Utilization Rate', tickStep: 1, perMarketBorrow: false, rate,
+      labels: ui.map(i => pct(axes.utilization_rate[i], 0)),
+      data: market('rates', ui.map(i => (i * nb + b) * ns + s)),
+    });
+    drawChart(document.getElementById('chart-borrow'), {
+      title: `APR Comparison at ${pct(util, 0)} Utilization`,
+      xlabel: 'Borrow Rate', tickStep: 5, perMarketBorrow: false, rate,
+      labels: axes.borrow_rate.map(v => pct(v, 0)),
+      data: market('rates', range(nb).map(j => (u * nb + j) * ns + s)),
+    });
+    drawChart(document.getElementById('chart-lend'), {
+      title: `APR Comparison by Lend Rate at ${pct(util, 0)} Utilization`,
+      xlabel: 'Lend Rate', tickStep: 5, perMarketBorrow: true, rate,
+      labels: META.cubes.borrow.axes.lend_rate.map(v => pct(v, 0)),
+      data: market('borrow', range(nl).map(j => (u * nl + j) * ns + s)),
+    });
+  }
+
+  let pending = false;
+  function schedule() {
+    if (pending) return;
+    pending = true;
+    requestAnimationFrame(() => { pending = false; render(); });
+  }
+  window.addEventListener('resize', schedule);
+  render();
+  document.getElementById('note').textContent =
+    `${nu * nb * ns} slider positions per chart precomputed with the ${META.rate_backend} rate backend; ` +
+    `values exact to ${META.quantum} APR.`;
+}
+
+loadSeries().then(main);
+</script>
+</body>
+</html>
+'''
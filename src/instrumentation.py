@@ -0,0 +1,225 @@
+import importlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+
+class Tracer:
+    """
+    Collects named timing spans into one structured trace per run or slider event.
+
+    Spans are cheap no-ops while the tracer is disabled. When enabled, every span opened
+    inside trace() is recorded with its offset, duration and nesting depth. When the trace
+    closes it is written as JSON to trace_dir (if set) and passed to listeners. Optional
+    cProfile and tracemalloc capture can be switched on per tracer.
+
+    Environment:
+        FRAXLEND_TRACE: Enable tracing ("1")
+        FRAXLEND_TRACE_DIR: Directory for JSON traces (default: output/traces)
+        FRAXLEND_PROFILE: Comma-separated capture modes: "cprofile", "tracemalloc"
+    """
+    def __init__(self, enabled=False, trace_dir=None, profile=()):
+        self.enabled = enabled
+        self.trace_dir = trace_dir
+        self.profile = set(profile)
+        self.listeners = []
+        self.last_trace = None
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls):
+        profile = [mode.strip() for mode in os.environ.get('FRAXLEND_PROFILE', '').split(',') if mode.strip()]
+        return cls(
+            enabled=os.environ.get('FRAXLEND_TRACE', '') not in ('', '0') or bool(profile),
+            trace_dir=os.environ.get('FRAXLEND_TRACE_DIR', os.path.join('output', 'traces')),
+            profile=profile
+        )
+
+    def configure(self, enabled=None, trace_dir=None, profile=None):
+        if enabled is not None:
+            self.enabled = enabled
+        if trace_dir is not None:
+            self.trace_dir = trace_dir
+        if profile is not None:
+            self.profile = set(profile)
+
+    def add_listener(self, listener):
+        """
+        Call listener(trace dict) whenever a trace completes.
+        """
+        self.listeners.append(listener)
+
+    def span(self, name, **attrs):
+        """
+        Time a named stage, e.g. `with span('savefig', dpi=300): ...`.
+        """
+        record = getattr(self._local, 'record', None)
+        if not self.enabled or record is None:
+            return nullcontext()
+        return self._span(record, name, attrs)
+
+    @contextmanager
+    def _span(self, record, name, attrs):
+        depth = self._local.depth
+        self._local.depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._local.depth -= 1
+            record['spans'].append({
+                'name': name,
+                'start_s': start - record['_t0'],
+                'duration_s': end - start,
+                'depth': depth,
+                'attrs': attrs
+            })
+
+    @contextmanager
+    def trace(self, name, **attrs):
+        """
+        Collect the spans of one run or event into a trace record.
+
+        Nested trace() calls on the same thread fold into the outer trace as a span.
+        """
+        if not self.enabled:
+            yield None
+            return
+        if getattr(self._local, 'record', None) is not None:
+            with self.span(name, **attrs):
+                yield self._local.record
+            return
+
+        record = {
+            'id': uuid.uuid4().hex[:12],
+            'name': name,
+            'attrs': attrs,
+            'timestamp': time.time(),
+            'spans': [],
+            '_t0': time.perf_counter()
+        }
+        self._local.record = record
+        self._local.depth = 0
+
+        # Profilers load only when asked for, to keep them off the startup path
+        profiler = None
+        if 'cprofile' in self.profile:
+            import cProfile
+            profiler = cProfile.Profile()
+        trace_memory = False
+        if 'tracemalloc' in self.profile:
+            import tracemalloc
+            trace_memory = not tracemalloc.is_tracing()
+        if trace_memory:
+            tracemalloc.start()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record['duration_s'] = time.perf_counter() - record.pop('_t0')
+            self._local.record = None
+            record['spans'].sort(key=lambda s: s['start_s'])
+            if profiler is not None:
+                record['cprofile'] = self._profile_summary(profiler, record['id'])
+            if trace_memory:
+                snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                record['tracemalloc'] = {
+                    'current_mb': current / 2**20,
+                    'peak_mb': peak / 2**20,
+                    'top': [str(stat) for stat in snapshot.statistics('lineno')[:15]]
+                }
+            self._finish(record)
+
+    def _profile_summary(self, profiler, trace_id):
+        stats_path = None
+        if self.trace_dir:
+            os.makedirs(self.trace_dir, exist_ok=True)
+            stats_path = os.path.join(self.trace_dir, f'{trace_id}.prof')
+            profiler.dump_stats(stats_path)
+        import pstats
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(25)
+        return {'stats_file': stats_path, 'top_cumulative': out.getvalue().splitlines()}
+
+    def _finish(self, record):
+        self.last_trace = record
+        if self.trace_dir:
+            os.makedirs(self.trace_dir, exist_ok=True)
+            path = os.path.join(self.trace_dir, f"{record['name']}-{record['id']}.json")
+            with open(path, 'w') as f:
+                json.dump(record, f, indent=2, default=str)
+        for listener in self.listeners:
+            listener(record)
+
+def stage_totals(trace):
+    """
+    Aggregate a trace's spans by name.
+
+    Returns:
+        list: (span name, call count, total seconds) sorted by total time, descending
+    """
+    totals = {}
+    for s in trace['spans']:
+        count, total = totals.get(s['name'], (0, 0.0))
+        totals[s['name']] = (count + 1, total + s['duration_s'])
+    return sorted(((name, count, total) for name, (count, total) in totals.items()),
+                  key=lambda row: row[2], reverse=True)
+
+def format_trace(trace):
+    """
+    Render a trace as a small fixed-width stage timing table.
+    """
+    lines = [f"{trace['name']}: {trace['duration_s'] * 1000:.1f} ms"]
+    for name, count, total in stage_totals(trace):
+        lines.append(f"  {name:36} {count:4d}x {total * 1000:9.1f} ms")
+    return '\n'.join(lines)
+
+# Process-wide tracer; instrumented modules use span() below
+TRACER = Tracer.from_env()
+
+def span(name, **attrs):
+    return TRACER.span(name, **attrs)
+
+# Libraries whose import dominates startup; import_report() lists which ones a run loaded
+HEAVY_MODULES = ('numpy', 'pandas', 'matplotlib', 'seaborn', 'pyarrow')
+
+# Seconds spent in first imports made through timed_import(), in load order
+IMPORT_TIMES = {}
+
+def timed_import(name):
+    """
+    Import a module, recording how long its first import took in IMPORT_TIMES.
+
+    Time is attributed to the first name that pulls a dependency in, so import heavy
+    libraries before the modules that use them for a per-library breakdown.
+    """
+    if name not in sys.modules:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        IMPORT_TIMES[name] = time.perf_counter() - start
+    return sys.modules[name]
+
+def import_report():
+    """
+    Render the timed imports and the heavy libraries this process has loaded.
+
+    Returns:
+        str: Fixed-width report; run under `python -X importtime` for a full breakdown
+    """
+    lines = ['Imports:']
+    for name, seconds in IMPORT_TIMES.items():
+        lines.append(f'  {name:36} {seconds * 1000:9.1f} ms')
+    lines.append(f"  {'total':36} {sum(IMPORT_TIMES.values()) * 1000:9.1f} ms")
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    lines.append(f"Heavy libraries loaded: {', '.join(loaded) or 'none'}")
+    return '\n'.join(lines)
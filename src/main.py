@@ -1,67 +1,354 @@
-from data_fetcher import (
-    generate_apr_comparison_data,
-    generate_fixed_util_apr_data,
-    generate_lend_rate_comparison_data
-)
-from visualization import (
-    plot_stacked_apr_comparison,
-    plot_fixed_util_apr_comparison,
-    plot_lend_rate_apr_comparison
-)
+import argparse
+import contextlib
+import csv
+import json
 import os
+import sys
+
+from instrumentation import TRACER, Tracer, format_trace, import_report, timed_import
+
+# Chart inputs used unless live values are read from chain (see --rpc-url)
+DEFAULT_INPUTS = {
+    'sfrxusd_interest_rate': 0.08,  # 8% sfrxUSD interest rate
+    'utilization_rate': 0.85,  # 85% utilization
+    'borrow_rate': 0.10,  # 10% borrow rate
+}
+
+# Render tiers of visualization.RENDER_TIERS, listed here so parsing arguments does not load matplotlib
+RENDER_QUALITIES = ('preview', 'publication')
+
+def load_visualization():
+    """
+    Import the plotting stack on first use, timing each library for import_report().
+    """
+    for name in ('matplotlib', 'matplotlib.pyplot', 'pandas', 'seaborn'):
+        timed_import(name)
+    return timed_import('visualization')
+
+def use_headless_backend():
+    # CLI renders only write files, so pick Agg before pyplot loads unless MPLBACKEND says otherwise
+    if not os.environ.get('MPLBACKEND'):
+        timed_import('matplotlib').use('Agg')
+
+def main(quality='publication', fmt='png', progressive=False, apy=None, inputs=None):
+    """
+    Generate the default charts into the 'output' directory.
+
+    Args:
+        quality (str): Render tier, 'preview' or 'publication'
+        fmt (str): Output format: 'png', 'svg' or 'pdf'
+        progressive (bool): Write a preview of every chart first, then the publication
+            charts in the background; returns once all of them are written
+        apy (str, optional): Also mark total APY at this compounding interval
+        inputs (dict, optional): Overrides for DEFAULT_INPUTS, e.g. from live_inputs()
+    """
+    with TRACER.trace('main', quality=quality, format=fmt, progressive=progressive, apy=apy):
+        _render_default_charts(quality, fmt, progressive, apy, {**DEFAULT_INPUTS, **(inputs or {})})
+
+def compute(inputs=None, charts=None):
+    """
+    Evaluate the APR series behind the default charts without loading pandas or any
+    plotting library.
+
+    Args:
+        inputs (dict, optional): Overrides for DEFAULT_INPUTS, e.g. from live_inputs()
+        charts (list, optional): Chart types from batch.CHART_PARAMS (default: all)
+
+    Returns:
+        dict: The inputs and, per chart, its parameters, swept axis and APR series
+    """
+    batch = timed_import('batch')
+    inputs = {**DEFAULT_INPUTS, **(inputs or {})}
+    results = {}
+    with TRACER.trace('compute', charts=charts):
+        for chart in charts or batch.CHART_PARAMS:
+            params = {key: inputs.get(key, default) for key, default in batch.CHART_PARAMS[chart].items()}
+            series = batch.scenario_series({'chart': chart, **params})
+            results[chart] = {'params': params, **series.to_dict()}
+    return {'inputs': inputs, 'charts': results}
+
+def write_computed(results, path='-', fmt='json'):
+    """
+    Write compute() results as JSON, or as CSV with one row per chart point and one
+    column per (market, apr_type) series.
+
+    Args:
+        results (dict): Output of compute()
+        path (str): Output file, or '-' for stdout
+        fmt (str): 'json' or 'csv'
+    """
+    from data_fetcher import APR_TYPES, MARKETS
+
+    with (contextlib.nullcontext(sys.stdout) if path == '-' else open(path, 'w', newline='')) as f:
+        if fmt == 'json':
+            json.dump(results, f, indent=2)
+            f.write('\n')
+            return
+
+        writer = csv.writer(f)
+        writer.writerow(['chart', 'axis_name', 'axis_value']
+                        + [f'{market}_{apr_type}' for market in MARKETS for apr_type in APR_TYPES])
+        for chart, result in results['charts'].items():
+            series = [result['series'][market][apr_type] for market in MARKETS for apr_type in APR_TYPES]
+            for i, value in enumerate(result['axis']):
+                writer.writerow([chart, result['axis_name'], value] + ['' if s[i] is None else s[i] for s in series])
+
+def live_inputs(pair, vault=None, rpc_url=None, cache_dir=None):
+    """
+    Read chart inputs for one Fraxlend pair (and the sfrxUSD vault rate) from chain.
+    """
+    from chain_reader import BlockCache, RpcClient, read_pair_states
+
+    with RpcClient(rpc_url) as client:
+        snapshot = read_pair_states([pair], vault, client=client, cache=BlockCache(cache_dir))
+    state = snapshot['pairs'][pair]
+    inputs = {'utilization_rate': state['utilization_rate'], 'borrow_rate': state['borrow_rate']}
+    if snapshot['sfrxusd_interest_rate'] is not None:
+        inputs['sfrxusd_interest_rate'] = snapshot['sfrxusd_interest_rate']
+    print(f"Read pair {pair} at block {snapshot['block']}: "
+          + ', '.join(f'{name}={value:.2%}' for name, value in inputs.items()))
+    return inputs
+
+def store_inputs(pair, store_dir=None, when=None):
+    """
+    Read chart inputs for one Fraxlend pair from the time-series store, as of when
+    (seconds or a date string; default: the latest row).
+    """
+    from timeseries_store import TimeSeriesStore
+
+    row = TimeSeriesStore(store_dir).at(pair, when)
+    inputs = {name: row[name] for name in ('utilization_rate', 'borrow_rate', 'sfrxusd_interest_rate')
+              if row[name] == row[name]}
+    print(f"Read pair {pair} at block {row['block']} from the store: "
+          + ', '.join(f'{name}={value:.2%}' for name, value in inputs.items()))
+    return inputs
+
+def _render_default_charts(quality='publication', fmt='png', progressive=False, apy=None, inputs=DEFAULT_INPUTS):
+    from data_fetcher import (
+        generate_apr_comparison_data,
+        generate_fixed_util_apr_data,
+        generate_lend_rate_comparison_data
+    )
+    visualization = load_visualization()
 
-def main():
     # Create output directory if it doesn't exist
     output_dir = 'output'
     os.makedirs(output_dir, exist_ok=True)
-    
+
+    pending = []
+    def save_chart(plot_fn, *args, name, **kwargs):
+        save_path = os.path.join(output_dir, f'{name}.{fmt}')
+        if progressive:
+            pending.append(visualization.render_progressive(plot_fn, *args, save_path=save_path, apy=apy, **kwargs))
+        else:
+            plot_fn(*args, save_path=save_path, quality=quality, apy=apy, **kwargs)
+
     # Common parameters
-    sfrxusd_interest_rate = 0.08  # 8% sfrxUSD interest rate
-    utilization_rate = 0.85  # 85% utilization
-    
-    # Generate first visualization - varying utilization at 10% borrow rate
-    borrow_rate = 0.10  # 10% borrow rate
+    sfrxusd_interest_rate = inputs['sfrxusd_interest_rate']
+    utilization_rate = inputs['utilization_rate']
+
+    # Generate first visualization - varying utilization at the borrow rate
+    borrow_rate = inputs['borrow_rate']
     apr_data, borrow_rates = generate_apr_comparison_data(borrow_rate, sfrxusd_interest_rate)
-    
-    plot_stacked_apr_comparison(
+
+    save_chart(
+        visualization.plot_stacked_apr_comparison,
         apr_data,
         borrow_rates,
         sfrxusd_interest_rate,
-        title="APR Comparison: frxUSD vs sfrxUSD (10% Borrow Rate)",
-        save_path=os.path.join(output_dir, 'apr_by_utilization.png')
+        title=f"APR Comparison: frxUSD vs sfrxUSD ({borrow_rate:.0%} Borrow Rate)",
+        name='apr_by_utilization'
     )
-    
+
     # Generate second visualization - varying borrow rate at 85% utilization
     fixed_util_data, fixed_util_borrow_rates = generate_fixed_util_apr_data(
         utilization_rate=utilization_rate,
         sfrxusd_interest_rate=sfrxusd_interest_rate
     )
-    
-    plot_fixed_util_apr_comparison(
+
+    save_chart(
+        visualization.plot_fixed_util_apr_comparison,
         fixed_util_data,
         fixed_util_borrow_rates,
         sfrxusd_interest_rate,
         utilization_rate=utilization_rate,
         title=f"APR Comparison at {utilization_rate:.0%} Utilization",
-        save_path=os.path.join(output_dir, 'apr_by_borrow_rate.png')
+        name='apr_by_borrow_rate'
     )
-    
+
     # Generate third visualization - varying lend rate at 85% utilization
     lend_rate_data, lend_rate_borrow_rates = generate_lend_rate_comparison_data(
         utilization_rate=utilization_rate,
         sfrxusd_interest_rate=sfrxusd_interest_rate
     )
-    
-    plot_lend_rate_apr_comparison(
+
+    save_chart(
+        visualization.plot_lend_rate_apr_comparison,
         lend_rate_data,
         lend_rate_borrow_rates,
         sfrxusd_interest_rate,
         utilization_rate=utilization_rate,
         title=f"APR Comparison by Lend Rate at {utilization_rate:.0%} Utilization",
-        save_path=os.path.join(output_dir, 'apr_by_lend_rate.png')
+        name='apr_by_lend_rate'
     )
-    
+
+    if pending:
+        print("Previews written; finishing publication renders in the background...")
+        for future in pending:
+            future.result()
+
     print("APR comparison graphs have been generated in the 'output' directory.")
 
+def parse_args(argv=None):
+    # The option choices load numpy; timed so import_report() shows it
+    for name in ('numpy', 'accrual', 'batch'):
+        timed_import(name)
+    from accrual import COMPOUNDING_INTERVALS
+    from batch import CHART_PARAMS
+
+    # Option groups shared by the top-level parser and the commands
+    inputs = argparse.ArgumentParser(add_help=False)
+    inputs.add_argument('--rpc-url', default=os.environ.get('FRAXLEND_RPC_URL'),
+                        help="JSON-RPC endpoint for reading live inputs (with --pair)")
+    inputs.add_argument('--pair', help="Fraxlend pair address to take utilization and borrow rate from")
+    inputs.add_argument('--vault', help="sfrxUSD vault address to take the sfrxUSD interest rate from")
+    inputs.add_argument('--rpc-cache', default=None, help="Block-keyed RPC result cache (default: output/rpc_cache)")
+    inputs.add_argument('--store', default=None,
+                        help="Time-series store to take --pair inputs from instead of the RPC endpoint")
+    inputs.add_argument('--at', default=None, help="With --store: read inputs as of this date or timestamp")
+
+    rendering = argparse.ArgumentParser(add_help=False)
+    rendering.add_argument('--quality', choices=RENDER_QUALITIES, default='publication',
+                           help="Render tier: fast low-dpi previews or 300 dpi publication output")
+    rendering.add_argument('--format', dest='fmt', choices=['png', 'svg', 'pdf'], default='png', help="Chart file format")
+    rendering.add_argument('--apy', choices=list(COMPOUNDING_INTERVALS), default=None,
+                           help="Also mark each market's total APY at this compounding interval")
+    rendering.add_argument('--render-cache', default=os.environ.get('FRAXLEND_RENDER_CACHE'),
+                           help="Content-addressed render cache directory; unchanged charts are linked instead of re-rendered")
+
+    tracing = argparse.ArgumentParser(add_help=False)
+    tracing.add_argument('--trace', action='store_true', help="Record stage timings as JSON traces (also FRAXLEND_TRACE=1)")
+    tracing.add_argument('--trace-dir', default=None, help="Directory for JSON traces (default: output/traces)")
+    tracing.add_argument('--profile', action='append', choices=['cprofile', 'tracemalloc'], default=None,
+                         help="Capture a cProfile and/or tracemalloc profile with each trace")
+    tracing.add_argument('--import-report', action='store_true',
+                         help="Print how long library imports took and which heavy libraries were loaded")
+
+    parser = argparse.ArgumentParser(
+        description="Generate Fraxlend frxUSD vs sfrxUSD APR comparison charts.",
+        parents=[inputs, rendering, tracing],
+        epilog="Without a command, renders the default charts, or runs --manifest, --html or --gc-render-cache. "
+               "Options of a command go after its name."
+    )
+    parser.add_argument('--manifest', help="JSON/YAML/CSV scenario manifest to render in batch mode")
+    parser.add_argument('--output-dir', default='output', help="Directory for batch charts and index.json")
+    parser.add_argument('--workers', type=int, default=None, help="Number of render processes (default: CPU count)")
+    parser.add_argument('--progressive', action='store_true',
+                        help="Write previews first and publication charts in the background")
+    parser.add_argument('--html', default=None,
+                        help="Write a standalone interactive HTML page with every slider position precomputed, then exit")
+    parser.add_argument('--gc-render-cache', action='store_true',
+                        help="Garbage-collect the render cache and rewrite its manifest, then exit")
+    parser.add_argument('--max-age-days', type=float, default=None, help="GC: drop artifacts unused for this many days")
+    parser.add_argument('--max-cache-bytes', type=int, default=None, help="GC: drop least recently used artifacts beyond this size")
+
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    compute_parser = commands.add_parser('compute', parents=[inputs, tracing],
+                                         help="Write the charts' APR series as JSON or CSV without rendering")
+    compute_parser.add_argument('--chart', action='append', choices=list(CHART_PARAMS), default=None,
+                                help="Chart to evaluate; repeat for several (default: all)")
+    compute_parser.add_argument('--format', dest='fmt', choices=['json', 'csv'], default='json', help="Output format")
+    compute_parser.add_argument('--output', '-o', default='-', help="Output file (default: stdout)")
+
+    render_parser = commands.add_parser('render', parents=[inputs, rendering, tracing],
+                                        help="Render the default charts into 'output'")
+    render_parser.add_argument('--progressive', action='store_true',
+                               help="Write previews first and publication charts in the background")
+
+    batch_parser = commands.add_parser('batch', parents=[rendering, tracing], help="Render a scenario manifest")
+    batch_parser.add_argument('manifest', help="JSON/YAML/CSV scenario manifest")
+    batch_parser.add_argument('--output-dir', default='output', help="Directory for batch charts and index.json")
+    batch_parser.add_argument('--workers', type=int, default=None, help="Number of render processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    # The top-level mode flags select what runs when no command is given
+    if args.command is not None:
+        modes = [flag for flag, value in (('--manifest', args.command != 'batch' and args.manifest),
+                                          ('--html', args.html),
+                                          ('--gc-render-cache', args.gc_render_cache)) if value]
+        if modes:
+            parser.error(f"{', '.join(modes)} cannot be combined with the {args.command} command")
+    return args
+
+def configure_tracing(args):
+    # Exported through the environment so batch workers trace the same way
+    if args.trace or args.profile:
+        os.environ['FRAXLEND_TRACE'] = '1'
+    if args.trace_dir:
+        os.environ['FRAXLEND_TRACE_DIR'] = args.trace_dir
+    if args.profile:
+        os.environ['FRAXLEND_PROFILE'] = ','.join(args.profile)
+    configured = Tracer.from_env()
+    TRACER.configure(enabled=configured.enabled, trace_dir=configured.trace_dir, profile=configured.profile)
+
+def resolve_inputs(args):
+    """
+    Chart inputs from --pair (and --store), or None for DEFAULT_INPUTS.
+    """
+    if args.pair and args.store:
+        return store_inputs(args.pair, args.store, args.at)
+    if args.pair:
+        return live_inputs(args.pair, args.vault, args.rpc_url, args.rpc_cache)
+    return None
+
+def run(args):
+    """
+    Run the command (or legacy top-level mode) selected by parse_args().
+    """
+    if args.command == 'compute':
+        # Keep stdout clean for the data when it is written there
+        with contextlib.redirect_stdout(sys.stderr) if args.output == '-' else contextlib.nullcontext():
+            inputs = resolve_inputs(args)
+        write_computed(compute(inputs, args.chart), args.output, args.fmt)
+        if TRACER.last_trace is not None:
+            print(format_trace(TRACER.last_trace), file=sys.stderr)
+        return
+
+    render_cache = None
+    if args.render_cache:
+        from render_cache import RenderCache
+        render_cache = RenderCache(args.render_cache)
+    if args.command is None and args.gc_render_cache:
+        if render_cache is None:
+            raise SystemExit("--gc-render-cache needs --render-cache or FRAXLEND_RENDER_CACHE")
+        result = render_cache.gc(max_age_days=args.max_age_days, max_bytes=args.max_cache_bytes)
+        print(f"Removed {result['removed']} artifacts ({result['freed_bytes']} bytes); {result['kept']} kept.")
+        return
+    elif args.command is None and args.html:
+        from html_export import export_html
+        result = export_html(args.html)
+        print(f"Wrote {result['path']} ({result['bytes'] / 1024:.0f} KiB, "
+              f"{'x'.join(map(str, result['points']))} slider positions per chart).")
+    elif args.command == 'batch' or (args.command is None and args.manifest):
+        from batch import load_manifest, run_batch
+        scenarios = load_manifest(args.manifest)
+        records = run_batch(scenarios, args.output_dir, workers=args.workers, render_cache_dir=args.render_cache,
+                            quality=args.quality, fmt=args.fmt, apy=args.apy)
+        failed = sum(record['status'] != 'ok' for record in records)
+        print(f"Rendered {len(records) - failed}/{len(records)} scenarios into '{args.output_dir}'.")
+    else:
+        use_headless_backend()
+        load_visualization().RENDER_CACHE = render_cache
+        inputs = resolve_inputs(args)
+        main(quality=args.quality, fmt=args.fmt, progressive=args.progressive, apy=args.apy, inputs=inputs)
+        if TRACER.last_trace is not None:
+            print(format_trace(TRACER.last_trace))
+    if render_cache is not None:
+        render_cache.write_manifest()
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    args = parse_args()
+    configure_tracing(args)
+    run(args)
+    if args.import_report:
+        print(import_report(), file=sys.stderr)
@@ -0,0 +1,314 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from data_fetcher import MARKETS, getRatesArray
+from instrumentation import span
+
+# Mean-reverting (Ornstein-Uhlenbeck) processes, parameters per year. Utilization
+# reverts in logit space so it stays inside (0, 1); the sfrxUSD rate reverts in level
+# space and is floored at zero.
+SCENARIO_PARAMS = {
+    'utilization': {'start': 0.85, 'mean': 0.85, 'speed': 12.0, 'vol': 1.5},
+    'sfrxusd_interest_rate': {'start': 0.08, 'mean': 0.06, 'speed': 4.0, 'vol': 0.03},
+    # Correlation of the frxUSD and sfrxUSD utilization shocks
+    'utilization_correlation': 0.5,
+}
+
+# Path-level metrics, each the time average of an APR over the horizon
+METRICS = (
+    'frxUSD_lender_apr',
+    'sfrxUSD_lender_apr',
+    'excess_lender_yield',
+    'frxUSD_borrow_apr',
+    'sfrxUSD_borrow_apr',
+    'borrower_savings',
+)
+
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+class StreamingStats:
+    """
+    Mergeable running summary of a stream of values.
+
+    Count, mean, variance (Chan's parallel update), min, max and the share of values
+    above zero are exact. Percentiles come from a fixed-bin histogram over [lo, hi]
+    with linear interpolation inside a bin, so memory is constant however many values
+    are added. Values outside the range are counted in under/overflow bins.
+    """
+    def __init__(self, lo=-1.0, hi=2.0, bins=30_000):
+        self.lo = lo
+        self.hi = hi
+        self.bins = bins
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.positive = 0
+        self.nan = 0
+        self.hist = np.zeros(bins + 2, dtype=np.int64)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        finite = np.isfinite(values)
+        if not finite.all():
+            self.nan += int(values.size - finite.sum())
+            values = values[finite]
+        n = values.size
+        if not n:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean)**2).sum())
+        self._combine(n, batch_mean, batch_m2)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.positive += int(np.count_nonzero(values > 0))
+
+        # Bin 0 is underflow, bin bins+1 overflow
+        index = np.floor((values - self.lo) * (self.bins / (self.hi - self.lo))).astype(np.int64) + 1
+        np.clip(index, 0, self.bins + 1, out=index)
+        self.hist += np.bincount(index, minlength=self.bins + 2)
+
+    def _combine(self, n, mean, m2):
+        total = self.count + n
+        delta = mean - self.mean
+        self.m2 += m2 + delta**2 * self.count * n / total
+        self.mean += delta * n / total
+        self.count = total
+
+    def merge(self, other):
+        if (other.lo, other.hi, other.bins) != (self.lo, self.hi, self.bins):
+            raise ValueError("Cannot merge StreamingStats with different histogram ranges")
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self.positive += other.positive
+            self.hist += other.hist
+        self.nan += other.nan
+        return self
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else float('nan')
+
+    def quantile(self, q):
+        """
+        Approximate q-quantile (0 <= q <= 1), accurate to one bin width inside [lo, hi].
+        Quantiles falling in the under/overflow bins are reported as min/max.
+        """
+        if not self.count:
+            return float('nan')
+        rank = q * self.count
+        cumulative = np.cumsum(self.hist)
+        i = int(np.searchsorted(cumulative, rank, side='left'))
+        if i == 0:
+            return self.min
+        if i == self.bins + 1:
+            return self.max
+        width = (self.hi - self.lo) / self.bins
+        before = cumulative[i - 1]
+        fraction = (rank - before) / self.hist[i] if self.hist[i] else 0.0
+        return float(np.clip(self.lo + (i - 1 + fraction) * width, self.min, self.max))
+
+    def summary(self, percentiles=PERCENTILES):
+        return {
+            'count': self.count,
+            'mean': self.mean if self.count else float('nan'),
+            'std': self.std,
+            'min': self.min,
+            'max': self.max,
+            'share_positive': self.positive / self.count if self.count else float('nan'),
+            'nan': self.nan,
+            'percentiles': {p: self.quantile(p / 100) for p in percentiles}
+        }
+
+def _scenario_params(params):
+    merged = {key: dict(value) if isinstance(value, dict) else value for key, value in SCENARIO_PARAMS.items()}
+    for key, value in (params or {}).items():
+        if key not in merged:
+            raise ValueError(f"Unknown scenario parameter {key!r}; expected one of {sorted(SCENARIO_PARAMS)}")
+        if isinstance(value, dict):
+            merged[key].update(value)
+        else:
+            merged[key] = value
+    return merged
+
+def _ou_paths(start, mean, speed, vol, step_years, shocks):
+    # Exact OU discretization, stepped along the leading (time) axis for all paths at once
+    decay = np.exp(-speed * step_years)
+    scale = vol * np.sqrt((1 - decay**2) / (2 * speed)) if speed > 0 else vol * np.sqrt(step_years)
+    paths = np.empty_like(shocks)
+    current = np.full(shocks.shape[1:], start - mean, dtype=shocks.dtype)
+    for t in range(shocks.shape[0]):
+        current *= decay
+        current += scale * shocks[t]
+        paths[t] = current
+    paths += mean
+    return paths
+
+def _logit(p):
+    return np.log(p / (1 - p))
+
+def sample_paths(rng, n_paths, steps, step_years, params=None, dtype=np.float64):
+    """
+    Sample utilization (per market) and sfrxUSD rate paths.
+
+    Args:
+        rng (numpy.random.Generator): Random stream
+        n_paths (int): Number of paths
+        steps (int): Time steps per path
+        step_years (float): Step length in years
+        params (dict, optional): Overrides for SCENARIO_PARAMS
+        dtype (numpy.dtype): float64, or float32 for faster sampling
+
+    Returns:
+        dict: 'frxUSD' and 'sfrxUSD' utilization and 'sfrxusd_interest_rate' arrays,
+        each of shape (steps, n_paths)
+    """
+    p = _scenario_params(params)
+    shocks = rng.standard_normal((3, steps, n_paths), dtype=dtype)
+    rho = p['utilization_correlation']
+    # Correlate the sfrxUSD utilization shocks with the frxUSD ones in place
+    shocks[1] *= np.sqrt(1 - rho**2)
+    shocks[1] += rho * shocks[0]
+
+    u = p['utilization']
+    paths = {}
+    for market, market_shocks in zip(MARKETS, shocks[:2]):
+        logits = _ou_paths(_logit(u['start']), _logit(u['mean']), u['speed'], u['vol'], step_years, market_shocks)
+        # Logistic transform in place: 1 / (1 + exp(-x))
+        np.negative(logits, out=logits)
+        np.exp(logits, out=logits)
+        logits += 1
+        np.reciprocal(logits, out=logits)
+        paths[market] = logits
+
+    s = p['sfrxusd_interest_rate']
+    rate = _ou_paths(s['start'], s['mean'], s['speed'], s['vol'], step_years, shocks[2])
+    paths['sfrxusd_interest_rate'] = np.maximum(rate, 0, out=rate)
+    return paths
+
+def evaluate_paths(paths, borrow_rate, step_years, controller_params=None):
+    """
+    Time-averaged lender and borrower APRs of each path.
+
+    Args:
+        paths (dict): Output of sample_paths
+        borrow_rate (float or str): Fixed borrow APR, or 'controller' to drive each
+            market's borrow rate with rate_controller.simulate_full_rate
+        step_years (float): Step length in years
+        controller_params (dict, optional): Overrides for VARIABLE_RATE_PARAMS
+
+    Returns:
+        dict: {metric: array of shape (n_paths,)} for every name in METRICS
+    """
+    s = paths['sfrxusd_interest_rate']
+    averages = {}
+    for market in MARKETS:
+        u = paths[market]
+        if borrow_rate == 'controller':
+            from rate_controller import simulate_full_rate, borrow_rate_curve
+            full = simulate_full_rate(u.T, step_years * 365 * 86400, params=controller_params).T
+            market_borrow = borrow_rate_curve(u, full, controller_params)
+        else:
+            market_borrow = borrow_rate
+        rates = getRatesArray(u, market_borrow, s)[f'{market}Rates']
+        averages[f'{market}_lender_apr'] = (rates['lentAPR'] + rates['unlentAPR']).mean(axis=0)
+        averages[f'{market}_borrow_apr'] = rates['borrowAPR'].mean(axis=0)
+    averages['excess_lender_yield'] = averages['sfrxUSD_lender_apr'] - averages['frxUSD_lender_apr']
+    averages['borrower_savings'] = averages['frxUSD_borrow_apr'] - averages['sfrxUSD_borrow_apr']
+    return {metric: averages[metric] for metric in METRICS}
+
+def _run_shard(shard):
+    # Worker entry point: one reproducible RNG stream per shard, reduced batch by batch
+    rng = np.random.Generator(np.random.PCG64(shard['seed']))
+    stats = {metric: StreamingStats(*shard['histogram']) for metric in METRICS}
+    remaining = shard['paths']
+    while remaining:
+        n = min(remaining, shard['batch_paths'])
+        paths = sample_paths(rng, n, shard['steps'], shard['step_years'], shard['params'], shard['dtype'])
+        for metric, values in evaluate_paths(paths, shard['borrow_rate'], shard['step_years'],
+                                             shard['controller_params']).items():
+            stats[metric].update(values)
+        remaining -= n
+    return stats
+
+def run_monte_carlo(n_paths=1_000_000, steps=365, step_years=1 / 365, borrow_rate=0.10, params=None,
+                    controller_params=None, seed=0, shard_paths=50_000, batch_paths=10_000, workers=None,
+                    histogram=(-1.0, 2.0, 30_000), percentiles=PERCENTILES, dtype=np.float64):
+    """
+    Monte Carlo distribution of frxUSD vs sfrxUSD lender and borrower APRs.
+
+    Paths are split into shards of shard_paths, each with its own RNG stream spawned
+    from `seed`, so results depend only on the seed and shard size, not on the number
+    of workers. Shards run on a process pool and are reduced into StreamingStats batch by
+    batch, so memory is bounded by batch_paths * steps whatever n_paths is.
+
+    Args:
+        n_paths (int): Number of simulated paths
+        steps (int): Time steps per path
+        step_years (float): Step length in years (default: one day)
+        borrow_rate (float or str): Fixed borrow APR, or 'controller' for the
+            variable-rate controller
+        params (dict, optional): Overrides for SCENARIO_PARAMS
+        controller_params (dict, optional): Overrides for VARIABLE_RATE_PARAMS
+        seed (int): Root seed
+        shard_paths (int): Paths per shard (unit of parallel work and of RNG streams)
+        batch_paths (int): Paths evaluated at once inside a shard
+        workers (int, optional): Worker processes (default: CPU count); 1 runs in-process
+        histogram (tuple): (lo, hi, bins) of the percentile histograms
+        percentiles (tuple): Percentiles to report
+        dtype (numpy.dtype): Path dtype; float32 samples faster
+
+    Returns:
+        dict: Per-metric summaries plus 'prob_sfrxusd_outperforms',
+        'expected_excess_yield' and run metadata
+    """
+    _scenario_params(params)  # Validate before starting workers
+    n_shards = -(-n_paths // shard_paths)
+    seeds = np.random.SeedSequence(seed).spawn(n_shards)
+    shards = [{
+        'seed': seeds[i],
+        'paths': min(shard_paths, n_paths - i * shard_paths),
+        'batch_paths': batch_paths,
+        'steps': steps,
+        'step_years': step_years,
+        'borrow_rate': borrow_rate,
+        'params': params,
+        'controller_params': controller_params,
+        'histogram': histogram,
+        'dtype': dtype
+    } for i in range(n_shards)]
+
+    start = time.perf_counter()
+    totals = {metric: StreamingStats(*histogram) for metric in METRICS}
+    workers = workers or os.cpu_count()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    with span('monte_carlo', paths=n_paths, steps=steps, shards=n_shards):
+        try:
+            # map() yields in shard order, so the merged floating-point sums are reproducible
+            results = executor.map(_run_shard, shards) if executor else map(_run_shard, shards)
+            for stats in results:
+                for metric in METRICS:
+                    totals[metric].merge(stats[metric])
+        finally:
+            if executor:
+                executor.shutdown()
+
+    excess = totals['excess_lender_yield']
+    return {
+        'paths': n_paths,
+        'steps': steps,
+        'step_years': step_years,
+        'borrow_rate': borrow_rate,
+        'seed': seed,
+        'shards': n_shards,
+        'seconds': time.perf_counter() - start,
+        'prob_sfrxusd_outperforms': excess.positive / excess.count if excess.count else float('nan'),
+        'expected_excess_yield': excess.mean,
+        'metrics': {metric: totals[metric].summary(percentiles) for metric in METRICS}
+    }
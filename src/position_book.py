@@ -0,0 +1,278 @@
+import numpy as np
+import pandas as pd
+
+from accrual import log_growth
+from data_fetcher import MARKETS, getRatesArray
+from fixed_point import SECONDS_PER_YEAR
+from instrumentation import span
+
+SIDES = ('lender', 'borrower')
+
+# Per-position columns: (dtype, width). Width-len(MARKETS) columns hold one value per
+# market so every position can also be valued as if it sat in the other market.
+# 57 bytes per position with two markets.
+POSITION_COLUMNS = {
+    'account': (np.uint32, 1),
+    'market': (np.uint8, 1),         # index into MARKETS
+    'side': (np.uint8, 1),           # index into SIDES
+    'cohort': (np.uint16, 1),
+    'active': (np.bool_, 1),
+    'entry_time': (np.float64, 1),   # seconds
+    'amount': (np.float64, 1),
+    'entry_index': (np.float64, len(MARKETS)),  # rate index when the amount was last set
+    'realized': (np.float64, len(MARKETS)),     # earnings booked on resizes and removals
+}
+
+def _codes(values, names, label):
+    # Accept names or integer codes, scalar or array
+    values = np.asarray(values)
+    if values.dtype.kind in 'US':
+        codes = np.full(values.shape, -1, dtype=np.int64)
+        for i, name in enumerate(names):
+            codes[values == name] = i
+    else:
+        codes = values.astype(np.int64)
+    if np.any((codes < 0) | (codes >= len(names))):
+        raise ValueError(f"Unknown {label}; expected one of {names}")
+    return codes
+
+class PositionBook:
+    """
+    Lender and borrower positions stored as struct-of-arrays columns.
+
+    Each (market, side) pair has a cumulative rate index that advances whenever the book
+    clock moves. A position earns amount * (index now - index when its amount was set),
+    so re-pricing costs O(1) however many positions are open, and adding, resizing or
+    removing positions touches only those rows. Lender earnings are positive; borrower
+    interest is negative.
+
+    Rates come from getRatesArray: lenders earn lentAPR + unlentAPR of their market,
+    borrowers pay its borrowAPR. With compounding set (see accrual.COMPOUNDING_INTERVALS)
+    the index is kept in log space and earnings compound; otherwise they are simple.
+    """
+    def __init__(self, start_time=0.0, capacity=1024, compounding=None):
+        self.compounding = compounding
+        self.time = float(start_time)
+        self._size = 0
+        self._columns = {
+            name: np.zeros((capacity, width) if width > 1 else capacity, dtype=dtype)
+            for name, (dtype, width) in POSITION_COLUMNS.items()
+        }
+        # Signed rates per year and the cumulative index, both shaped (market, side)
+        self._rates = np.zeros((len(MARKETS), len(SIDES)))
+        self._index = np.zeros((len(MARKETS), len(SIDES)))
+        # Index history, so positions can be back-dated to any earlier time
+        self._history_times = [self.time]
+        self._history_index = [self._index.copy()]
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        return sum(column[:self._size].nbytes for column in self._columns.values())
+
+    def column(self, name):
+        """
+        Read-only view of one column for the positions added so far.
+        """
+        view = self._columns[name][:self._size].view()
+        view.flags.writeable = False
+        return view
+
+    # --- Rates ---------------------------------------------------------------------
+
+    def advance(self, time):
+        """
+        Move the book clock to time, accruing the current rates into the index.
+        """
+        time = float(time)
+        if time < self.time:
+            raise ValueError(f"Cannot move the book back from {self.time} to {time}")
+        if time == self.time:
+            return
+        seconds = time - self.time
+        if self.compounding is None:
+            growth = self._rates * (seconds / SECONDS_PER_YEAR)
+        else:
+            # Borrower debt compounds like lender balances, with the sign carried outside
+            growth = np.sign(self._rates) * log_growth(np.abs(self._rates), seconds, self.compounding)
+        self._index = self._index + growth
+        self.time = time
+        self._history_times.append(time)
+        self._history_index.append(self._index.copy())
+
+    def set_rates(self, utilization_rate, borrow_rate, sfrxusd_interest_rate, time=None):
+        """
+        Re-price every position from time onward.
+
+        Args:
+            utilization_rate, borrow_rate, sfrxusd_interest_rate (float or dict): As for
+                getRatesArray; a dict gives per-market values, e.g. {'frxUSD': 0.9, 'sfrxUSD': 0.8}
+            time (float, optional): When the new rates take effect (default: the book clock)
+        """
+        if time is not None:
+            self.advance(time)
+        def per_market(value):
+            return np.array([value[market] if isinstance(value, dict) else value for market in MARKETS], dtype=float)
+        rates = getRatesArray(per_market(utilization_rate), per_market(borrow_rate), per_market(sfrxusd_interest_rate))
+        for m, market in enumerate(MARKETS):
+            market_rates = rates[f'{market}Rates']
+            self._rates[m] = (market_rates['lentAPR'][m] + market_rates['unlentAPR'][m],
+                              -market_rates['borrowAPR'][m])
+
+    def _index_at(self, side, times):
+        # The index is linear between history points (in log space when compounding);
+        # returns shape (positions, len(MARKETS))
+        history_times = np.asarray(self._history_times)
+        history = np.asarray(self._history_index)
+        out = np.empty((len(times), len(MARKETS)))
+        for s in range(len(SIDES)):
+            rows = side == s
+            for m in range(len(MARKETS)):
+                out[rows, m] = np.interp(times[rows], history_times, history[:, m, s])
+        return out
+
+    # --- Positions -----------------------------------------------------------------
+
+    def _grow(self, needed):
+        capacity = len(self._columns['amount'])
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity)
+        for name, column in self._columns.items():
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+
+    def add(self, amount, market, side='lender', account=0, cohort=0, entry_time=None):
+        """
+        Open positions, vectorized over the arguments.
+
+        Args:
+            amount (array-like): Position sizes
+            market (array-like): Market names or codes (MARKETS)
+            side (array-like): 'lender' or 'borrower', or codes (SIDES)
+            account (array-like): Account ids
+            cohort (array-like): Cohort labels, e.g. entry month
+            entry_time (array-like, optional): Entry times no later than the book clock
+                (default: the book clock); earlier entries accrue from the index history
+
+        Returns:
+            numpy.ndarray: Position ids
+        """
+        market = _codes(market, MARKETS, 'market')
+        side = _codes(side, SIDES, 'side')
+        entry_time = np.asarray(self.time if entry_time is None else entry_time, dtype=float)
+        n = np.broadcast(np.asarray(amount), market, side, np.asarray(account), np.asarray(cohort), entry_time).size
+        entry_time = np.broadcast_to(entry_time, (n,))
+        side = np.broadcast_to(side, (n,))
+        if np.any(entry_time > self.time):
+            raise ValueError("Entry times must not be after the book clock; advance() first")
+
+        with span('position_add', positions=n):
+            ids = np.arange(self._size, self._size + n)
+            self._grow(self._size + n)
+            self._size += n
+            c = self._columns
+            c['amount'][ids] = amount
+            c['market'][ids] = market
+            c['side'][ids] = side
+            c['account'][ids] = account
+            c['cohort'][ids] = cohort
+            c['entry_time'][ids] = entry_time
+            c['active'][ids] = True
+            c['realized'][ids] = 0.0
+            if np.all(entry_time == self.time):
+                c['entry_index'][ids] = self._index[:, side].T
+            else:
+                c['entry_index'][ids] = self._index_at(side, entry_time)
+        return ids
+
+    def _accrued(self, ids):
+        # Open earnings in every market since each position's amount was last set,
+        # shape (len(ids), len(MARKETS))
+        c = self._columns
+        growth = self._index[:, c['side'][ids]].T - c['entry_index'][ids]
+        if self.compounding is not None:
+            growth = np.sign(growth) * np.expm1(np.abs(growth))
+        return np.where(c['active'][ids, None], c['amount'][ids, None] * growth, 0.0)
+
+    def resize(self, ids, amount):
+        """
+        Change position sizes at the book clock, booking earnings to date.
+        """
+        ids = np.asarray(ids)
+        c = self._columns
+        c['realized'][ids] += self._accrued(ids)
+        c['amount'][ids] = amount
+        c['entry_index'][ids] = self._index[:, c['side'][ids]].T
+
+    def remove(self, ids):
+        """
+        Close positions at the book clock. Closed rows keep their realized earnings.
+        """
+        ids = np.asarray(ids)
+        c = self._columns
+        c['realized'][ids] += self._accrued(ids)
+        c['active'][ids] = False
+
+    # --- Reporting -----------------------------------------------------------------
+
+    def earnings(self, market=None):
+        """
+        Earnings of every position up to the book clock, realized plus open.
+
+        Args:
+            market (str, optional): Value every position as if it had been in this market
+                over the same period, e.g. 'sfrxUSD' for a migration what-if
+
+        Returns:
+            numpy.ndarray: Earnings per position id
+        """
+        ids = np.arange(self._size)
+        total = self._columns['realized'][:self._size] + self._accrued(ids)
+        if market is None:
+            return total[ids, self._columns['market'][:self._size]]
+        return total[:, MARKETS.index(market)]
+
+    def aggregate(self, by='cohort', market=None):
+        """
+        Sum positions and earnings per group.
+
+        Args:
+            by (str): Column to group on: 'cohort', 'account', 'market' or 'side'
+            market (str, optional): As for earnings()
+
+        Returns:
+            pandas.DataFrame: One row per group with position count, open amount and earnings
+        """
+        if by not in ('cohort', 'account', 'market', 'side'):
+            raise ValueError(f"Cannot aggregate by {by!r}")
+        with span('position_aggregate', by=by, positions=self._size):
+            groups, inverse = np.unique(self._columns[by][:self._size], return_inverse=True)
+            open_amount = np.where(self._columns['active'][:self._size], self._columns['amount'][:self._size], 0.0)
+            frame = pd.DataFrame({
+                by: groups,
+                'positions': np.bincount(inverse, minlength=len(groups)),
+                'amount': np.bincount(inverse, weights=open_amount, minlength=len(groups)),
+                'earnings': np.bincount(inverse, weights=self.earnings(market), minlength=len(groups))
+            })
+        if by == 'market':
+            frame[by] = [MARKETS[code] for code in groups]
+        elif by == 'side':
+            frame[by] = [SIDES[code] for code in groups]
+        return frame
+
+    def migration_impact(self, target='sfrxUSD', by='account'):
+        """
+        Compare each group's earnings with what it would have earned had all of its
+        positions been in the target market.
+
+        Returns:
+            pandas.DataFrame: aggregate() columns plus 'target_earnings' and 'difference'
+        """
+        frame = self.aggregate(by)
+        frame['target_earnings'] = self.aggregate(by, market=target)['earnings'].to_numpy()
+        frame['difference'] = frame['target_earnings'] - frame['earnings']
+        return frame
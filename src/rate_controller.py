@@ -0,0 +1,261 @@
+import numpy as np
+
+from data_fetcher import MARKETS
+from instrumentation import span
+
+# Fraxlend VariableInterestRate parameters, with rates as APRs rather than per-second
+# 1e18 fixed point. Defaults follow a typical V2 deployment.
+VARIABLE_RATE_PARAMS = {
+    'min_target_utilization': 0.75,
+    'max_target_utilization': 0.85,
+    'vertex_utilization': 0.875,
+    'zero_utilization_rate': 0.005,
+    'min_full_utilization_rate': 0.05,
+    'max_full_utilization_rate': 100.0,
+    'vertex_rate_percent': 0.2,
+    'rate_half_life': 2 * 86400,  # seconds
+}
+
+def _rate_params(params):
+    merged = dict(VARIABLE_RATE_PARAMS)
+    if params:
+        unknown = set(params) - set(VARIABLE_RATE_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown rate parameters {sorted(unknown)}; expected {sorted(VARIABLE_RATE_PARAMS)}")
+        merged.update(params)
+    return merged
+
+def full_rate_log_growth(utilization, step_seconds, params=None):
+    """
+    Log of the factor the full-utilization rate is multiplied by over one step.
+
+    Below min_target_utilization the rate decays by half_life / (half_life + du^2 * dt);
+    above max_target_utilization it grows by the inverse; in between it is unchanged.
+    du is the distance outside the target band, normalized to [0, 1].
+    """
+    p = _rate_params(params)
+    utilization = np.asarray(utilization, dtype=float)
+    low, high = p['min_target_utilization'], p['max_target_utilization']
+    below = np.maximum((low - utilization) / low, 0)
+    above = np.maximum((utilization - high) / (1 - high), 0)
+    scale = np.asarray(step_seconds, dtype=float) / p['rate_half_life']
+    # At most one of above/below is non-zero, so a single log1p carries the magnitude
+    return np.copysign(np.log1p((above + below)**2 * scale), above - below)
+
+def borrow_rate_curve(utilization, full_utilization_rate, params=None):
+    """
+    Borrow APR on the kinked curve from zero_utilization_rate through the vertex to
+    full_utilization_rate, elementwise.
+    """
+    p = _rate_params(params)
+    utilization = np.asarray(utilization, dtype=float)
+    full = np.asarray(full_utilization_rate, dtype=float)
+    zero = p['zero_utilization_rate']
+    vertex_u = p['vertex_utilization']
+    vertex_rate = zero + (full - zero) * p['vertex_rate_percent']
+    return np.where(
+        utilization < vertex_u,
+        zero + utilization * (vertex_rate - zero) / vertex_u,
+        vertex_rate + (utilization - vertex_u) * (full - vertex_rate) / (1 - vertex_u)
+    )
+
+def _scan_bounded_cumsum(steps, start, lo, hi):
+    # x_t = clip(x_{t-1} + steps_t, lo, hi) along the last axis. Every step is the map
+    # x -> clip(x + d, l, h), and these maps are closed under composition:
+    #   clip(clip(x + d1, l1, h1) + d2, l2, h2) = clip(x + d1 + d2, clip(l1 + d2, l2, h2), clip(h1 + d2, l2, h2))
+    # so the recurrence is an inclusive prefix scan done in log2(T) vectorized passes.
+    d = steps.copy()
+    l = np.full_like(d, lo)
+    h = np.full_like(d, hi)
+    shift = 1
+    while shift < d.shape[-1]:
+        d_cur, l_cur, h_cur = d[..., shift:], l[..., shift:], h[..., shift:]
+        new_l = l[..., :-shift] + d_cur
+        new_h = h[..., :-shift] + d_cur
+        np.clip(new_l, l_cur, h_cur, out=new_l)
+        np.clip(new_h, l_cur, h_cur, out=new_h)
+        d[..., shift:] = d[..., :-shift] + d_cur
+        l[..., shift:] = new_l
+        h[..., shift:] = new_h
+        shift *= 2
+    return np.clip(start[..., None] + d, l, h)
+
+def _reflected_walk(steps, start, first, bound, lower):
+    # Closed form of x_t = max(bound, x_{t-1} + d_t) (min for an upper bound) from column
+    # `first` on: x_t = S_t + max(0, max_{k<=t}(bound - S_k)), S the plain cumulative sum
+    # starting from `start`. Columns before `first` hold `start`.
+    if first.any():
+        steps = np.where(np.arange(steps.shape[1]) >= first[:, None], steps, 0.0)
+    total = np.cumsum(steps, axis=1)
+    total += start[:, None]
+    slack = bound - total if lower else total - bound
+    np.maximum.accumulate(slack, axis=1, out=slack)
+    np.maximum(slack, 0, out=slack)
+    if lower:
+        total += slack
+    else:
+        total -= slack
+    return total
+
+def _bounded_cumsum(steps, start, lo, hi, chunk_steps, max_passes=8):
+    # x_t = clip(x_{t-1} + steps_t, lo, hi). Between bound switches a path is a walk
+    # reflected at one bound, so each pass solves one segment per path in closed form, up
+    # to the first step that crosses the other bound, where the path sits exactly on that
+    # bound. The next pass continues those paths from there, reflected at the other bound.
+    # Paths still switching after max_passes take the exact scan.
+    n_paths, n_steps = steps.shape
+    out = np.empty(steps.shape)
+    rows = np.arange(n_paths)
+    first = np.zeros(n_paths, dtype=np.intp)
+    value = np.asarray(start, dtype=float)
+    lower = np.ones(n_paths, dtype=bool)
+
+    for _ in range(max_passes):
+        if not rows.size:
+            return out
+        # Work on the columns from the earliest segment start onwards
+        c0 = first.min()
+        local_first = first - c0
+        window = steps[:, c0:] if rows.size == n_paths else steps[rows, c0:]
+        walk = np.empty(window.shape)
+        crossed = np.empty(window.shape, dtype=bool)
+        for mode, bound, other in ((True, lo, hi), (False, hi, lo)):
+            sel = lower == mode
+            if sel.all():
+                walk = _reflected_walk(window, value, local_first, bound, mode)
+                crossed = walk > other if mode else walk < other
+            elif sel.any():
+                walk[sel] = _reflected_walk(window[sel], value[sel], local_first[sel], bound, mode)
+                crossed[sel] = walk[sel] > other if mode else walk[sel] < other
+        after = np.arange(window.shape[1]) >= local_first[:, None]
+        crossed &= after
+        hit = crossed.any(axis=1)
+        stop = crossed.argmax(axis=1)
+
+        # Columns past a crossing are rewritten by the next pass
+        if rows.size == n_paths and c0 == 0:
+            np.copyto(out, walk, where=after)
+        else:
+            block = out[rows, c0:]
+            np.copyto(block, walk, where=after)
+            out[rows, c0:] = block
+
+        rows, lower = rows[hit], lower[hit]
+        value = np.where(lower, hi, lo)
+        first = c0 + stop[hit]
+        out[rows, first] = value
+        first += 1
+        lower = ~lower
+        active = first < n_steps
+        rows, first, value, lower = rows[active], first[active], value[active], lower[active]
+
+    # Rare paths that bounce between the bounds many times
+    for row, start_col, carry in zip(rows, first, value):
+        carry = np.array([carry])
+        for col in range(start_col, n_steps, chunk_steps):
+            chunk = _scan_bounded_cumsum(steps[row:row + 1, col:col + chunk_steps], carry, lo, hi)
+            out[row, col:col + chunk_steps] = chunk[0]
+            carry = chunk[:, -1]
+    return out
+
+def simulate_full_rate(utilization, step_seconds=3600, full_utilization_rate=None, params=None, chunk_steps=64):
+    """
+    Step the full-utilization rate controller along utilization paths.
+
+    The rate after step t reflects the utilization held during step t, as when the
+    pair accrues interest at the end of the step. In log space the update is a clamped
+    cumulative sum, evaluated for all paths and steps at once: between touches of the
+    min/max full-utilization rates each path is a reflected walk with a closed form, so
+    paths are solved one bound-to-bound segment per vectorized pass. The rare paths that
+    switch bounds very often fall back to an exact prefix scan over chunks of chunk_steps.
+
+    Args:
+        utilization (numpy.ndarray): Utilization, shape (steps,) or (paths, steps)
+        step_seconds (float or numpy.ndarray): Step length, scalar or shape (steps,)
+        full_utilization_rate (float or numpy.ndarray, optional): Starting full-utilization
+            APR per path. Defaults to min_full_utilization_rate.
+        params (dict, optional): Overrides for VARIABLE_RATE_PARAMS
+        chunk_steps (int): Steps per scan chunk for the fallback scan
+
+    Returns:
+        numpy.ndarray: Full-utilization APR after each step, same shape as utilization
+    """
+    p = _rate_params(params)
+    utilization = np.asarray(utilization, dtype=float)
+    paths = utilization.reshape(-1, utilization.shape[-1])
+    if full_utilization_rate is None:
+        full_utilization_rate = p['min_full_utilization_rate']
+    log_start = np.log(np.broadcast_to(np.asarray(full_utilization_rate, dtype=float), paths.shape[:1]))
+    lo, hi = np.log(p['min_full_utilization_rate']), np.log(p['max_full_utilization_rate'])
+
+    growth = full_rate_log_growth(paths, step_seconds, p)
+    return np.exp(_bounded_cumsum(growth, log_start, lo, hi, chunk_steps)).reshape(utilization.shape)
+
+def simulate_rates(utilization, sfrxusd_interest_rate, step_seconds=3600, full_utilization_rate=None,
+                   params=None, chunk_steps=64, dtype=np.float64):
+    """
+    Simulate borrow, lent and unlent APR time series for both markets under the
+    variable-rate controller.
+
+    Each market runs its own controller on its own utilization path. APRs are split
+    as in frxUSDRatesArray / sfrxUSDRatesArray at every step. When both markets share
+    the same path, their borrow and lent series are the same arrays.
+
+    Args:
+        utilization (numpy.ndarray or dict): Utilization paths, shape (steps,) or
+            (paths, steps), shared by both markets or given per market as
+            {'frxUSD': ..., 'sfrxUSD': ...}
+        sfrxusd_interest_rate (float or numpy.ndarray): sfrxUSD interest rate, scalar or
+            broadcastable to the path shape
+        step_seconds (float or numpy.ndarray): Step length, scalar or shape (steps,)
+        full_utilization_rate (float, numpy.ndarray or dict, optional): Starting
+            full-utilization APR, optionally per market
+        params (dict, optional): Overrides for VARIABLE_RATE_PARAMS
+        chunk_steps (int): Steps per scan chunk for the fallback scan
+        dtype (numpy.dtype): dtype of the returned series
+
+    Returns:
+        dict: {'frxUSDRates': {...}, 'sfrxUSDRates': {...}}, each holding 'lentAPR',
+        'unlentAPR', 'borrowAPR' and 'fullUtilizationAPR' arrays of the path shape
+    """
+    if not isinstance(utilization, dict):
+        utilization = {market: utilization for market in MARKETS}
+    if not isinstance(full_utilization_rate, dict):
+        full_utilization_rate = {market: full_utilization_rate for market in MARKETS}
+
+    rates = {}
+    controller = None
+    with span('simulate_rates', steps=np.shape(utilization['frxUSD'])[-1]):
+        for market in MARKETS:
+            u = np.asarray(utilization[market], dtype=float)
+            # Markets sharing a path and starting rate share the controller output
+            shared = (market != MARKETS[0] and utilization[market] is utilization[MARKETS[0]]
+                      and full_utilization_rate[market] is full_utilization_rate[MARKETS[0]])
+            if not shared:
+                with span('controller_scan', market=market):
+                    full = simulate_full_rate(u, step_seconds, full_utilization_rate[market], params, chunk_steps)
+                    borrow = borrow_rate_curve(u, full, params)
+                    controller = {
+                        'lentAPR': (borrow * u).astype(dtype, copy=False),
+                        'borrowAPR': borrow.astype(dtype, copy=False),
+                        'fullUtilizationAPR': full.astype(dtype, copy=False)
+                    }
+            if market == 'sfrxUSD':
+                unlent = (np.asarray(sfrxusd_interest_rate, dtype=float) * (1 - u)).astype(dtype, copy=False)
+                unlent = np.broadcast_to(unlent, u.shape)
+            else:
+                unlent = np.zeros(u.shape, dtype=dtype)
+            rates[f'{market}Rates'] = {
+                'lentAPR': controller['lentAPR'],
+                'unlentAPR': unlent,
+                'borrowAPR': controller['borrowAPR'],
+                'fullUtilizationAPR': controller['fullUtilizationAPR']
+            }
+    return rates
+
+def lender_advantage(rates):
+    """
+    Total lender APR of sfrxUSD minus frxUSD at every step of a simulate_rates result.
+    """
+    frx, sfrx = rates['frxUSDRates'], rates['sfrxUSDRates']
+    return (sfrx['lentAPR'] + sfrx['unlentAPR']) - (frx['lentAPR'] + frx['unlentAPR'])
@@ -0,0 +1,239 @@
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+def library_versions():
+    """
+    Versions of the libraries that affect rendered output.
+    """
+    import matplotlib
+    import pandas
+    import seaborn
+    return {
+        'numpy': np.__version__,
+        'pandas': pandas.__version__,
+        'matplotlib': matplotlib.__version__,
+        'seaborn': seaborn.__version__
+    }
+
+# Modules whose code draws cached charts; their source is part of every RenderCache key
+RENDER_MODULES = ('visualization', 'accrual')
+
+def source_digest(modules):
+    """
+    SHA-256 of the named modules' source files, so keys change whenever the code that
+    produces an artifact does.
+    """
+    h = hashlib.sha256()
+    for name in modules:
+        with open(importlib.util.find_spec(name).origin, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def _update_digest(h, obj):
+    # Canonical, type-tagged encoding so equal inputs always hash the same
+    if isinstance(obj, dict):
+        h.update(b'd')
+        for key in sorted(obj, key=str):
+            _update_digest(h, str(key))
+            _update_digest(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        h.update(b'l%d' % len(obj))
+        for item in obj:
+            _update_digest(h, item)
+    elif isinstance(obj, np.ndarray):
+        array = np.ascontiguousarray(obj)
+        h.update(f'a{array.dtype.str}{array.shape}'.encode())
+        h.update(array.tobytes())
+    elif isinstance(obj, (float, np.floating)):
+        h.update(b'f' + repr(round(float(obj), 12)).encode())
+    elif isinstance(obj, (bool, int, np.integer)):
+        h.update(b'i' + repr(int(obj)).encode())
+    elif obj is None:
+        h.update(b'n')
+    else:
+        h.update(b's' + str(obj).encode())
+
+def content_key(*parts):
+    """
+    SHA-256 content key of arbitrarily nested dicts, lists, arrays and scalars.
+    """
+    h = hashlib.sha256()
+    _update_digest(h, parts)
+    return h.hexdigest()
+
+class RenderCache:
+    """
+    Content-addressed store of rendered chart files.
+
+    Each artifact lives at objects/<key[:2]>/<key><ext> next to a <key>.json metadata
+    file. A hit is materialized at the requested path with a hard link (falling back to a
+    copy across filesystems), so repeated renders of unchanged inputs cost only a hash.
+    Object mtimes track last use for garbage collection, and manifest.json is rewritten
+    by write_manifest() and gc().
+    """
+    def __init__(self, store_dir, link=True):
+        """
+        Args:
+            store_dir (str): Root directory of the store
+            link (bool): Hard-link hits into place instead of copying them
+        """
+        self.store_dir = store_dir
+        self.link = link
+        self.hits = 0
+        self.misses = 0
+        self._versions = None
+
+    def key(self, chart, payload):
+        """
+        Build the content key for a chart. Besides the payload it covers the library
+        versions and the source of RENDER_MODULES, so code changes invalidate old entries.
+
+        Args:
+            chart (str): Chart type
+            payload (dict): Normalized data, parameters and styling options
+
+        Returns:
+            str: Hex digest
+        """
+        if self._versions is None:
+            self._versions = {**library_versions(), 'code': source_digest(RENDER_MODULES)}
+        return content_key(chart, payload, self._versions)
+
+    def _object_path(self, key, ext):
+        return os.path.join(self.store_dir, 'objects', key[:2], key + ext)
+
+    def fetch(self, key, dest):
+        """
+        Materialize a cached artifact at dest.
+
+        Returns:
+            bool: True on a hit, False if the key is not in the store
+        """
+        src = self._object_path(key, os.path.splitext(dest)[1])
+        if not os.path.exists(src):
+            self.misses += 1
+            return False
+
+        # Already linked from an earlier run; rename() would be a no-op
+        if os.path.exists(dest) and os.path.samefile(src, dest):
+            os.utime(src)
+            self.hits += 1
+            return True
+
+        tmp = f'{dest}.{os.getpid()}.tmp'
+        if self.link:
+            try:
+                os.link(src, tmp)
+            except OSError:
+                shutil.copyfile(src, tmp)
+        else:
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+        os.utime(src)
+        self.hits += 1
+        return True
+
+    def read(self, key, ext):
+        """
+        Contents of a cached artifact, e.g. to serve it without materializing a file.
+
+        Returns:
+            bytes: The artifact, or None if the key is not in the store
+        """
+        src = self._object_path(key, ext)
+        try:
+            with open(src, 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        os.utime(src)
+        self.hits += 1
+        return body
+
+    def store(self, key, path, meta=None):
+        """
+        Add a freshly rendered file to the store under key.
+        """
+        ext = os.path.splitext(path)[1]
+        dest = self._object_path(key, ext)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+
+        tmp = f'{dest}.{os.getpid()}.tmp'
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, dest)
+
+        info = {'key': key, 'file': os.path.basename(dest), 'created': time.time()}
+        info.update(meta or {})
+        with open(f'{os.path.splitext(dest)[0]}.json', 'w') as f:
+            json.dump(info, f, default=str)
+
+    def entries(self):
+        """
+        List stored artifacts with their metadata, size and last-use time.
+        """
+        objects_dir = os.path.join(self.store_dir, 'objects')
+        if not os.path.isdir(objects_dir):
+            return []
+
+        entries = []
+        for prefix in os.listdir(objects_dir):
+            prefix_dir = os.path.join(objects_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                if name.endswith('.json') or name.endswith('.tmp'):
+                    continue
+                path = os.path.join(prefix_dir, name)
+                stem = os.path.splitext(path)[0]
+                try:
+                    with open(f'{stem}.json') as f:
+                        info = json.load(f)
+                except (OSError, ValueError):
+                    info = {'key': os.path.basename(stem), 'file': name}
+                stat = os.stat(path)
+                info.update({'path': path, 'size': stat.st_size, 'last_used': stat.st_mtime})
+                entries.append(info)
+        return entries
+
+    def write_manifest(self, entries=None):
+        entries = self.entries() if entries is None else entries
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(os.path.join(self.store_dir, 'manifest.json'), 'w') as f:
+            json.dump({'entries': sorted(entries, key=lambda e: e['key'])}, f, indent=2, default=str)
+
+    def gc(self, max_age_days=None, max_bytes=None):
+        """
+        Remove artifacts not used within max_age_days, then the least recently used ones
+        until the store fits in max_bytes. Rewrites manifest.json.
+
+        Returns:
+            dict: Number of removed entries and bytes freed
+        """
+        entries = sorted(self.entries(), key=lambda e: e['last_used'])
+        cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+        total = sum(e['size'] for e in entries)
+
+        kept = []
+        removed = 0
+        freed = 0
+        for entry in entries:
+            too_old = cutoff is not None and entry['last_used'] < cutoff
+            too_big = max_bytes is not None and total > max_bytes
+            if too_old or too_big:
+                stem = os.path.splitext(entry['path'])[0]
+                for path in (entry['path'], f'{stem}.json'):
+                    if os.path.exists(path):
+                        os.remove(path)
+                total -= entry['size']
+                freed += entry['size']
+                removed += 1
+            else:
+                kept.append(entry)
+
+        self.write_manifest(kept)
+        return {'removed': removed, 'freed_bytes': freed, 'kept': len(kept)}
@@ -0,0 +1,165 @@
+import threading
+import time
+import traceback
+
+class RenderScheduler:
+    """
+    Coalesce bursts of widget events into at most one render per target.
+
+    Widget callbacks only mark targets dirty. A single worker thread waits until events
+    have been quiet for `delay` seconds, snapshots the shared inputs once, and then runs
+    each dirty target's compute and render steps with that snapshot. If a newer event
+    arrives while a batch is in flight, the rest of the stale batch is dropped and the
+    worker starts over with the latest state, so only the latest state reaches each output.
+
+    Targets may also register a refine step, e.g. re-encoding a fast preview at full
+    quality. Refine steps run after every render of a batch has been shown, and are
+    skipped as soon as a newer event arrives.
+
+    Because every target runs on the same worker thread, matplotlib figures owned by the
+    targets are never touched concurrently.
+    """
+    def __init__(self, snapshot, delay=0.15, on_error=None, batch_context=None):
+        """
+        Args:
+            snapshot (callable): Returns the shared input state (e.g. a dict of slider values)
+            delay (float): Quiet period in seconds before a batch starts
+            on_error (callable, optional): Called with (target name, exception) when a
+                target fails. Defaults to printing the traceback.
+            batch_context (callable, optional): batch_context(target names) returns a
+                context manager wrapped around each batch, e.g. a tracing span
+        """
+        self.snapshot = snapshot
+        self.delay = delay
+        self.on_error = on_error
+        self.batch_context = batch_context
+        self._targets = {}
+        self._dirty = set()
+        self._generation = 0
+        self._last_event = 0.0
+        self._busy = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='RenderScheduler', daemon=True)
+        self._thread.start()
+
+    def add_target(self, name, compute, render, refine=None):
+        """
+        Register an output.
+
+        Args:
+            name (str): Target name used by invalidate()
+            compute (callable): compute(state) -> result, e.g. data generation
+            render (callable): render(state, result), e.g. chart update and preview display
+            refine (callable, optional): refine(state, result), run once the whole batch
+                has rendered, e.g. replacing the preview with a full-quality image
+        """
+        with self._cond:
+            self._targets[name] = (compute, render, refine)
+
+    def invalidate(self, *names):
+        """
+        Mark targets (all targets if none are given) as needing a render.
+        """
+        with self._cond:
+            self._dirty.update(names or self._targets)
+            self._generation += 1
+            self._last_event = time.monotonic()
+            self._cond.notify_all()
+
+    def observe(self, widget, *names):
+        """
+        Invalidate the given targets (or all targets) whenever widget's value changes.
+        """
+        widget.observe(lambda change: self.invalidate(*names), names='value')
+
+    def wait_idle(self, timeout=None):
+        """
+        Block until no targets are dirty and no batch is running.
+
+        Returns:
+            bool: False if the timeout expired first
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._dirty and not self._busy, timeout)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _stale(self, generation):
+        with self._cond:
+            return self._closed or generation != self._generation
+
+    def _next_batch(self):
+        with self._cond:
+            while True:
+                self._busy = False
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: self._dirty or self._closed)
+                if self._closed:
+                    return None, None
+
+                # Debounce: wait until events have been quiet for `delay`
+                remaining = self._last_event + self.delay - time.monotonic()
+                while remaining > 0 and not self._closed:
+                    self._cond.wait(remaining)
+                    remaining = self._last_event + self.delay - time.monotonic()
+                if self._closed:
+                    return None, None
+
+                if self._dirty:
+                    self._busy = True
+                    targets = [name for name in self._targets if name in self._dirty]
+                    return self._generation, targets
+
+    def _run(self):
+        while True:
+            generation, targets = self._next_batch()
+            if generation is None:
+                return
+
+            if self.batch_context is not None:
+                with self.batch_context(targets):
+                    self._run_batch(generation, targets)
+            else:
+                self._run_batch(generation, targets)
+
+    def _run_batch(self, generation, targets):
+        # Shared inputs are read once and fanned out to every target in the batch
+        state = self.snapshot()
+        rendered = []
+        for name in targets:
+            if self._stale(generation):
+                return
+            compute, render, refine = self._targets[name]
+            try:
+                result = compute(state)
+                if self._stale(generation):
+                    return
+                render(state, result)
+                if refine is not None:
+                    rendered.append((name, refine, result))
+            except Exception as exc:
+                self._report(name, exc)
+
+            with self._cond:
+                if generation == self._generation:
+                    self._dirty.discard(name)
+
+        # Upgrade outputs only while no newer event is waiting
+        for name, refine, result in rendered:
+            if self._stale(generation):
+                return
+            try:
+                refine(state, result)
+            except Exception as exc:
+                self._report(name, exc)
+
+    def _report(self, name, exc):
+        if self.on_error is not None:
+            self.on_error(name, exc)
+        else:
+            traceback.print_exc()
@@ -0,0 +1,213 @@
+import argparse
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from chain_reader import SELECTORS
+from fixed_point import RATE_PRECISION, SECONDS_PER_YEAR
+
+class RangeError(ValueError):
+    pass
+
+class StubRpcServer:
+    """
+    Local stand-in for an Ethereum JSON-RPC endpoint serving Fraxlend pair and ERC-4626
+    vault reads from in-memory state, for developing and exercising chain_reader offline.
+
+    Supports eth_chainId, eth_blockNumber, eth_getBlockByNumber, eth_call of the views
+    in chain_reader.SELECTORS and eth_getLogs over logs added with add_log(), single or
+    batched. Like hosted nodes, eth_getLogs refuses queries matching more than max_logs
+    logs. fail_next makes the next requests return HTTP 503, to exercise retries;
+    latency delays every response.
+
+    Usage:
+        with StubRpcServer() as server:
+            server.add_pair(address, total_assets, total_borrow, borrow_rate)
+            read_pair_states([address], client=RpcClient(server.url))
+    """
+    def __init__(self, host='127.0.0.1', port=0, chain_id=1, block=20_000_000, genesis_time=1_700_000_000,
+                 block_time=12, latency=0.0, max_logs=10_000):
+        self.chain_id = chain_id
+        self.block = block
+        self.genesis_time = genesis_time
+        self.block_time = block_time
+        self.latency = latency
+        self.max_logs = max_logs
+        self.fail_next = 0
+        self.pairs = {}
+        self.vaults = {}
+        self.logs = []
+        self._logs_per_block = {}
+        self._log_blocks = None
+        self.requests = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def add_pair(self, address, total_assets, total_borrow, borrow_rate, full_utilization_rate=None):
+        """
+        Serve a pair; amounts are raw token units and rates APRs.
+        """
+        rate_per_sec = round(borrow_rate * RATE_PRECISION / SECONDS_PER_YEAR)
+        full = round((full_utilization_rate or borrow_rate) * RATE_PRECISION / SECONDS_PER_YEAR)
+        self.pairs[address.lower()] = {
+            'totalAsset()': [total_assets, total_assets],
+            'totalBorrow()': [total_borrow, total_borrow],
+            'currentRateInfo()': [self.block, 0, self._timestamp(self.block), rate_per_sec, full]
+        }
+
+    def add_vault(self, address, interest_rate, price=10**18, total_assets=10**26):
+        """
+        Serve an ERC-4626 vault whose share price grows at interest_rate (simple APR) per block.
+        """
+        self.vaults[address.lower()] = (interest_rate, price, total_assets)
+
+    def add_log(self, address, topics, words, block):
+        """
+        Add an event log; words are the uint256 values of its data.
+        """
+        index = self._logs_per_block.get(block, 0)
+        self._logs_per_block[block] = index + 1
+        self.logs.append({
+            'address': address.lower(),
+            'topics': list(topics),
+            'data': '0x' + ''.join(f'{word:064x}' for word in words),
+            'blockNumber': block,
+            'logIndex': index,
+        })
+        self._log_blocks = None
+
+    def _timestamp(self, block):
+        return self.genesis_time + block * self.block_time
+
+    def _eth_call(self, call, block):
+        address, data = call['to'].lower(), call['data']
+        selector = data[:10]
+        if address in self.vaults and selector == SELECTORS['totalAssets()']:
+            return [self.vaults[address][2]]
+        if address in self.vaults and selector == SELECTORS['convertToAssets(uint256)']:
+            rate, price, _ = self.vaults[address]
+            seconds = (block - self.block) * self.block_time
+            shares = int(data[10:], 16)
+            return [shares * round(price * (1 + rate * seconds / SECONDS_PER_YEAR)) // 10**18]
+        signature = {value: key for key, value in SELECTORS.items()}.get(selector)
+        if address not in self.pairs or signature not in self.pairs[address]:
+            raise ValueError('execution reverted')
+        return self.pairs[address][signature]
+
+    def _dispatch(self, request):
+        method, params = request.get('method'), request.get('params', [])
+        block = lambda tag: self.block if tag in ('latest', None) else int(tag, 16)
+        if method == 'eth_chainId':
+            return hex(self.chain_id)
+        if method == 'eth_blockNumber':
+            return hex(self.block)
+        if method == 'eth_getBlockByNumber':
+            number = block(params[0])
+            return {'number': hex(number), 'timestamp': hex(self._timestamp(number)), 'transactions': []}
+        if method == 'eth_call':
+            words = self._eth_call(params[0], block(params[1] if len(params) > 1 else None))
+            return '0x' + ''.join(f'{word:064x}' for word in words)
+        if method == 'eth_getLogs':
+            return self._get_logs(params[0])
+        raise NotImplementedError(method)
+
+    def _get_logs(self, query):
+        start, end = int(query['fromBlock'], 16), int(query['toBlock'], 16)
+        addresses = query.get('address')
+        addresses = {a.lower() for a in ([addresses] if isinstance(addresses, str) else addresses or [])}
+        topics = (query.get('topics') or [None])[0]
+        topics = {topics} if isinstance(topics, str) else set(topics or [])
+        with self._lock:
+            if self._log_blocks is None:
+                self.logs.sort(key=lambda log: (log['blockNumber'], log['logIndex']))
+                self._log_blocks = [log['blockNumber'] for log in self.logs]
+        window = self.logs[bisect.bisect_left(self._log_blocks, start):bisect.bisect_right(self._log_blocks, end)]
+        matched = [log for log in window
+                   if (not addresses or log['address'] in addresses)
+                   and (not topics or log['topics'][0] in topics)]
+        if len(matched) > self.max_logs:
+            raise RangeError(f'query returned more than {self.max_logs} results')
+        return [{**log, 'blockNumber': hex(log['blockNumber']), 'logIndex': hex(log['logIndex'])}
+                for log in matched]
+
+    def _reply(self, request):
+        try:
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': self._dispatch(request)}
+        except RangeError as e:
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {'code': -32005, 'message': str(e)}}
+        except NotImplementedError as e:
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {'code': -32601, 'message': f'Method not found: {e}'}}
+        except Exception as e:
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {'code': -32000, 'message': str(e)}}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                with stub._lock:
+                    stub.requests += 1
+                    stub.calls += len(body) if isinstance(body, list) else 1
+                    fail = stub.fail_next > 0
+                    stub.fail_next -= fail
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if fail:
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                reply = [stub._reply(r) for r in body] if isinstance(body, list) else stub._reply(body)
+                payload = json.dumps(reply).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a sample Fraxlend market over local JSON-RPC.")
+    parser.add_argument('--port', type=int, default=8545)
+    parser.add_argument('--pairs', type=int, default=24, help="Number of sample pairs")
+    args = parser.parse_args()
+
+    server = StubRpcServer(port=args.port)
+    for i in range(args.pairs):
+        server.add_pair(f'0x{i + 1:040x}', 10_000_000 * 10**18, (6_000_000 + 100_000 * i) * 10**18, 0.05 + 0.002 * i)
+    server.add_vault(f'0x{0xfeed:040x}', 0.08)
+    print(f"Serving {args.pairs} pairs at {server.url}; vault 0x{0xfeed:040x}")
+    server.start()
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
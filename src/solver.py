@@ -0,0 +1,181 @@
+import numpy as np
+
+from data_fetcher import getRatesArray, getBorrowRatesArray
+from instrumentation import span
+
+# Parameters a metric is evaluated on, in call order
+SOLVE_PARAMS = ('utilization_rate', 'borrow_rate', 'sfrxusd_interest_rate')
+
+def _total_apr(rates, market):
+    return rates[f'{market}Rates']['lentAPR'] + rates[f'{market}Rates']['unlentAPR']
+
+def frxusd_total_apr(utilization_rate, borrow_rate, sfrxusd_interest_rate):
+    return _total_apr(getRatesArray(utilization_rate, borrow_rate, sfrxusd_interest_rate), 'frxUSD')
+
+def sfrxusd_total_apr(utilization_rate, borrow_rate, sfrxusd_interest_rate):
+    return _total_apr(getRatesArray(utilization_rate, borrow_rate, sfrxusd_interest_rate), 'sfrxUSD')
+
+def lender_spread(utilization_rate, borrow_rate, sfrxusd_interest_rate):
+    """
+    Total lender APR of sfrxUSD minus frxUSD at the same borrow rate.
+    """
+    rates = getRatesArray(utilization_rate, borrow_rate, sfrxusd_interest_rate)
+    return _total_apr(rates, 'sfrxUSD') - _total_apr(rates, 'frxUSD')
+
+# Named metrics. Each is affine in every parameter taken on its own, so solve() can
+# invert them in closed form from two evaluations.
+METRICS = {
+    'frxUSD_total_apr': frxusd_total_apr,
+    'sfrxUSD_total_apr': sfrxusd_total_apr,
+    'spread': lender_spread,
+}
+
+def _evaluate(metric, solve_for, x, params):
+    return metric(**{solve_for: x}, **params)
+
+def _solve_affine(metric, target, solve_for, params):
+    # f(x) = a + c * x, so two evaluations give the exact root
+    a = _evaluate(metric, solve_for, 0.0, params)
+    c = _evaluate(metric, solve_for, 1.0, params) - a
+    target = np.broadcast_to(np.asarray(target, dtype=float), np.broadcast(a, c, target).shape)
+    return np.divide(target - a, c, out=np.full(target.shape, np.nan), where=c != 0)
+
+def _solve_bracketed(metric, target, solve_for, params, lo, hi, tol, max_iter):
+    # Safeguarded Newton: take the Newton step when it stays inside the bracket,
+    # bisect otherwise, and always shrink the bracket around the sign change.
+    f_lo = _evaluate(metric, solve_for, lo, params) - target
+    f_hi = _evaluate(metric, solve_for, hi, params) - target
+    shape = np.broadcast(f_lo, f_hi).shape
+    lo = np.broadcast_to(np.asarray(lo, dtype=float), shape).copy()
+    hi = np.broadcast_to(np.asarray(hi, dtype=float), shape).copy()
+    f_lo = np.broadcast_to(f_lo, shape).copy()
+    f_hi = np.broadcast_to(f_hi, shape)
+
+    bracketed = np.signbit(f_lo) != np.signbit(f_hi)
+    x = np.where(f_lo == 0, lo, np.where(f_hi == 0, hi, 0.5 * (lo + hi)))
+    active = bracketed & (f_lo != 0) & (f_hi != 0)
+
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        f_x = _evaluate(metric, solve_for, x, params) - target
+        f_x = np.broadcast_to(f_x, shape)
+        # Keep the half of the bracket that still holds the sign change
+        left = np.signbit(f_x) == np.signbit(f_lo)
+        lo = np.where(active & left, x, lo)
+        f_lo = np.where(active & left, f_x, f_lo)
+        hi = np.where(active & ~left, x, hi)
+
+        h = 1e-7 * np.maximum(np.abs(hi - lo), tol)
+        slope = (np.broadcast_to(_evaluate(metric, solve_for, x + h, params) - target, shape) - f_x) / h
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = x - f_x / slope
+        step = np.where(np.isfinite(newton) & (newton > lo) & (newton < hi), newton, 0.5 * (lo + hi))
+
+        done = (f_x == 0) | (hi - lo <= tol)
+        next_x = np.where(done, x, step)
+        done |= np.abs(next_x - x) <= tol
+        x = np.where(active, next_x, x)
+        active &= ~done
+
+    return np.where(bracketed, x, np.nan)
+
+def solve(metric, target, solve_for, bounds=(0.0, 1.0), tol=1e-12, max_iter=100, **params):
+    """
+    Find the value of one parameter at which a metric reaches a target, elementwise.
+
+    Named metrics (see METRICS) are inverted in closed form. Any other callable
+    metric(utilization_rate, borrow_rate, sfrxusd_interest_rate) is solved with a
+    vectorized bracketed Newton/bisection search over bounds; points without a sign
+    change in bounds are NaN.
+
+    Args:
+        metric (str or callable): Name in METRICS or a vectorized metric function
+        target (float or numpy.ndarray): Metric value to reach
+        solve_for (str): Parameter to solve for, one of SOLVE_PARAMS
+        bounds (tuple): (low, high) search interval; closed-form roots outside it are NaN
+        tol (float): Bracket width at which the numerical search stops
+        max_iter (int): Iteration cap for the numerical search
+        **params: The other two parameters; arrays broadcast against each other and target
+
+    Returns:
+        numpy.ndarray: Solved parameter values
+    """
+    if solve_for not in SOLVE_PARAMS:
+        raise ValueError(f"Unknown parameter {solve_for!r}; expected one of {SOLVE_PARAMS}")
+    missing = set(SOLVE_PARAMS) - {solve_for} - set(params)
+    if missing:
+        raise TypeError(f"solve() needs values for {sorted(missing)}")
+    params = {name: np.asarray(value, dtype=float) for name, value in params.items()}
+    lo, hi = bounds
+
+    if isinstance(metric, str):
+        with span('solve', metric=metric, solve_for=solve_for, method='closed_form'):
+            x = _solve_affine(METRICS[metric], target, solve_for, params)
+            return np.where((x >= lo) & (x <= hi), x, np.nan)
+    with span('solve', metric=getattr(metric, '__name__', repr(metric)), solve_for=solve_for, method='bracketed'):
+        return _solve_bracketed(metric, np.asarray(target, dtype=float), solve_for, params,
+                                np.asarray(lo, dtype=float), np.asarray(hi, dtype=float), tol, max_iter)
+
+def break_even_utilization(spread, sfrxusd_interest_rate):
+    """
+    Utilization at which sfrxUSD lenders earn exactly `spread` more than frxUSD lenders.
+
+    The spread at a given borrow rate is sfrxusd_interest_rate * (1 - utilization), so
+    sfrxUSD beats frxUSD by at least `spread` at every utilization up to the returned value.
+    Points where no utilization in [0, 1] reaches the spread are NaN.
+    """
+    sfrxusd_interest_rate = np.asarray(sfrxusd_interest_rate, dtype=float)
+    spread = np.asarray(spread, dtype=float)
+    shape = np.broadcast(spread, sfrxusd_interest_rate).shape
+    utilization = 1 - np.divide(spread, sfrxusd_interest_rate, out=np.full(shape, np.nan),
+                                where=sfrxusd_interest_rate != 0)
+    return np.where((utilization >= 0) & (utilization <= 1), utilization, np.nan)
+
+def required_borrow_rate(lend_target, utilization_rate, sfrxusd_interest_rate, market='sfrxUSD'):
+    """
+    Borrow rate needed for a market's lenders to earn lend_target, elementwise.
+
+    Closed form from calcfrxUSDBorrowRateArray / calcsfrxUSDBorrowRateArray; points with
+    zero utilization are NaN.
+
+    Args:
+        lend_target (float or numpy.ndarray): Total lender APR to reach
+        utilization_rate (float or numpy.ndarray): Utilization rate(s)
+        sfrxusd_interest_rate (float or numpy.ndarray): sfrxUSD interest rate(s)
+        market (str): 'frxUSD' or 'sfrxUSD'
+
+    Returns:
+        numpy.ndarray: Required borrow rates
+    """
+    with span('required_borrow_rate', market=market):
+        rates = getBorrowRatesArray(utilization_rate, lend_target, sfrxusd_interest_rate)
+        return rates[f'{market}Rates']['borrowAPR']
+
+def iso_lines(metric, targets, x_name, x_values, y_name, y_bounds=(0.0, 1.0), **fixed):
+    """
+    Trace metric == target contours in an (x, y) parameter plane.
+
+    Rather than thresholding a dense grid, y is solved exactly for every x, so each
+    contour is precise to the solver tolerance at every sample.
+
+    Args:
+        metric (str or callable): As for solve()
+        targets (iterable): Metric values, one contour each
+        x_name (str): Parameter along the x axis, one of SOLVE_PARAMS
+        x_values (array-like): x samples
+        y_name (str): Parameter solved for along the y axis
+        y_bounds (tuple): (low, high) range of y
+        **fixed: Value of the remaining parameter
+
+    Returns:
+        dict: {target: numpy.ndarray of y values at x_values (NaN where the contour
+        leaves y_bounds)}
+    """
+    x_values = np.asarray(x_values, dtype=float)
+    targets = [float(target) for target in targets]
+    # Solve all contours at once: one row per target
+    solved = solve(metric, np.asarray(targets)[:, None], y_name, bounds=y_bounds,
+                   **{x_name: x_values[None, :]}, **fixed)
+    solved = np.broadcast_to(solved, (len(targets), len(x_values)))
+    return {target: solved[i] for i, target in enumerate(targets)}
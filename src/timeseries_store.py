@@ -0,0 +1,315 @@
+import inspect
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import span
+
+# Stored per pair, one row per block: (dtype). timestamp and block are both sorted
+# and either can key a query.
+STORE_COLUMNS = {
+    'timestamp': np.int64,  # seconds
+    'block': np.int64,
+    'utilization_rate': np.float64,
+    'borrow_rate': np.float64,
+    'sfrxusd_interest_rate': np.float64,
+}
+KEY_COLUMNS = ('timestamp', 'block')
+VALUE_COLUMNS = tuple(name for name in STORE_COLUMNS if name not in KEY_COLUMNS)
+
+# Downsampled views maintained at ingest: bucket width in seconds
+ROLLUPS = {'hour': 3600, 'day': 86400}
+ROLLUP_FIELDS = ('open', 'high', 'low', 'close')
+
+def _rollup_columns():
+    columns = {'bucket': np.int64, 'count': np.int64}
+    for name in VALUE_COLUMNS:
+        columns.update({f'{name}_{field}': np.float64 for field in ROLLUP_FIELDS})
+    return columns
+
+ROLLUP_COLUMNS = _rollup_columns()
+
+def _rollup(timestamps, values, width):
+    # OHLC aggregates of sorted rows per time bucket; NaNs are skipped by high/low
+    buckets = timestamps // width * width
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    out = {'bucket': buckets[starts], 'count': np.diff(np.r_[starts, len(buckets)])}
+    for name, column in values.items():
+        out[f'{name}_open'] = column[starts]
+        out[f'{name}_high'] = np.fmax.reduceat(column, starts)
+        out[f'{name}_low'] = np.fmin.reduceat(column, starts)
+        out[f'{name}_close'] = column[ends]
+    return out
+
+class TimeSeriesStore:
+    """
+    Append-only columnar store of per-pair utilization, borrow rate and sfrxUSD rate series.
+
+    Each pair is a directory of raw little-endian column files plus meta.json holding the
+    committed row counts and the committed last rollup buckets, so a write interrupted
+    midway is discarded (or redone from committed values) on the next append.
+    Reads memory-map the files: range queries bisect the sorted timestamp or block column
+    (O(log n) pages touched) and return zero-copy slices, so series far larger than RAM
+    can be charted a window at a time. Hourly and daily OHLC rollups are updated on
+    every append.
+
+    Layout:
+        <directory>/<pair>/meta.json
+        <directory>/<pair>/<column>.bin
+        <directory>/<pair>/<rollup>/<column>.bin
+
+    Environment:
+        FRAXLEND_STORE: Default directory
+    """
+    def __init__(self, directory=None):
+        self.directory = directory or os.environ.get('FRAXLEND_STORE', os.path.join('output', 'store'))
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    # --- Layout --------------------------------------------------------------------
+
+    def _pair_dir(self, pair):
+        return os.path.join(self.directory, pair.lower())
+
+    def _meta(self, pair):
+        try:
+            with open(os.path.join(self._pair_dir(pair), 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'length': 0, 'rollups': {name: 0 for name in ROLLUPS}}
+
+    def _write_meta(self, pair, meta):
+        path = os.path.join(self._pair_dir(pair), 'meta.json')
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump({**meta, 'columns': {name: np.dtype(dtype).str for name, dtype in STORE_COLUMNS.items()}}, f)
+        os.replace(f'{path}.tmp', path)
+
+    def pairs(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory)
+                      if os.path.exists(os.path.join(self.directory, name, 'meta.json')))
+
+    def __contains__(self, pair):
+        return self._meta(pair)['length'] > 0
+
+    def length(self, pair):
+        return self._meta(pair)['length']
+
+    def _column(self, pair, name, rollup=None):
+        # Memory-mapped column, cached until the next append to the pair
+        meta = self._meta(pair)
+        length = meta['rollups'][rollup] if rollup else meta['length']
+        dtype = (ROLLUP_COLUMNS if rollup else STORE_COLUMNS)[name]
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        key = (pair.lower(), rollup, name, length)
+        with self._lock:
+            if key not in self._maps:
+                path = os.path.join(self._pair_dir(pair), rollup or '', f'{name}.bin')
+                self._maps[key] = np.memmap(path, dtype=dtype, mode='r', shape=(length,))
+            return self._maps[key]
+
+    # --- Writing -------------------------------------------------------------------
+
+    @staticmethod
+    def _append_columns(directory, columns, values, lengths):
+        # Drop bytes past the committed length (an interrupted write), then append
+        os.makedirs(directory, exist_ok=True)
+        for name, dtype in columns.items():
+            path = os.path.join(directory, f'{name}.bin')
+            size = lengths * np.dtype(dtype).itemsize
+            with open(path, 'ab') as f:
+                if f.tell() != size:
+                    f.truncate(size)
+                np.ascontiguousarray(values[name], dtype=dtype).tofile(f)
+
+    def append(self, pair, timestamp, block, **values):
+        """
+        Append rows to a pair, updating its rollups.
+
+        Args:
+            pair (str): Pair address
+            timestamp, block (array-like): Row keys, strictly increasing and after the
+                last stored block
+            **values: Arrays for VALUE_COLUMNS; missing columns are stored as NaN
+
+        Returns:
+            int: Rows stored for the pair
+        """
+        unknown = set(values) - set(VALUE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns {sorted(unknown)}; expected {VALUE_COLUMNS}")
+        rows = {'timestamp': np.asarray(timestamp, dtype=np.int64), 'block': np.asarray(block, dtype=np.int64)}
+        n = len(rows['block'])
+        for name in VALUE_COLUMNS:
+            rows[name] = np.broadcast_to(np.asarray(values.get(name, np.nan), dtype=np.float64), (n,))
+        meta = self._meta(pair)
+        if n == 0:
+            return meta['length']
+        if np.any(np.diff(rows['block']) <= 0) or np.any(np.diff(rows['timestamp']) < 0):
+            raise ValueError("Rows must be sorted by block, one row per block")
+        if meta['length']:
+            last_block, last_time = self._column(pair, 'block')[-1], self._column(pair, 'timestamp')[-1]
+            if rows['block'][0] <= last_block or rows['timestamp'][0] < last_time:
+                raise ValueError(f"Pair {pair} already holds blocks up to {last_block}; the store is append-only")
+
+        with span('store_append', rows=n):
+            pair_dir = self._pair_dir(pair)
+            self._append_columns(pair_dir, STORE_COLUMNS, rows, meta['length'])
+            rollup_lengths, tails = {}, {}
+            for name, width in ROLLUPS.items():
+                rollup = _rollup(rows['timestamp'], {column: rows[column] for column in VALUE_COLUMNS}, width)
+                length = meta['rollups'][name]
+                tail = self._tail(pair, name, length, meta)
+                if tail is not None and tail['bucket'] == rollup['bucket'][0]:
+                    tail, rollup = self._merge_last_bucket(pair, name, length, tail, rollup)
+                self._append_columns(os.path.join(pair_dir, name), ROLLUP_COLUMNS, rollup, length)
+                if len(rollup['bucket']):
+                    tail = {column: rollup[column][-1].item() for column in ROLLUP_COLUMNS}
+                rollup_lengths[name] = length + len(rollup['bucket'])
+                tails[name] = tail
+            self._write_meta(pair, {'length': meta['length'] + n, 'rollups': rollup_lengths, 'tails': tails})
+        with self._lock:
+            self._maps = {key: value for key, value in self._maps.items() if key[0] != pair.lower()}
+        return meta['length'] + n
+
+    def _tail(self, pair, rollup, length, meta):
+        # Committed values of the last bucket. Its row in the .bin files may already hold
+        # the merge of an interrupted append, so meta.json is authoritative; stores
+        # written before tails were recorded fall back to the file.
+        if not length:
+            return None
+        tail = meta.get('tails', {}).get(rollup)
+        if tail is None:
+            tail = {name: self._column(pair, name, rollup)[-1].item() for name in ROLLUP_COLUMNS}
+        return tail
+
+    def _merge_last_bucket(self, pair, rollup, length, tail, new):
+        # Fold the first new bucket into the committed last one and rewrite its row in
+        # place. The result depends only on committed values, so a retried append
+        # rewrites the same row. Returns the merged bucket and the remaining new buckets.
+        merged = {}
+        for name in ROLLUP_COLUMNS:
+            value = new[name][0]
+            if name == 'count':
+                value = tail[name] + value
+            elif name.endswith('_high'):
+                value = np.fmax(tail[name], value)
+            elif name.endswith('_low'):
+                value = np.fmin(tail[name], value)
+            elif not name.endswith('_close'):
+                value = tail[name]
+            merged[name] = np.asarray(value).item()
+
+        directory = os.path.join(self._pair_dir(pair), rollup)
+        for name, dtype in ROLLUP_COLUMNS.items():
+            column = np.memmap(os.path.join(directory, f'{name}.bin'), dtype=dtype, mode='r+', shape=(length,))
+            column[-1] = merged[name]
+            column.flush()
+            del column
+        return merged, {name: values[1:] for name, values in new.items()}
+
+    def append_frame(self, pair, frame):
+        """
+        Append the rows of a DataFrame with STORE_COLUMNS columns (timestamp as seconds or
+        datetimes) that are newer than what the pair already holds. Several rows in one
+        block keep the last.
+        """
+        frame = frame.drop_duplicates('block', keep='last')
+        if self.length(pair):
+            frame = frame[frame['block'] > self._column(pair, 'block')[-1]]
+        timestamp = frame['timestamp']
+        if pd.api.types.is_datetime64_any_dtype(timestamp):
+            timestamp = timestamp.astype('datetime64[s]').astype(np.int64)
+        return self.append(pair, timestamp.to_numpy(), frame['block'].to_numpy(),
+                           **{name: frame[name].to_numpy() for name in VALUE_COLUMNS if name in frame})
+
+    # --- Reading -------------------------------------------------------------------
+
+    def _bounds(self, index, start, end):
+        lo = 0 if start is None else int(np.searchsorted(index, start, 'left'))
+        hi = len(index) if end is None else int(np.searchsorted(index, end, 'right'))
+        return lo, hi
+
+    @staticmethod
+    def _key_value(value):
+        # Accept seconds, or anything pandas reads as a time
+        if value is None or isinstance(value, (int, np.integer, float)):
+            return value
+        if isinstance(value, str) and value.isdigit():
+            return int(value)
+        return pd.Timestamp(value).timestamp()
+
+    def range(self, pair, start=None, end=None, key='timestamp', resolution=None):
+        """
+        Rows of a pair between two keys, inclusive, as zero-copy memory-mapped slices.
+
+        Args:
+            pair (str): Pair address
+            start, end (optional): Key bounds; timestamps may be seconds or date strings
+            key (str): 'timestamp' or 'block'
+            resolution (str, optional): A ROLLUPS name for OHLC buckets instead of raw
+                rows; only key='timestamp' applies, on bucket start times
+
+        Returns:
+            dict: Column name -> array slice
+        """
+        if key not in KEY_COLUMNS:
+            raise ValueError(f"key must be one of {KEY_COLUMNS}")
+        if resolution is not None:
+            if resolution not in ROLLUPS:
+                raise ValueError(f"Unknown resolution {resolution!r}; expected one of {list(ROLLUPS)}")
+            if key != 'timestamp':
+                raise ValueError("Rollups are keyed by timestamp")
+            key, columns = 'bucket', ROLLUP_COLUMNS
+        else:
+            columns = STORE_COLUMNS
+        if key == 'timestamp' or key == 'bucket':
+            start, end = self._key_value(start), self._key_value(end)
+        lo, hi = self._bounds(self._column(pair, key, resolution), start, end)
+        return {name: self._column(pair, name, resolution)[lo:hi] for name in columns}
+
+    def frame(self, pair, start=None, end=None, key='timestamp', resolution=None):
+        """
+        range() copied into a DataFrame with datetime timestamps.
+        """
+        columns = self.range(pair, start, end, key, resolution)
+        frame = pd.DataFrame({name: np.array(values) for name, values in columns.items()})
+        time_column = 'bucket' if resolution else 'timestamp'
+        frame[time_column] = pd.to_datetime(frame[time_column], unit='s')
+        return frame
+
+    def at(self, pair, when=None, key='timestamp'):
+        """
+        The last row of a pair at or before when (default: the latest row).
+
+        Returns:
+            dict: Column name -> scalar
+        """
+        index = self._column(pair, key)
+        if not len(index):
+            raise KeyError(f"No rows stored for pair {pair}")
+        when = self._key_value(when) if key == 'timestamp' else when
+        row = len(index) - 1 if when is None else int(np.searchsorted(index, when, 'right')) - 1
+        if row < 0:
+            raise KeyError(f"Pair {pair} has no rows at or before {when}")
+        return {name: self._column(pair, name)[row].item() for name in STORE_COLUMNS}
+
+    def generator_inputs(self, pair, generator, when=None, key='timestamp'):
+        """
+        Keyword arguments for a generate_* function from a pair's state at when, e.g.
+        generate_fixed_util_apr_data(**store.generator_inputs(pair, generate_fixed_util_apr_data)).
+        """
+        row = self.at(pair, when, key)
+        values = {
+            'current_interest_rate': row['borrow_rate'],
+            'utilization_rate': row['utilization_rate'],
+            'sfrxusd_interest_rate': row['sfrxusd_interest_rate'],
+        }
+        parameters = inspect.signature(generator).parameters
+        return {name: value for name, value in values.items() if name in parameters and not np.isnan(value)}
@@ -1,9 +1,16 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
 import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 import numpy as np
+import os
+
+from accrual import apr_to_apy
+from instrumentation import span
 
-def plot_lending_rates(data, title="Lending Rates vs Utilization", save_path=None):
+def plot_lending_rates(data, title="Lending Rates vs Utilization", save_path=None, quality='publication'):
     """
     Create a line plot showing lending rates vs utilization rates for different markets.
     
@@ -11,7 +18,9 @@ def plot_lending_rates(data, title="Lending Rates vs Utilization", save_path=Non
         data (pandas.DataFrame): DataFrame containing market data
         title (str): Title for the plot
         save_path (str, optional): Path to save the plot. If None, displays the plot.
+        quality (str): Render tier, 'preview' or 'publication'
     """
+    tier = _render_tier(quality)
     plt.figure(figsize=(12, 8))
     sns.set_style("whitegrid")
     
@@ -40,12 +49,12 @@ def plot_lending_rates(data, title="Lending Rates vs Utilization", save_path=Non
     plt.tight_layout()
     
     if save_path:
-        plt.savefig(save_path, bbox_inches='tight', dpi=300)
+        plt.savefig(save_path, bbox_inches=tier['bbox_inches'], dpi=tier['dpi'])
         plt.close()
     else:
         plt.show()
 
-def plot_rate_comparison(data, utilization_points=[0.2, 0.5, 0.8, 0.95], save_path=None):
+def plot_rate_comparison(data, utilization_points=[0.2, 0.5, 0.8, 0.95], save_path=None, quality='publication'):
     """
     Create a bar plot comparing lending rates across markets at specific utilization points.
     
@@ -53,7 +62,9 @@ def plot_rate_comparison(data, utilization_points=[0.2, 0.5, 0.8, 0.95], save_pa
         data (pandas.DataFrame): DataFrame containing market data
         utilization_points (list): List of utilization rates to compare
         save_path (str, optional): Path to save the plot. If None, displays the plot.
+        quality (str): Render tier, 'preview' or 'publication'
     """
+    tier = _render_tier(quality)
     # Filter data for specific utilization points
     comparison_data = []
     for util in utilization_points:
@@ -90,273 +101,564 @@ def plot_rate_comparison(data, utilization_points=[0.2, 0.5, 0.8, 0.95], save_pa
     plt.tight_layout()
     
     if save_path:
-        plt.savefig(save_path, bbox_inches='tight', dpi=300)
+        plt.savefig(save_path, bbox_inches=tier['bbox_inches'], dpi=tier['dpi'])
         plt.close()
     else:
         plt.show()
 
-def plot_stacked_apr_comparison(data, borrow_rates, sfrxusd_interest_rate, title="APR Comparison: frxUSD vs sfrxUSD", save_path=None):
+# Optional content-addressed store for saved charts (a render_cache.RenderCache).
+# When set, plot_* calls with a save_path skip rendering if an identical chart exists.
+RENDER_CACHE = None
+
+# Render quality tiers. Previews are for interactive use and bulk drafts: low dpi, no
+# tight-bbox pass, no hatching or markers. Publication keeps the original 300 dpi output;
+# the file format (PNG, SVG, PDF) follows the save_path extension.
+RENDER_TIERS = {
+    'preview': {'dpi': 72, 'bbox_inches': None, 'hatch': '', 'marker': 'None'},
+    'publication': {'dpi': 300, 'bbox_inches': 'tight', 'hatch': '//', 'marker': 'o'},
+}
+
+def _render_tier(quality):
+    if quality not in RENDER_TIERS:
+        raise ValueError(f"Unknown render quality {quality!r}; expected one of {sorted(RENDER_TIERS)}")
+    return RENDER_TIERS[quality]
+
+def _market_series(data, borrow_rates, axis_name):
     """
-    Create a stacked bar chart comparing total APRs (lentAPR + unlentAPR) for both markets,
-    with borrow rate curves overlaid.
+    Extract per-market series from either result layout.
     
     Args:
-        data (pandas.DataFrame): DataFrame containing APR data
-        borrow_rates (pandas.DataFrame): DataFrame containing borrow rate data
-        sfrxusd_interest_rate (float): The sfrxUSD interest rate
-        title (str): Title for the plot
-        save_path (str, optional): Path to save the plot. If None, displays the plot.
-    """
-    plt.figure(figsize=(12, 8))
-    sns.set_style("whitegrid")
+        data (pandas.DataFrame or RateSeries): Long-format APR data, or a compact RateSeries
+        borrow_rates (pandas.DataFrame or None): Long-format borrow rates (unused for RateSeries)
+        axis_name (str): Name of the swept parameter column
     
-    # Create figure and axis
-    fig, ax = plt.subplots(figsize=(12, 8))
+    Returns:
+        tuple: (list of axis values, {market: {'lentAPR', 'unlentAPR', 'borrowAPR': array}})
+    """
+    markets = ['frxUSD', 'sfrxUSD']
+    if hasattr(data, 'series'):
+        # Compact layout: series are stored directly, no filtering needed
+        return list(data.axis), {
+            market: {apr_type: data.series(market, apr_type)
+                     for apr_type in ['lentAPR', 'unlentAPR', 'borrowAPR']}
+            for market in markets
+        }
+    
+    axis_values = sorted(data[data['market'] == 'frxUSD'][axis_name].unique())
+    series = {}
+    for market in markets:
+        market_data = data[data['market'] == market]
+        series[market] = {
+            'lentAPR': market_data[market_data['apr_type'] == 'lentAPR']['value'].to_numpy(),
+            'unlentAPR': market_data[market_data['apr_type'] == 'unlentAPR']['value'].to_numpy(),
+            'borrowAPR': borrow_rates[borrow_rates['market'] == market]['value'].to_numpy()
+        }
+    return axis_values, series
+
+class StackedAPRChart:
+    """
+    Stateful stacked bar chart comparing total APRs (lentAPR + unlentAPR) for both
+    markets, with borrow rate curves and the sfrxUSD interest rate overlaid, and
+    optionally each market's compounded total APY marked on its bars.
     
-    # Get unique utilization rates
-    util_rates = sorted(data[data['market'] == 'frxUSD']['utilization_rate'].unique())
+    The figure, bars, lines and axhline are built once. Later calls to update() only
+    change bar heights/bottoms, line y-data and the axhline position, then redraw.
+    Artists are rebuilt only when the number of sweep points changes.
     
-    # Set width of bars and positions of the bars
+    Subclasses set the sweep axis, x-axis label, tick spacing and whether each market
+    gets its own borrow rate line.
+    """
+    axis_name = None
+    xlabel = None
+    tick_step = 1
+    per_market_borrow = False
     width = 0.35
-    x = np.arange(len(util_rates))
-    
-    # Prepare data for both markets
     markets = ['frxUSD', 'sfrxUSD']
-    positions = [-width/2, width/2]  # Offset for side-by-side bars
     colors = {'frxUSD': ['#2ecc71', '#27ae60'], 'sfrxUSD': ['#3498db', '#2980b9']}
-    
-    for market, pos in zip(markets, positions):
-        market_data = data[data['market'] == market]
-        lent_data = market_data[market_data['apr_type'] == 'lentAPR']
-        unlent_data = market_data[market_data['apr_type'] == 'unlentAPR']
+    line_colors = {'frxUSD': '#e74c3c', 'sfrxUSD': '#9b59b6'}
+    apy_colors = {'frxUSD': '#f39c12', 'sfrxUSD': '#d35400'}
+    
+    def __init__(self, figsize=(12, 8), pyplot=True, quality='publication'):
+        """
+        Args:
+            figsize (tuple): Figure size in inches
+            pyplot (bool): Create the figure through pyplot. Pass False for long-lived
+                charts (e.g. notebook widgets) so the figure is never registered with
+                pyplot and cannot leak or be auto-displayed.
+            quality (str): Render tier, one of RENDER_TIERS
+        """
+        _render_tier(quality)
+        self.quality = quality
+        with span('seaborn_style'):
+            sns.set_style("whitegrid")
+        with span('create_figure'):
+            if pyplot:
+                self.fig, self.ax = plt.subplots(figsize=figsize)
+            else:
+                self.fig = plt.Figure(figsize=figsize)
+                self.ax = self.fig.add_subplot()
+        self._n = None
+        self._apy = None
+        self._needs_layout = True
+    
+    def default_title(self, utilization_rate):
+        return f"APR Comparison at {utilization_rate:.0%} Utilization"
+    
+    def tick_labels(self, axis_values):
+        return [f'{rate:.0%}' for rate in axis_values]
+    
+    def _build(self, n):
+        with span('build_artists', points=n):
+            self._build_artists(n)
+    
+    def _build_artists(self, n):
+        ax = self.ax
+        ax.clear()
+        x = np.arange(n)
+        zeros = np.zeros(n)
+        tier = RENDER_TIERS[self.quality]
+        
+        self._bars = {}
+        self._borrow_lines = {}
+        self._apy_lines = {}
+        positions = [-self.width/2, self.width/2]  # Offset for side-by-side bars
+        for market, pos in zip(self.markets, positions):
+            # Create bars - lentAPR at bottom, unlentAPR on top
+            lent_bars = ax.bar(x + pos, zeros, self.width, 
+                               label=f'{market} Lent APR',
+                               color=self.colors[market][0])
+            unlent_bars = ax.bar(x + pos, zeros, self.width, 
+                                 bottom=zeros,
+                                 label=f'{market} Unlent APR',
+                                 color=self.colors[market][1],
+                                 hatch=tier['hatch'] if market == 'sfrxUSD' else '')
+            self._bars[market] = (lent_bars, unlent_bars)
+            
+            # Total APY tick on top of each bar, hidden until update(apy=...)
+            self._apy_lines[market], = ax.plot(x + pos, zeros,
+                    label='_nolegend_',
+                    color=self.apy_colors[market],
+                    linestyle='None',
+                    marker='_',
+                    markersize=14,
+                    markeredgewidth=2.5,
+                    visible=False)
+            
+            if self.per_market_borrow:
+                # Add borrow rate line for each market
+                self._borrow_lines[market], = ax.plot(x, zeros, 
+                        label=f'{market} Borrow APR',
+                        color=self.line_colors[market],
+                        linewidth=2.5,
+                        marker=tier['marker'],
+                        markersize=4,
+                        linestyle='-' if market == 'frxUSD' else '--')
+        
+        if not self.per_market_borrow:
+            # Add single borrow rate line (using frxUSD market)
+            self._borrow_lines['frxUSD'], = ax.plot(x, zeros, 
+                    label='Borrow APR',
+                    color='#e74c3c',
+                    linewidth=2.5,
+                    marker=tier['marker'],
+                    markersize=4)
+        
+        # Add sfrxUSD interest rate line
+        self._rate_line = ax.axhline(y=0, color='#8e44ad', linestyle='--', 
+                                     label='sfrxUSD Interest Rate', linewidth=2)
+        
+        # Customize the plot
+        ax.set_ylabel('APR', fontsize=12)
+        ax.set_xlabel(self.xlabel, fontsize=12)
+        ax.set_xticks(x[::self.tick_step])
+        
+        # Format y-axis as percentage
+        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: '{:.1%}'.format(y)))
+        
+        # Add legend
+        ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+        
+        # Add grid for better readability
+        ax.yaxis.grid(True, linestyle='--', alpha=0.7)
+        
+        self._n = n
+        self._apy = None
+        self._needs_layout = True
+    
+    def _show_apy(self, apy):
+        # Toggle the APY markers and their legend entries
+        for market, line in self._apy_lines.items():
+            line.set_visible(apy is not None)
+            line.set_label(f'{market} Total APY ({apy} compounding)' if apy is not None else '_nolegend_')
+        self.ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+        self._apy = apy
+        self._needs_layout = True
+    
+    def update(self, data, borrow_rates, sfrxusd_interest_rate, title=None, utilization_rate=0.85, apy=None):
+        """
+        Point the chart at new data and redraw.
+        
+        Args:
+            data (pandas.DataFrame or RateSeries): DataFrame containing APR data, or a compact RateSeries
+            borrow_rates (pandas.DataFrame): DataFrame containing borrow rate data (None for a RateSeries)
+            sfrxusd_interest_rate (float): The sfrxUSD interest rate
+            title (str): Title for the plot. Defaults to default_title(utilization_rate).
+            utilization_rate (float): The fixed utilization rate used, for the default title
+            apy (str or float, optional): Compounding interval (see accrual.COMPOUNDING_INTERVALS)
+                at which to mark each market's total APY; None shows APR only
+        """
+        with span('read_series'):
+            axis_values, series = _market_series(data, borrow_rates, self.axis_name)
+        if len(axis_values) != self._n:
+            self._build(len(axis_values))
+        if apy != self._apy:
+            self._show_apy(apy)
+        with span('update_artists'):
+            self._update_artists(axis_values, series, sfrxusd_interest_rate, title, utilization_rate)
         
-        # Create bars - lentAPR at bottom, unlentAPR on top
-        ax.bar(x + pos, lent_data['value'], width, 
-               label=f'{market} Lent APR',
-               color=colors[market][0])
-        ax.bar(x + pos, unlent_data['value'], width, 
-               bottom=lent_data['value'],
-               label=f'{market} Unlent APR',
-               color=colors[market][1],
-               hatch='//' if market == 'sfrxUSD' else '')
-    
-    # Add single borrow rate line (using frxUSD market)
-    market_borrow = borrow_rates[borrow_rates['market'] == 'frxUSD']
-    ax.plot(x, market_borrow['value'], 
-            label='Borrow APR',
-            color='#e74c3c',
-            linewidth=2.5,
-            marker='o',
-            markersize=4)
-    
-    # Add sfrxUSD interest rate line
-    ax.axhline(y=sfrxusd_interest_rate, color='#8e44ad', linestyle='--', 
-               label='sfrxUSD Interest Rate', linewidth=2)
+        # Adjust layout once per build; later updates keep the same frame
+        if self._needs_layout:
+            with span('tight_layout'):
+                self.fig.tight_layout()
+            self._needs_layout = False
+        self.fig.canvas.draw_idle()
+    
+    def _update_artists(self, axis_values, series, sfrxusd_interest_rate, title, utilization_rate):
+        ax = self.ax
+        
+        for market in self.markets:
+            lent_bars, unlent_bars = self._bars[market]
+            lent_data = series[market]['lentAPR']
+            unlent_data = series[market]['unlentAPR']
+            for bar, height in zip(lent_bars, lent_data):
+                bar.set_height(height)
+            for bar, bottom, height in zip(unlent_bars, lent_data, unlent_data):
+                bar.set_y(bottom)
+                bar.set_height(height)
+                # ax.bar pins autoscaling to each bar's bottom; keep that in sync
+                bar.sticky_edges.y[:] = [bottom]
+        for market, line in self._borrow_lines.items():
+            line.set_ydata(series[market]['borrowAPR'])
+        if self._apy is not None:
+            for market, line in self._apy_lines.items():
+                line.set_ydata(apr_to_apy(series[market]['lentAPR'] + series[market]['unlentAPR'], self._apy))
+        self._rate_line.set_ydata([sfrxusd_interest_rate, sfrxusd_interest_rate])
+        
+        if title is None:
+            title = self.default_title(utilization_rate)
+        ax.set_title(title, fontsize=16, pad=20)
+        
+        # Set x-axis labels
+        ax.set_xticklabels(self.tick_labels(axis_values[::self.tick_step]), rotation=45)
+        
+        ax.relim()
+        ax.autoscale_view()
+    
+    def set_quality(self, quality):
+        """
+        Switch render tier, restyling the existing artists (hatching and markers) in place.
+        """
+        tier = _render_tier(quality)
+        self.quality = quality
+        if self._n is None:
+            return
+        for bar in self._bars['sfrxUSD'][1]:
+            bar.set_hatch(tier['hatch'])
+        for line in self._borrow_lines.values():
+            line.set_marker(tier['marker'])
+        self.fig.canvas.draw_idle()
+    
+    def _save(self, target, quality=None, dpi=None, **kwargs):
+        # Save with a tier's settings, restyling temporarily if it differs from the chart's
+        previous = self.quality
+        quality = quality or previous
+        tier = _render_tier(quality)
+        dpi = dpi or tier['dpi']
+        if quality != previous:
+            self.set_quality(quality)
+        try:
+            with span('savefig', quality=quality, dpi=dpi):
+                self.fig.savefig(target, bbox_inches=tier['bbox_inches'], dpi=dpi, **kwargs)
+        finally:
+            if quality != previous:
+                self.set_quality(previous)
+    
+    def to_png(self, quality=None, dpi=None):
+        """
+        Encode the figure as PNG without releasing it, e.g. for notebook outputs.
+        
+        Args:
+            quality (str, optional): Render tier; defaults to the chart's own tier
+            dpi (float, optional): Override the tier's dpi
+        
+        Returns:
+            bytes: PNG image
+        """
+        buffer = io.BytesIO()
+        self._save(buffer, quality, dpi, format='png')
+        return buffer.getvalue()
+    
+    def render(self, save_path=None, quality=None):
+        """
+        Save the figure to save_path and release it, or display it if save_path is None.
+        
+        Args:
+            save_path (str, optional): Output file; the extension picks PNG, SVG or PDF
+            quality (str, optional): Render tier; defaults to the chart's own tier
+        """
+        if save_path:
+            # Replace rather than overwrite the file so hard-linked cache objects stay intact
+            if os.path.lexists(save_path):
+                os.remove(save_path)
+            self._save(save_path, quality)
+            plt.close(self.fig)
+        else:
+            with span('show'):
+                plt.show()
+
+class UtilizationAPRChart(StackedAPRChart):
+    """APR comparison across utilization rates at a fixed borrow rate."""
+    axis_name = 'utilization_rate'
+    xlabel = 'Utilization Rate'
     
-    # Customize the plot
-    ax.set_ylabel('APR', fontsize=12)
-    ax.set_xlabel('Utilization Rate', fontsize=12)
-    ax.set_title(title, fontsize=16, pad=20)
+    def default_title(self, utilization_rate):
+        return "APR Comparison: frxUSD vs sfrxUSD"
+
+class BorrowRateAPRChart(StackedAPRChart):
+    """APR comparison across borrow rates at a fixed utilization rate."""
+    axis_name = 'borrow_rate'
+    xlabel = 'Borrow Rate'
+    tick_step = 5  # Show every 5th label to avoid crowding
+
+class LendRateAPRChart(StackedAPRChart):
+    """APR comparison across lend rates at a fixed utilization rate, with a borrow line per market."""
+    axis_name = 'lend_rate'
+    xlabel = 'Lend Rate'
+    tick_step = 5  # Show every 5th label to avoid crowding
+    per_market_borrow = True
+
+class BacktestChart(StackedAPRChart):
+    """
+    Realized time-weighted APRs of a backtest per period (or per pair): frxUSD as it ran
+    next to the sfrxUSD-denominated counterfactual, with each market's borrow APR.
+    """
+    axis_name = 'period'
+    xlabel = 'Period'
+    per_market_borrow = True
     
-    # Set x-axis labels
-    ax.set_xticks(x)
-    ax.set_xticklabels([f'{rate:.0%}' for rate in util_rates])
-    plt.setp(ax.get_xticklabels(), rotation=45)
+    def __init__(self, labels, **kwargs):
+        super().__init__(**kwargs)
+        self.labels = list(labels)
+        # Keep about two dozen tick labels however long the backtest
+        self.tick_step = max(1, -(-len(self.labels) // 24))
     
-    # Format y-axis as percentage
-    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: '{:.1%}'.format(y)))
+    def default_title(self, utilization_rate):
+        return "Realized APR: frxUSD vs sfrxUSD-denominated"
     
-    # Add legend
-    ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    def tick_labels(self, axis_values):
+        return [self.labels[int(i)] for i in axis_values]
+
+def _plot_chart(chart_cls, data, borrow_rates, sfrxusd_interest_rate, save_path, quality='publication', **options):
+    """
+    Render a one-off chart, reusing a cached artifact from RENDER_CACHE when possible.
+    """
+    with span(chart_cls.__name__, quality=quality):
+        _plot_chart_cached(chart_cls, data, borrow_rates, sfrxusd_interest_rate, save_path, quality, **options)
+
+def _plot_chart_cached(chart_cls, data, borrow_rates, sfrxusd_interest_rate, save_path, quality, **options):
+    tier = _render_tier(quality)
+    key = None
+    if save_path and RENDER_CACHE is not None:
+        axis_values, series = _market_series(data, borrow_rates, chart_cls.axis_name)
+        # Apply the chart style first so the rcParams in the key match the rendered figure
+        sns.set_style("whitegrid")
+        style = {
+            name: getattr(chart_cls, name)
+            for name in ('xlabel', 'tick_step', 'per_market_borrow', 'width', 'colors', 'line_colors')
+        }
+        rc = {name: repr(value) for name, value in plt.rcParams.items() if name != 'backend'}
+        key = RENDER_CACHE.key(chart_cls.__name__, {
+            'axis': np.asarray(axis_values, dtype=float),
+            'series': series,
+            'sfrxusd_interest_rate': sfrxusd_interest_rate,
+            'options': options,
+            'style': style,
+            'rc': rc,
+            'tier': tier,
+            'format': os.path.splitext(save_path)[1].lower()
+        })
+        with span('render_cache_fetch'):
+            if RENDER_CACHE.fetch(key, save_path):
+                return
+    
+    # Saved charts never touch pyplot's figure registry, so they can render off the main thread
+    chart = chart_cls(pyplot=not save_path, quality=quality)
+    chart.update(data, borrow_rates, sfrxusd_interest_rate, **options)
+    chart.render(save_path)
+    if key is not None:
+        RENDER_CACHE.store(key, save_path, {'chart': chart_cls.__name__, 'options': options, 'quality': quality})
+
+_background_executor = None
+
+def render_progressive(plot_fn, *args, save_path, preview_path=None, **kwargs):
+    """
+    Save a preview-tier chart now and the publication-tier chart in the background.
     
-    # Add grid for better readability
-    ax.yaxis.grid(True, linestyle='--', alpha=0.7)
+    Background renders run one at a time on a single worker thread.
     
-    # Adjust layout
-    plt.tight_layout()
+    Args:
+        plot_fn (callable): One of the plot_* functions
+        *args: Positional arguments for plot_fn
+        save_path (str): Path of the final artifact (PNG, SVG or PDF)
+        preview_path (str, optional): Path of the preview. Defaults to
+            "<save_path stem>.preview.png".
+        **kwargs: Keyword arguments for plot_fn
+    
+    Returns:
+        concurrent.futures.Future: Resolves to save_path once the final artifact is written
+    """
+    global _background_executor
+    if preview_path is None:
+        preview_path = f'{os.path.splitext(save_path)[0]}.preview.png'
+    plot_fn(*args, save_path=preview_path, quality='preview', **kwargs)
+    
+    if _background_executor is None:
+        _background_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='publication-render')
+    
+    def publish():
+        plot_fn(*args, save_path=save_path, quality='publication', **kwargs)
+        return save_path
+    return _background_executor.submit(publish)
+
+def plot_stacked_apr_comparison(data, borrow_rates, sfrxusd_interest_rate, title="APR Comparison: frxUSD vs sfrxUSD", save_path=None, quality='publication', apy=None):
+    """
+    Create a stacked bar chart comparing total APRs (lentAPR + unlentAPR) for both markets,
+    with borrow rate curves overlaid.
     
-    if save_path:
-        plt.savefig(save_path, bbox_inches='tight', dpi=300)
-        plt.close()
-    else:
-        plt.show()
+    Args:
+        data (pandas.DataFrame or RateSeries): DataFrame containing APR data, or a compact RateSeries
+        borrow_rates (pandas.DataFrame): DataFrame containing borrow rate data (None for a RateSeries)
+        sfrxusd_interest_rate (float): The sfrxUSD interest rate
+        title (str): Title for the plot
+        save_path (str, optional): Path to save the plot (.png, .svg or .pdf). If None, displays the plot.
+        quality (str): Render tier, 'preview' or 'publication'
+        apy (str or float, optional): Also mark total APY compounded at this interval
+            (e.g. 'block', 'day'; see accrual.COMPOUNDING_INTERVALS)
+    """
+    _plot_chart(UtilizationAPRChart, data, borrow_rates, sfrxusd_interest_rate, save_path, quality,
+                title=title, apy=apy)
 
-def plot_fixed_util_apr_comparison(data, borrow_rates, sfrxusd_interest_rate, utilization_rate=0.85, title=None, save_path=None):
+def plot_fixed_util_apr_comparison(data, borrow_rates, sfrxusd_interest_rate, utilization_rate=0.85, title=None, save_path=None, quality='publication', apy=None):
     """
     Create a stacked bar chart comparing total APRs (lentAPR + unlentAPR) for both markets
     across different borrow rates at fixed utilization.
     
     Args:
-        data (pandas.DataFrame): DataFrame containing APR data
-        borrow_rates (pandas.DataFrame): DataFrame containing borrow rate data
+        data (pandas.DataFrame or RateSeries): DataFrame containing APR data, or a compact RateSeries
+        borrow_rates (pandas.DataFrame): DataFrame containing borrow rate data (None for a RateSeries)
         sfrxusd_interest_rate (float): The sfrxUSD interest rate
         utilization_rate (float): The fixed utilization rate used
         title (str): Title for the plot
-        save_path (str, optional): Path to save the plot. If None, displays the plot.
+        save_path (str, optional): Path to save the plot (.png, .svg or .pdf). If None, displays the plot.
+        quality (str): Render tier, 'preview' or 'publication'
+        apy (str or float, optional): Also mark total APY compounded at this interval
+            (e.g. 'block', 'day'; see accrual.COMPOUNDING_INTERVALS)
     """
-    plt.figure(figsize=(12, 8))
-    sns.set_style("whitegrid")
-    
-    # Create figure and axis
-    fig, ax = plt.subplots(figsize=(12, 8))
-    
-    # Get unique borrow rates
-    borrow_rates_list = sorted(data[data['market'] == 'frxUSD']['borrow_rate'].unique())
-    
-    # Set width of bars and positions of the bars
-    width = 0.35
-    x = np.arange(len(borrow_rates_list))
-    
-    # Prepare data for both markets
-    markets = ['frxUSD', 'sfrxUSD']
-    positions = [-width/2, width/2]  # Offset for side-by-side bars
-    colors = {'frxUSD': ['#2ecc71', '#27ae60'], 'sfrxUSD': ['#3498db', '#2980b9']}
-    
-    for market, pos in zip(markets, positions):
-        market_data = data[data['market'] == market]
-        lent_data = market_data[market_data['apr_type'] == 'lentAPR']
-        unlent_data = market_data[market_data['apr_type'] == 'unlentAPR']
-        
-        # Create bars - lentAPR at bottom, unlentAPR on top
-        ax.bar(x + pos, lent_data['value'], width, 
-               label=f'{market} Lent APR',
-               color=colors[market][0])
-        ax.bar(x + pos, unlent_data['value'], width, 
-               bottom=lent_data['value'],
-               label=f'{market} Unlent APR',
-               color=colors[market][1],
-               hatch='//' if market == 'sfrxUSD' else '')
-    
-    # Add single borrow rate line (using frxUSD market)
-    market_borrow = borrow_rates[borrow_rates['market'] == 'frxUSD']
-    ax.plot(x, market_borrow['value'], 
-            label='Borrow APR',
-            color='#e74c3c',
-            linewidth=2.5,
-            marker='o',
-            markersize=4)
-    
-    # Add sfrxUSD interest rate line
-    ax.axhline(y=sfrxusd_interest_rate, color='#8e44ad', linestyle='--', 
-               label='sfrxUSD Interest Rate', linewidth=2)
-    
-    # Customize the plot
-    ax.set_ylabel('APR', fontsize=12)
-    ax.set_xlabel('Borrow Rate', fontsize=12)
-    if title is None:
-        title = f"APR Comparison at {utilization_rate:.0%} Utilization"
-    ax.set_title(title, fontsize=16, pad=20)
-    
-    # Set x-axis labels
-    ax.set_xticks(x[::5])  # Show every 5th label to avoid crowding
-    ax.set_xticklabels([f'{rate:.0%}' for rate in borrow_rates_list[::5]])
-    plt.setp(ax.get_xticklabels(), rotation=45)
-    
-    # Format y-axis as percentage
-    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: '{:.1%}'.format(y)))
-    
-    # Add legend
-    ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-    
-    # Add grid for better readability
-    ax.yaxis.grid(True, linestyle='--', alpha=0.7)
-    
-    # Adjust layout
-    plt.tight_layout()
-    
-    if save_path:
-        plt.savefig(save_path, bbox_inches='tight', dpi=300)
-        plt.close()
-    else:
-        plt.show()
+    _plot_chart(BorrowRateAPRChart, data, borrow_rates, sfrxusd_interest_rate, save_path, quality,
+                title=title, utilization_rate=utilization_rate, apy=apy)
 
-def plot_lend_rate_apr_comparison(data, borrow_rates, sfrxusd_interest_rate, utilization_rate=0.85, title=None, save_path=None):
+def plot_lend_rate_apr_comparison(data, borrow_rates, sfrxusd_interest_rate, utilization_rate=0.85, title=None, save_path=None, quality='publication', apy=None):
     """
     Create a stacked bar chart comparing total APRs (lentAPR + unlentAPR) for both markets
     across different lend rates at fixed utilization.
     
     Args:
-        data (pandas.DataFrame): DataFrame containing APR data
-        borrow_rates (pandas.DataFrame): DataFrame containing borrow rate data
+        data (pandas.DataFrame or RateSeries): DataFrame containing APR data, or a compact RateSeries
+        borrow_rates (pandas.DataFrame): DataFrame containing borrow rate data (None for a RateSeries)
         sfrxusd_interest_rate (float): The sfrxUSD interest rate
         utilization_rate (float): The fixed utilization rate used
         title (str): Title for the plot
-        save_path (str, optional): Path to save the plot. If None, displays the plot.
+        save_path (str, optional): Path to save the plot (.png, .svg or .pdf). If None, displays the plot.
+        quality (str): Render tier, 'preview' or 'publication'
+        apy (str or float, optional): Also mark total APY compounded at this interval
+            (e.g. 'block', 'day'; see accrual.COMPOUNDING_INTERVALS)
     """
-    plt.figure(figsize=(12, 8))
-    sns.set_style("whitegrid")
-    
-    # Create figure and axis
-    fig, ax = plt.subplots(figsize=(12, 8))
+    _plot_chart(LendRateAPRChart, data, borrow_rates, sfrxusd_interest_rate, save_path, quality,
+                title=title, utilization_rate=utilization_rate, apy=apy)
+
+def plot_backtest(periods, title=None, xlabel='Period', save_path=None, quality='publication', apy=None):
+    """
+    Create a stacked bar chart of a backtest's realized APRs, frxUSD against the
+    sfrxUSD-denominated counterfactual, with each market's borrow APR and the mean
+    sfrxUSD interest rate overlaid.
     
-    # Get unique lend rates
-    lend_rates_list = sorted(data[data['market'] == 'frxUSD']['lend_rate'].unique())
+    Args:
+        periods (pandas.DataFrame): backtest()['periods'], or backtest.summary_frame()
+            to compare pairs; one bar group per row, labelled by the index
+        title (str, optional): Title for the plot
+        xlabel (str): Label of the x axis, e.g. 'Pair' for a summary_frame
+        save_path (str, optional): Path to save the plot (.png, .svg or .pdf). If None, displays the plot.
+        quality (str): Render tier, 'preview' or 'publication'
+        apy (str or float, optional): Also mark total APY compounded at this interval
+            (e.g. 'block', 'day'; see accrual.COMPOUNDING_INTERVALS)
+    """
+    from data_fetcher import APR_TYPES, MARKETS, RateSeries
+    
+    values = np.array([[periods[f'{market}_{apr_type}'].to_numpy(dtype=float) for apr_type in APR_TYPES]
+                       for market in MARKETS])
+    data = RateSeries('period', np.arange(len(periods)), values)
+    sfrxusd_interest_rate = float(np.nanmean(periods['sfrxusd_interest_rate']))
+    with span('BacktestChart', quality=quality, periods=len(periods)):
+        chart = BacktestChart(periods.index.astype(str), pyplot=not save_path, quality=quality)
+        chart.xlabel = xlabel
+        chart.update(data, None, sfrxusd_interest_rate, title=title, apy=apy)
+        chart.render(save_path)
+
+def plot_break_even_contours(x_values, lines, surface=None, xlabel='Utilization Rate', ylabel='sfrxUSD Interest Rate',
+                             line_label='{:.1%} spread', surface_label='Required Borrow APR',
+                             title="sfrxUSD vs frxUSD Break-even Contours", save_path=None, quality='publication'):
+    """
+    Plot break-even / iso-spread contours, optionally over a filled solved surface.
     
-    # Set width of bars and positions of the bars
-    width = 0.35
-    x = np.arange(len(lend_rates_list))
+    Args:
+        x_values (array-like): x samples shared by every contour
+        lines (dict): {target: y values at x_values}, e.g. from solver.iso_lines
+        surface (tuple, optional): (x grid, y grid, values) drawn as filled contours,
+            e.g. solver.required_borrow_rate over a meshgrid
+        xlabel (str): Label of the x axis
+        ylabel (str): Label of the y axis
+        line_label (str): Format string for each contour's legend entry
+        surface_label (str): Colorbar label of the surface
+        title (str): Title for the plot
+        save_path (str, optional): Path to save the plot (.png, .svg or .pdf). If None, displays the plot.
+        quality (str): Render tier, 'preview' or 'publication'
+    """
+    tier = _render_tier(quality)
+    percent = plt.FuncFormatter(lambda y, _: '{:.1%}'.format(y))
+    sns.set_style("whitegrid")
+    fig, ax = plt.subplots(figsize=(12, 8))
     
-    # Prepare data for both markets
-    markets = ['frxUSD', 'sfrxUSD']
-    positions = [-width/2, width/2]  # Offset for side-by-side bars
-    colors = {'frxUSD': ['#2ecc71', '#27ae60'], 'sfrxUSD': ['#3498db', '#2980b9']}
-    line_colors = {'frxUSD': '#e74c3c', 'sfrxUSD': '#9b59b6'}
+    if surface is not None:
+        x_grid, y_grid, values = surface
+        with span('contourf', points=np.size(values)):
+            filled = ax.contourf(x_grid, y_grid, values, levels=20, cmap='viridis')
+        fig.colorbar(filled, ax=ax, label=surface_label, format=percent)
     
-    for market, pos in zip(markets, positions):
-        market_data = data[data['market'] == market]
-        lent_data = market_data[market_data['apr_type'] == 'lentAPR']
-        unlent_data = market_data[market_data['apr_type'] == 'unlentAPR']
-        
-        # Create bars - lentAPR at bottom, unlentAPR on top
-        ax.bar(x + pos, lent_data['value'], width, 
-               label=f'{market} Lent APR',
-               color=colors[market][0])
-        ax.bar(x + pos, unlent_data['value'], width, 
-               bottom=lent_data['value'],
-               label=f'{market} Unlent APR',
-               color=colors[market][1],
-               hatch='//' if market == 'sfrxUSD' else '')
-        
-        # Add borrow rate line for each market
-        market_borrow = borrow_rates[borrow_rates['market'] == market]
-        ax.plot(x, market_borrow['value'], 
-                label=f'{market} Borrow APR',
-                color=line_colors[market],
-                linewidth=2.5,
-                marker='o',
-                markersize=4,
-                linestyle='-' if market == 'frxUSD' else '--')
-    
-    # Add sfrxUSD interest rate line
-    ax.axhline(y=sfrxusd_interest_rate, color='#8e44ad', linestyle='--', 
-               label='sfrxUSD Interest Rate', linewidth=2)
+    colors = sns.color_palette('rocket', len(lines))
+    for color, (target, y_values) in zip(colors, lines.items()):
+        ax.plot(x_values, y_values, color=color, linewidth=2.5, label=line_label.format(target))
     
-    # Customize the plot
-    ax.set_ylabel('APR', fontsize=12)
-    ax.set_xlabel('Lend Rate', fontsize=12)
-    if title is None:
-        title = f"APR Comparison at {utilization_rate:.0%} Utilization"
     ax.set_title(title, fontsize=16, pad=20)
-    
-    # Set x-axis labels
-    ax.set_xticks(x[::5])  # Show every 5th label to avoid crowding
-    ax.set_xticklabels([f'{rate:.0%}' for rate in lend_rates_list[::5]])
-    plt.setp(ax.get_xticklabels(), rotation=45)
-    
-    # Format y-axis as percentage
-    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: '{:.1%}'.format(y)))
-    
-    # Add legend
-    ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-    
-    # Add grid for better readability
-    ax.yaxis.grid(True, linestyle='--', alpha=0.7)
-    
-    # Adjust layout
-    plt.tight_layout()
+    ax.set_xlabel(xlabel, fontsize=12)
+    ax.set_ylabel(ylabel, fontsize=12)
+    ax.xaxis.set_major_formatter(percent)
+    ax.yaxis.set_major_formatter(percent)
+    ax.legend(loc='best')
+    fig.tight_layout()
     
     if save_path:
-        plt.savefig(save_path, bbox_inches='tight', dpi=300)
-        plt.close()
+        with span('savefig', quality=quality, dpi=tier['dpi']):
+            fig.savefig(save_path, bbox_inches=tier['bbox_inches'], dpi=tier['dpi'])
+        plt.close(fig)
     else:
-        plt.show() 
\ No newline at end of file
+        plt.show()